@@ -0,0 +1,37 @@
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.security import require_role
+from app.models import User
+from app.schemas import ChangeEntry, ChangeFeedResponse
+from app.services.changes import get_changes, get_latest_revision, get_oldest_revision, is_resync_required
+
+router = APIRouter(prefix="/changes", tags=["changes"])
+
+
+@router.get("", response_model=ChangeFeedResponse)
+async def get_change_feed(
+    since: int = Query(0, ge=0, description="Последняя известная клиенту ревизия"),
+    entity_type: Optional[str] = Query(None, pattern="^(order|vehicle)$"),
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """
+    Incremental sync: changes after `since`, oldest first.
+    since=0 returns only the current revision (client should load full lists first).
+    410 if changes after `since` were already pruned: reload lists and start again with since=0.
+    """
+    if since == 0:
+        return ChangeFeedResponse(changes=[], revision=await get_latest_revision(db), has_more=False)
+    if is_resync_required(since, await get_oldest_revision(db)):
+        raise HTTPException(status_code=status.HTTP_410_GONE, detail="Revision is too old, resync required")
+
+    entries, has_more = await get_changes(db, since, limit, entity_type)
+    return ChangeFeedResponse(
+        changes=[ChangeEntry.model_validate(entry) for entry in entries],
+        revision=entries[-1].revision if entries else since,
+        has_more=has_more
+    )
@@ -1,22 +1,20 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
-from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
-from app.core.security import get_current_active_user
+from app.core.cache import cache
+from app.core.conditional import cached_conditional_response, table_stamp
+from app.core.config import settings
+from app.core.security import get_current_active_user, require_role
 from app.models import User, Vehicle, Order, VehicleStatus, OrderStatus
 from app.schemas import DashboardStats
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 
 
-@router.get("/stats", response_model=DashboardStats)
-async def get_dashboard_stats(
-    db: AsyncSession = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
-):
-    """Get dashboard statistics."""
+async def compute_dashboard_stats(db: AsyncSession) -> DashboardStats:
+    """Compute dashboard statistics from DB."""
     # Total vehicles
     total_vehicles_result = await db.execute(select(func.count(Vehicle.id)))
     total_vehicles = total_vehicles_result.scalar() or 0
@@ -63,3 +61,31 @@ async def get_dashboard_stats(
         issues_count=issues_count
     )
 
+
+
+@router.get("/stats", response_model=DashboardStats)
+async def get_dashboard_stats(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get dashboard statistics."""
+    async def load_stamp():
+        return await table_stamp(db, Order, with_count=False) + await table_stamp(db, Vehicle)
+
+    return await cached_conditional_response(
+        request,
+        cache_key="dashboard:stats",
+        load_stamp=load_stamp,
+        load_body=lambda: compute_dashboard_stats(db),
+        ttl=settings.CACHE_DASHBOARD_TTL_SECONDS,
+        tags=["dashboard"]
+    )
+
+
+@router.get("/cache-stats")
+async def get_cache_stats(
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Shared cache hit/miss metrics."""
+    return cache.stats()
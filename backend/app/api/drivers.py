@@ -1,10 +1,13 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
 
 from app.core.database import get_db
+from app.core.cache import cache
+from app.core.conditional import cached_conditional_response, rows_stamp
+from app.core.config import settings
 from app.core.security import get_current_active_user, require_role, get_password_hash, get_user_by_email
 from app.models import User, Driver, UserRole
 from app.schemas import DriverCreate, DriverCreateWithUser, DriverResponse
@@ -14,31 +17,44 @@ router = APIRouter(prefix="/drivers", tags=["drivers"])
 
 @router.get("", response_model=List[DriverResponse])
 async def get_drivers(
+    request: Request,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
     """Get list of drivers."""
-    query = select(Driver).options(selectinload(Driver.user))
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    drivers = result.scalars().all()
-    
-    response = []
-    for driver in drivers:
-        # Проверяем, загружен ли пользователь
-        if not driver.user:
-            # Если пользователь не загружен, пытаемся загрузить его явно
-            await db.refresh(driver, ["user"])
+    async def load_stamp():
+        return await rows_stamp(db, Driver) + await rows_stamp(db, User)
+
+    async def load_drivers():
+        query = select(Driver).options(selectinload(Driver.user))
+        query = query.offset(skip).limit(limit)
+        result = await db.execute(query)
+        drivers = result.scalars().all()
         
-        driver_dict = {
-            **{c.name: getattr(driver, c.name) for c in Driver.__table__.columns},
-            "user": driver.user if driver.user else None
-        }
-        response.append(DriverResponse(**driver_dict))
+        response = []
+        for driver in drivers:
+            # Проверяем, загружен ли пользователь
+            if not driver.user:
+                # Если пользователь не загружен, пытаемся загрузить его явно
+                await db.refresh(driver, ["user"])
+            
+            driver_dict = {
+                **{c.name: getattr(driver, c.name) for c in Driver.__table__.columns},
+                "user": driver.user if driver.user else None
+            }
+            response.append(DriverResponse(**driver_dict))
+        return response
     
-    return response
+    return await cached_conditional_response(
+        request,
+        cache_key=f"drivers:list:{request.url.query}",
+        load_stamp=load_stamp,
+        load_body=load_drivers,
+        ttl=settings.CACHE_DRIVERS_TTL_SECONDS,
+        tags=["drivers"]
+    )
 
 
 @router.get("/{driver_id}", response_model=DriverResponse)
@@ -92,6 +108,7 @@ async def create_driver(
     
     db.add(new_driver)
     await db.commit()
+    await cache.invalidate_tags("drivers", "vehicles")
     await db.refresh(new_driver)
     await db.refresh(new_driver, ["user"])
     
@@ -150,6 +167,7 @@ async def create_driver_with_user(
     
     db.add(new_driver)
     await db.commit()
+    await cache.invalidate_tags("drivers", "vehicles")
     await db.refresh(new_driver)
     await db.refresh(new_driver, ["user"])
     
@@ -0,0 +1,49 @@
+from typing import List
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.security import get_current_active_user, require_role
+from app.models import User
+from app.schemas import Coordinates, GeocodeBatchRequest, GeocodeResult
+from app.services.geocoding import get_geocoding_service
+
+router = APIRouter(prefix="/geocoding", tags=["geocoding"])
+
+
+def to_result(address: str, value) -> GeocodeResult:
+    return GeocodeResult(
+        address=address,
+        location=Coordinates(lat=value[0], lng=value[1]) if value else None,
+        found=value is not None
+    )
+
+
+@router.get("", response_model=GeocodeResult)
+async def geocode_address(
+    address: str = Query(..., min_length=1),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Geocode a single address."""
+    value = await get_geocoding_service().geocode(db, address)
+    return to_result(address, value)
+
+
+@router.post("/batch", response_model=List[GeocodeResult])
+async def geocode_batch(
+    data: GeocodeBatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Geocode a list of addresses (e.g. for order imports)."""
+    values = await get_geocoding_service().geocode_batch(db, data.addresses)
+    return [to_result(address, value) for address, value in zip(data.addresses, values)]
+
+
+@router.get("/stats")
+async def get_geocoding_stats(
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Geocoding cache metrics."""
+    return get_geocoding_service().stats()
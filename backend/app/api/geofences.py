@@ -0,0 +1,209 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from geoalchemy2.shape import to_shape
+from geoalchemy2.elements import WKTElement
+
+from app.core.database import get_db
+from app.core.security import require_role
+from app.models import User, Geofence, GeofenceEvent
+from app.schemas import (
+    GeofenceCreate, GeofenceUpdate, GeofenceResponse, GeofenceEventResponse, Coordinates
+)
+from app.services.geofencing import geofence_monitor
+
+router = APIRouter(prefix="/geofences", tags=["geofences"])
+
+
+def coords_to_polygon(coords: List[Coordinates]) -> WKTElement:
+    """Convert list of Coordinates to closed POLYGON WKTElement."""
+    if len(coords) < 3:
+        raise HTTPException(status_code=400, detail="Geofence polygon needs at least 3 points")
+    ring = [(c.lng, c.lat) for c in coords]
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    wkt = ", ".join(f"{lng} {lat}" for lng, lat in ring)
+    return WKTElement(f"POLYGON(({wkt}))", srid=4326)
+
+
+def coords_to_geom(coords: Optional[Coordinates]) -> Optional[WKTElement]:
+    if coords is None:
+        return None
+    return WKTElement(f"POINT({coords.lng} {coords.lat})", srid=4326)
+
+
+def point_to_coords(point) -> Optional[Coordinates]:
+    if point is None:
+        return None
+    try:
+        shape = to_shape(point)
+        return Coordinates(lat=shape.y, lng=shape.x)
+    except Exception:
+        return None
+
+
+def polygon_to_coords(polygon) -> Optional[List[Coordinates]]:
+    if polygon is None:
+        return None
+    try:
+        shape = to_shape(polygon)
+        return [Coordinates(lat=lat, lng=lng) for lng, lat in shape.exterior.coords]
+    except Exception:
+        return None
+
+
+def geofence_to_response(geofence: Geofence) -> GeofenceResponse:
+    geofence_dict = {
+        **{c.name: getattr(geofence, c.name) for c in Geofence.__table__.columns},
+        "area": polygon_to_coords(geofence.area),
+        "center": point_to_coords(geofence.center),
+    }
+    return GeofenceResponse(**geofence_dict)
+
+
+def validate_shape(geofence: Geofence):
+    """Geofence must be either a polygon or a circle (center + radius)."""
+    is_polygon = geofence.area is not None
+    is_circle = geofence.center is not None and geofence.radius_m is not None
+    if is_polygon == is_circle:
+        raise HTTPException(
+            status_code=400,
+            detail="Geofence needs either area polygon or center with radius_m"
+        )
+
+
+@router.get("", response_model=List[GeofenceResponse])
+async def get_geofences(
+    include_inactive: bool = False,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Get list of geofences (deleted ones only with include_inactive)."""
+    query = select(Geofence)
+    if not include_inactive:
+        query = query.where(Geofence.is_active.is_(True))
+    result = await db.execute(query.order_by(Geofence.id))
+    return [geofence_to_response(g) for g in result.scalars().all()]
+
+
+@router.get("/events", response_model=List[GeofenceEventResponse])
+async def get_geofence_events(
+    vehicle_id: Optional[int] = None,
+    geofence_id: Optional[int] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Latest geofence enter/exit events."""
+    query = select(GeofenceEvent)
+    if vehicle_id:
+        query = query.where(GeofenceEvent.vehicle_id == vehicle_id)
+    if geofence_id:
+        query = query.where(GeofenceEvent.geofence_id == geofence_id)
+    query = query.order_by(GeofenceEvent.timestamp.desc(), GeofenceEvent.id.desc()).limit(min(limit, 1000))
+
+    result = await db.execute(query)
+    return [
+        GeofenceEventResponse(**{
+            **{c.name: getattr(e, c.name) for c in GeofenceEvent.__table__.columns},
+            "location": point_to_coords(e.location)
+        })
+        for e in result.scalars().all()
+    ]
+
+
+@router.get("/stats")
+async def get_geofence_stats(
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """In-memory geofence index and detection counters."""
+    return geofence_monitor.stats()
+
+
+@router.post("", response_model=GeofenceResponse, status_code=status.HTTP_201_CREATED)
+async def create_geofence(
+    geofence_data: GeofenceCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Create geofence and reload in-memory index."""
+    data = geofence_data.model_dump(exclude={"area", "center"})
+    new_geofence = Geofence(
+        **data,
+        area=coords_to_polygon(geofence_data.area) if geofence_data.area else None,
+        center=coords_to_geom(geofence_data.center)
+    )
+    validate_shape(new_geofence)
+
+    db.add(new_geofence)
+    await db.commit()
+    await db.refresh(new_geofence)
+    await geofence_monitor.reload(db)
+
+    return geofence_to_response(new_geofence)
+
+
+@router.patch("/{geofence_id}", response_model=GeofenceResponse)
+async def update_geofence(
+    geofence_id: int,
+    geofence_data: GeofenceUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Update geofence and reload in-memory index."""
+    result = await db.execute(select(Geofence).where(Geofence.id == geofence_id))
+    geofence = result.scalar_one_or_none()
+
+    if not geofence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+
+    update_data = geofence_data.model_dump(exclude_unset=True)
+    if "area" in update_data:
+        update_data.pop("area")
+        geofence.area = coords_to_polygon(geofence_data.area) if geofence_data.area else None
+    if "center" in update_data:
+        update_data.pop("center")
+        geofence.center = coords_to_geom(geofence_data.center)
+
+    for field, value in update_data.items():
+        setattr(geofence, field, value)
+    validate_shape(geofence)
+
+    await db.commit()
+    await db.refresh(geofence)
+    await geofence_monitor.reload(db)
+
+    return geofence_to_response(geofence)
+
+
+@router.delete("/{geofence_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_geofence(
+    geofence_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Deactivate geofence (soft delete).
+
+    Строку не удаляем: индексы других воркеров до обновления по watch еще видят
+    зону, и их события не должны ломать вставку пачки точек по внешнему ключу.
+    """
+    result = await db.execute(select(Geofence).where(Geofence.id == geofence_id))
+    geofence = result.scalar_one_or_none()
+
+    if not geofence:
+        raise HTTPException(status_code=404, detail="Geofence not found")
+
+    geofence.is_active = False
+    await db.commit()
+    await geofence_monitor.reload(db)
+    return None
+
+
+@router.post("/reload")
+async def reload_geofences(
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Force reload of geofence index from DB."""
+    await geofence_monitor.reload()
+    return {"version": geofence_monitor.index.version}
@@ -0,0 +1,68 @@
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import require_role
+from app.models import User
+from app.schemas import HeatmapResponse
+from app.services.heatmap import query_heatmap, rollup_day
+
+router = APIRouter(prefix="/heatmap", tags=["heatmap"])
+
+
+def parse_bbox(bbox: Optional[str]):
+    """'min_lng,min_lat,max_lng,max_lat' -> tuple."""
+    if bbox is None:
+        return None
+    try:
+        min_lng, min_lat, max_lng, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox must be min_lng,min_lat,max_lng,max_lat")
+    if min_lng > max_lng or min_lat > max_lat:
+        raise HTTPException(status_code=400, detail="bbox min must not exceed max")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+@router.get("", response_model=HeatmapResponse)
+async def get_heatmap(
+    date_from: date,
+    date_to: date,
+    zoom: int = 12,
+    bbox: Optional[str] = None,
+    min_count: int = 1,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """
+    Density of tracking points per grid cell for an inclusive UTC day range:
+    count, average speed, dwell and idle time. Cell size follows the map zoom.
+    Days past the archive cutoff are served only from their daily aggregate.
+    """
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days >= settings.HEATMAP_MAX_RANGE_DAYS:
+        raise HTTPException(status_code=400, detail=f"Range is limited to {settings.HEATMAP_MAX_RANGE_DAYS} days")
+    if not 0 <= zoom <= settings.HEATMAP_BASE_ZOOM:
+        raise HTTPException(status_code=400, detail=f"zoom must be between 0 and {settings.HEATMAP_BASE_ZOOM}")
+    try:
+        return await query_heatmap(db, date_from, date_to, zoom, parse_bbox(bbox), min_count)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+
+@router.post("/rollup")
+async def rollup_heatmap_day(
+    day: date,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Recompute daily cells for one day (e.g. after importing old points)."""
+    try:
+        point_count = await rollup_day(db, day)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    await db.commit()
+    return {"day": day, "point_count": point_count}
@@ -1,6 +1,6 @@
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status, Query, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -9,8 +9,10 @@ from geoalchemy2.elements import WKTElement  # Используем WKTElement 
 from pydantic import BaseModel, EmailStr
 
 from app.core.database import get_db
-from app.core.security import get_current_active_user, require_role
-from app.core.email import email_service
+from app.core.cache import cache
+from app.core.conditional import VersionStamp, check_conditional, table_stamp, row_stamp
+from app.core.security import get_current_active_user, get_current_user_optional, require_role
+from app.core.email import email_service, email_outbox_worker
 from app.core.config import settings
 from app.models import User, Order, OrderStatus, Vehicle, Driver, VehicleStatus
 from app.schemas import (
@@ -20,9 +22,16 @@ from app.schemas import (
     Coordinates,
     OrderCalculateRequest,
     OrderCalculateResponse,
-    OrderAssignRequest
+    OrderAssignRequest,
+    OrderEta
 )
-from app.services.pricing import calculate_haversine_distance, calculate_order_price
+from app.services.quote_cache import quote_cache
+from app.services.geocoding import get_geocoding_service
+from app.services.search import apply_order_search
+from app.services.arrival import arrival_detector
+from app.services.eta import eta_engine
+from app.services.changes import record_change, order_change_data, vehicle_change_data
+from app.api.tracking import publish_changes
 
 router = APIRouter(prefix="/orders", tags=["orders"])
 
@@ -46,23 +55,32 @@ def coords_to_geom(coords: Coordinates) -> WKTElement:
 
 
 @router.post("/calculate", response_model=OrderCalculateResponse)
-async def calculate_price(data: OrderCalculateRequest):
-    dist_km = calculate_haversine_distance(
-        data.pickup_location.lat, data.pickup_location.lng,
-        data.delivery_location.lat, data.delivery_location.lng
-    )
-    
-    result = calculate_order_price(
-        dist_km=dist_km,
-        weight_kg=data.weight,
-        length_cm=data.length,
-        width_cm=data.width,
-        height_cm=data.height
+async def calculate_price(
+    data: OrderCalculateRequest,
+    current_user: Optional[User] = Depends(get_current_user_optional)
+):
+    # Персональный тариф клиента применяется, только если он авторизован
+    result = await quote_cache.get_quote(
+        pickup=(data.pickup_location.lat, data.pickup_location.lng),
+        delivery=(data.delivery_location.lat, data.delivery_location.lng),
+        weight=data.weight,
+        length=data.length,
+        width=data.width,
+        height=data.height,
+        customer_id=current_user.id if current_user else None
     )
     
     return OrderCalculateResponse(**result)
 
 
+@router.get("/calculate/stats")
+async def get_quote_cache_stats(
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Quote cache metrics."""
+    return quote_cache.stats()
+
+
 @router.post("", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
 async def create_order(
     order_data: OrderCreate,
@@ -75,11 +93,34 @@ async def create_order(
     # 2. Volume (m3)
     volume = (order_data.length * order_data.width * order_data.height) / 1_000_000
 
-    # 3. Prepare geometry
-    pickup_geom = coords_to_geom(order_data.pickup_location) if order_data.pickup_location else None
-    delivery_geom = coords_to_geom(order_data.delivery_location) if order_data.delivery_location else None
+    # 3. Geocode addresses without coordinates
+    if order_data.pickup_location is None or order_data.delivery_location is None:
+        pickup_value, delivery_value = await get_geocoding_service().geocode_batch(
+            db, [order_data.pickup_address, order_data.delivery_address]
+        )
+        if order_data.pickup_location is None and pickup_value:
+            order_data.pickup_location = Coordinates(lat=pickup_value[0], lng=pickup_value[1])
+        if order_data.delivery_location is None and delivery_value:
+            order_data.delivery_location = Coordinates(lat=delivery_value[0], lng=delivery_value[1])
 
-    # 4. Create Order
+    # 4. Цена зависит от расстояния, поэтому без координат заказ не посчитать
+    if order_data.pickup_location is None or order_data.delivery_location is None:
+        raise HTTPException(status_code=422, detail="Could not determine pickup/delivery coordinates")
+    pickup_geom = coords_to_geom(order_data.pickup_location)
+    delivery_geom = coords_to_geom(order_data.delivery_location)
+
+    # 5. Distance and price: та же котировка, что и в /orders/calculate, значения клиента не используются
+    quote = await quote_cache.get_quote(
+        pickup=(order_data.pickup_location.lat, order_data.pickup_location.lng),
+        delivery=(order_data.delivery_location.lat, order_data.delivery_location.lng),
+        weight=order_data.weight,
+        length=order_data.length,
+        width=order_data.width,
+        height=order_data.height,
+        customer_id=current_user.id
+    )
+
+    # 6. Create Order
     new_order = Order(
         customer_id=current_user.id,
         customer_name=order_data.customer_name,
@@ -90,15 +131,19 @@ async def create_order(
         weight=order_data.weight,
         dimensions=dimensions_str,
         volume=volume,
-        distance_km=order_data.distance_km,
-        price=order_data.price,
+        distance_km=quote["distance_km"],
+        price=quote["price"],
         delivery_date=order_data.delivery_date,
         status=OrderStatus.NEW
     )
     
     db.add(new_order)
+    await db.flush()
+    await record_change(db, "order", new_order.id, "created", order_change_data(new_order))
     await db.commit()
     await db.refresh(new_order)
+    await cache.invalidate_tags("orders", "dashboard")
+    await publish_changes()
     
     return OrderResponse(
         id=new_order.id,
@@ -122,14 +167,24 @@ async def create_order(
 
 @router.get("", response_model=List[OrderResponse])
 async def get_orders(
+    request: Request,
+    response: Response,
     status_filter: Optional[OrderStatus] = Query(None, alias="status"),
     customer_id: Optional[int] = Query(None),
     vehicle_id: Optional[int] = Query(None),
+    search: Optional[str] = Query(None, min_length=1, max_length=200),
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    # Заказы не удаляются - count по большой таблице не нужен
+    stamp = await table_stamp(db, Order, with_count=False) + await table_stamp(db, Vehicle)
+    not_modified, headers = check_conditional(request, stamp, scope=(current_user.id, current_user.role.value))
+    if not_modified:
+        return not_modified
+    response.headers.update(headers)
+    
     query = select(Order).options(
         selectinload(Order.vehicle).selectinload(Vehicle.driver).selectinload(Driver.user)
     )
@@ -140,9 +195,16 @@ async def get_orders(
     elif customer_id:
         query = query.where(Order.customer_id == customer_id)
     
+    if vehicle_id:
+        query = query.where(Order.vehicle_id == vehicle_id)
+    
     if status_filter:
         query = query.where(Order.status == status_filter)
     
+    if search:
+        # Полнотекстовый + триграммный поиск, сначала самые релевантные
+        query = apply_order_search(query, search)
+    
     query = query.order_by(Order.created_at.desc()).offset(skip).limit(limit)
     result = await db.execute(query)
     orders = result.scalars().all()
@@ -175,9 +237,22 @@ async def get_orders(
 @router.get("/{order_id}", response_model=OrderResponse)
 async def get_order(
     order_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    estimate = eta_engine.get(order_id)
+    stamp = (
+        await row_stamp(db, Order, order_id)
+        + await table_stamp(db, Vehicle)
+        + VersionStamp((estimate.version if estimate else None,))
+    )
+    not_modified, headers = check_conditional(request, stamp, scope=(current_user.id, current_user.role.value))
+    if not_modified:
+        return not_modified
+    response.headers.update(headers)
+    
     query = select(Order).options(
         selectinload(Order.vehicle).selectinload(Vehicle.driver).selectinload(Driver.user)
     ).where(Order.id == order_id)
@@ -208,7 +283,13 @@ async def get_order(
         completed_at=order.completed_at,
         vehicle=order.vehicle,
         pickup_location=point_to_coords(order.pickup_location),
-        delivery_location=point_to_coords(order.delivery_location)
+        delivery_location=point_to_coords(order.delivery_location),
+        eta=OrderEta(
+            remaining_km=round(estimate.remaining_km, 2),
+            speed_kmh=round(estimate.speed_kmh, 1),
+            eta=estimate.eta,
+            updated_at=estimate.updated_at
+        ) if estimate and order.status == OrderStatus.IN_PROGRESS else None
     )
 
 
@@ -216,7 +297,6 @@ async def get_order(
 async def assign_order(
     order_id: int,
     assign_data: OrderAssignRequest,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
 ):
@@ -232,22 +312,38 @@ async def assign_order(
     if not vehicle:
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
+    previous_vehicle_id = order.vehicle_id
     order.vehicle_id = vehicle.id
     order.status = OrderStatus.IN_PROGRESS
     vehicle.status = VehicleStatus.IN_PROGRESS
     
-    await db.commit()
-    await db.refresh(order)
-    
+    # Письмо попадает в outbox в той же транзакции - не теряется при рестарте
+    queued_email = False
     if order.customer and order.customer.email:
         tracking_url = f"{settings.FRONTEND_URL}/track/{order.id}"
-        background_tasks.add_task(
-            email_service.send_tracking_code,
+        email_service.enqueue_tracking_code(
+            db,
             to_email=order.customer.email,
             order_id=order.id,
             customer_name=order.customer_name,
             tracking_url=tracking_url
         )
+        queued_email = True
+    
+    await record_change(db, "order", order.id, "assigned", order_change_data(order))
+    await record_change(db, "vehicle", vehicle.id, "updated", vehicle_change_data(vehicle))
+    
+    await db.commit()
+    await db.refresh(order)
+    await cache.invalidate_tags("orders", "vehicles", "dashboard")
+    arrival_detector.forget(vehicle.id, previous_vehicle_id)
+    if previous_vehicle_id != vehicle.id:
+        # Оценка прежней машины к новой не относится
+        eta_engine.forget_order(order.id)
+    await publish_changes()
+    
+    if queued_email:
+        email_outbox_worker.notify()
     
     return OrderResponse(
         id=order.id,
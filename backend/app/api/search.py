@@ -0,0 +1,59 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+
+from app.core.database import get_db
+from app.core.security import get_current_active_user
+from app.models import User, Order, Vehicle
+from app.schemas import SearchHit, SearchResponse
+from app.services.search import apply_order_search, apply_vehicle_search
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(10, ge=1, le=50),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Quick search across orders (customer, addresses) and vehicles (plate, VIN, make/model)."""
+    # Только нужные колонки - без загрузки связей и геометрии
+    order_query = select(
+        Order.id, Order.customer_name, Order.pickup_address, Order.delivery_address, Order.status
+    )
+    if current_user.role.value == "CLIENT":
+        order_query = order_query.where(Order.customer_id == current_user.id)
+    order_query = apply_order_search(order_query, q).limit(limit)
+    order_rows = (await db.execute(order_query)).all()
+
+    response = SearchResponse(orders=[
+        SearchHit(
+            type="order",
+            id=row.id,
+            title=f"#{row.id} {row.customer_name}",
+            subtitle=f"{row.pickup_address} → {row.delivery_address}",
+            status=row.status.value
+        )
+        for row in order_rows
+    ])
+
+    if current_user.role.value != "CLIENT":
+        vehicle_query = select(
+            Vehicle.id, Vehicle.plate_number, Vehicle.vin, Vehicle.make, Vehicle.model, Vehicle.status
+        )
+        vehicle_query = apply_vehicle_search(vehicle_query, q).limit(limit)
+        vehicle_rows = (await db.execute(vehicle_query)).all()
+        response.vehicles = [
+            SearchHit(
+                type="vehicle",
+                id=row.id,
+                title=row.plate_number,
+                subtitle=f"{row.make} {row.model} · {row.vin}",
+                status=row.status.value
+            )
+            for row in vehicle_rows
+        ]
+
+    return response
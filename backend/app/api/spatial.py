@@ -0,0 +1,64 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import get_db
+from app.core.security import require_role
+from app.models import User
+from app.schemas import (
+    OrderPointKind, OrderStatus, SpatialCorridorQuery, SpatialOrderResponse, SpatialPolygonQuery,
+    SpatialVehicleResponse
+)
+from app.services.spatial import (
+    ACTIVE_ORDER_STATUSES, orders_along_corridor, orders_within_radius, vehicles_within_polygon
+)
+
+router = APIRouter(prefix="/spatial", tags=["spatial"])
+
+MAX_RADIUS_M = 100_000
+
+
+@router.get("/orders/nearby", response_model=List[SpatialOrderResponse])
+async def get_orders_nearby(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_m: float = Query(..., gt=0, le=MAX_RADIUS_M),
+    point: OrderPointKind = OrderPointKind.DELIVERY,
+    status: Optional[List[OrderStatus]] = Query(None),
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Orders whose pickup or delivery point is within radius_m metres, nearest first."""
+    return await orders_within_radius(db, lat, lng, radius_m, point=point.value, statuses=status, limit=limit)
+
+
+@router.post("/vehicles/within", response_model=List[SpatialVehicleResponse])
+async def get_vehicles_within_polygon(
+    query: SpatialPolygonQuery,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Vehicles whose current position is inside the polygon."""
+    ring = [(c.lat, c.lng) for c in query.polygon]
+    if len(set(ring)) < 3:
+        raise HTTPException(status_code=400, detail="Polygon needs at least 3 distinct points")
+    return await vehicles_within_polygon(db, ring, status=query.status)
+
+
+@router.post("/orders/corridor", response_model=List[SpatialOrderResponse])
+async def get_orders_along_corridor(
+    query: SpatialCorridorQuery,
+    limit: int = Query(500, ge=1, le=5000),
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Orders within width_m of a route line, ordered by position along the route."""
+    return await orders_along_corridor(
+        db,
+        [(c.lat, c.lng) for c in query.path],
+        query.width_m,
+        point=query.point.value,
+        statuses=ACTIVE_ORDER_STATUSES if query.active_only else None,
+        limit=limit,
+    )
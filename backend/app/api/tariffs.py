@@ -0,0 +1,130 @@
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select
+from geoalchemy2.shape import to_shape
+from geoalchemy2.elements import WKTElement
+
+from app.core.database import get_db
+from app.core.security import require_role
+from app.models import User, Tariff
+from app.schemas import TariffCreate, TariffUpdate, TariffResponse, Coordinates
+from app.services.tariffs import tariff_registry
+
+router = APIRouter(prefix="/tariffs", tags=["tariffs"])
+
+
+def coords_to_polygon(coords: List[Coordinates]) -> WKTElement:
+    """Convert list of Coordinates to closed POLYGON WKTElement."""
+    if len(coords) < 3:
+        raise HTTPException(status_code=400, detail="Zone polygon needs at least 3 points")
+    ring = [(c.lng, c.lat) for c in coords]
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    wkt = ", ".join(f"{lng} {lat}" for lng, lat in ring)
+    return WKTElement(f"POLYGON(({wkt}))", srid=4326)
+
+
+def polygon_to_coords(polygon) -> Optional[List[Coordinates]]:
+    if polygon is None:
+        return None
+    try:
+        shape = to_shape(polygon)
+        return [Coordinates(lat=lat, lng=lng) for lng, lat in shape.exterior.coords]
+    except Exception:
+        return None
+
+
+def tariff_to_response(tariff: Tariff) -> TariffResponse:
+    tariff_dict = {
+        **{c.name: getattr(tariff, c.name) for c in Tariff.__table__.columns},
+        "zone": polygon_to_coords(tariff.zone)
+    }
+    return TariffResponse(**tariff_dict)
+
+
+@router.get("", response_model=List[TariffResponse])
+async def get_tariffs(
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Get list of tariffs."""
+    result = await db.execute(select(Tariff).order_by(Tariff.priority.desc(), Tariff.id))
+    return [tariff_to_response(t) for t in result.scalars().all()]
+
+
+@router.post("", response_model=TariffResponse, status_code=status.HTTP_201_CREATED)
+async def create_tariff(
+    tariff_data: TariffCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Create tariff and reload in-memory snapshot."""
+    data = tariff_data.model_dump(exclude={"zone"})
+    new_tariff = Tariff(
+        **data,
+        zone=coords_to_polygon(tariff_data.zone) if tariff_data.zone else None
+    )
+
+    db.add(new_tariff)
+    await db.commit()
+    await db.refresh(new_tariff)
+    await tariff_registry.reload(db)
+
+    return tariff_to_response(new_tariff)
+
+
+@router.patch("/{tariff_id}", response_model=TariffResponse)
+async def update_tariff(
+    tariff_id: int,
+    tariff_data: TariffUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Update tariff and reload in-memory snapshot."""
+    result = await db.execute(select(Tariff).where(Tariff.id == tariff_id))
+    tariff = result.scalar_one_or_none()
+
+    if not tariff:
+        raise HTTPException(status_code=404, detail="Tariff not found")
+
+    update_data = tariff_data.model_dump(exclude_unset=True)
+    if "zone" in update_data:
+        update_data.pop("zone")
+        tariff.zone = coords_to_polygon(tariff_data.zone) if tariff_data.zone else None
+
+    for field, value in update_data.items():
+        setattr(tariff, field, value)
+
+    await db.commit()
+    await db.refresh(tariff)
+    await tariff_registry.reload(db)
+
+    return tariff_to_response(tariff)
+
+
+@router.delete("/{tariff_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_tariff(
+    tariff_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    result = await db.execute(select(Tariff).where(Tariff.id == tariff_id))
+    tariff = result.scalar_one_or_none()
+
+    if not tariff:
+        raise HTTPException(status_code=404, detail="Tariff not found")
+
+    await db.delete(tariff)
+    await db.commit()
+    await tariff_registry.reload(db)
+    return None
+
+
+@router.post("/reload")
+async def reload_tariffs(
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Force reload of tariff snapshot from DB."""
+    await tariff_registry.reload()
+    return {"version": tariff_registry.version}
@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Depends, HTTPException, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.core.security import require_role
+from app.models import User
+from app.services.tiles import get_tile
+
+router = APIRouter(prefix="/tiles", tags=["tiles"])
+
+MVT_MEDIA_TYPE = "application/vnd.mapbox-vector-tile"
+
+
+@router.get("/{z}/{x}/{y}.mvt")
+async def get_vector_tile(
+    z: int,
+    x: int,
+    y: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(require_role(["ADMIN", "DISPATCHER"]))
+):
+    """Vehicles, active order points and recent tracks as a Mapbox Vector Tile.
+
+    Тайл общий для всех (кэш по z/x/y) и содержит заказы всех клиентов и весь
+    парк - поэтому только для ADMIN/DISPATCHER.
+    """
+    if not 0 <= z <= settings.TILES_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+        raise HTTPException(status_code=404, detail="Tile out of range")
+    
+    tile = await get_tile(db, z, x, y)
+    headers = {"Cache-Control": f"private, max-age={settings.TILES_CACHE_TTL_SECONDS}"}
+    if not tile:
+        return Response(status_code=204, headers=headers)
+    return Response(content=tile, media_type=MVT_MEDIA_TYPE, headers=headers)
@@ -1,24 +1,46 @@
+import asyncio
 import json
-from typing import List, Dict
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
-from sqlalchemy.orm import selectinload
 from geoalchemy2.shape import to_shape
-from geoalchemy2.elements import WKTElement
 
-from app.core.database import get_db
-from app.core.security import get_current_active_user
-from app.models import User, Vehicle, TrackingPoint
-from app.schemas import Coordinates, TrackingPointCreate, TrackingPointResponse
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db
+from app.core.security import get_current_active_user, get_current_user_optional, require_role
+from app.models import User, TrackingPoint, Trip, Vehicle
+from app.schemas import (
+    Coordinates, TrackingPointCreate, TrackingPointResponse, TrackingPointBatchCreate,
+    TrackingPointBatchResponse, TrackingPointRejection, TripResponse
+)
+from app.services.geofencing import geofence_monitor
+from app.services.changes import change_message, sequence_changes
+from app.services.ingest import IngestResult, IngestBatchResult, ingest_and_commit, ingest_stats
+from app.services.playback import PlaybackClock, playback_points
+from app.services.tiles import tile_invalidator
+from app.services.track_archive import track_archive
 
 router = APIRouter(prefix="/tracking", tags=["tracking"])
 
 
+def point_to_coords(point) -> Optional[Coordinates]:
+    if point is None:
+        return None
+    try:
+        shape = to_shape(point)
+        return Coordinates(lat=shape.y, lng=shape.x)
+    except Exception:
+        return None
+
+
 class ConnectionManager:
     def __init__(self):
         self.active_connections: List[WebSocket] = []
         self.vehicle_connections: Dict[int, List[WebSocket]] = {}
+        self.change_connections: List[WebSocket] = []
     
     async def connect(self, websocket: WebSocket, vehicle_id: int = None):
         await websocket.accept()
@@ -34,6 +56,12 @@ class ConnectionManager:
         if vehicle_id and vehicle_id in self.vehicle_connections:
             if websocket in self.vehicle_connections[vehicle_id]:
                 self.vehicle_connections[vehicle_id].remove(websocket)
+        if vehicle_id is None and websocket in self.change_connections:
+            self.change_connections.remove(websocket)
+    
+    def subscribe_changes(self, websocket: WebSocket):
+        if websocket not in self.change_connections:
+            self.change_connections.append(websocket)
     
     async def send_personal_message(self, message: str, websocket: WebSocket):
         await websocket.send_text(message)
@@ -45,6 +73,15 @@ class ConnectionManager:
             except Exception:
                 self.disconnect(connection)
     
+    async def broadcast_changes(self, messages: List[str]):
+        """Push change-feed frames to clients subscribed with subscribe_changes."""
+        for connection in list(self.change_connections):
+            try:
+                for message in messages:
+                    await connection.send_text(message)
+            except Exception:
+                self.disconnect(connection)
+    
     async def broadcast_to_vehicle(self, vehicle_id: int, message: str):
         if vehicle_id not in self.vehicle_connections:
             return
@@ -58,8 +95,34 @@ class ConnectionManager:
 manager = ConnectionManager()
 
 
+# Лента изменений несет данные заказов (клиент, цена) - как GET /changes
+CHANGE_FEED_ROLES = ("ADMIN", "DISPATCHER")
+
+
+async def broadcast_change_entries(entries):
+    await manager.broadcast_changes([change_message(entry) for entry in entries])
+
+
+async def publish_changes():
+    """Sequence committed changes and push them to the change feed. Call after commit."""
+    try:
+        entries = await sequence_changes()
+    except Exception as e:
+        # Изменения уже закоммичены - их подберет фоновый run_sequencer
+        print(f"Error sequencing changes: {str(e)}")
+        return
+    await broadcast_change_entries(entries)
+
+
 @router.websocket("/ws")
-async def websocket_endpoint(websocket: WebSocket):
+async def websocket_endpoint(websocket: WebSocket, token: Optional[str] = None):
+    """Live vehicle updates; change feed for ADMIN/DISPATCHER. Auth: ?token=<JWT>."""
+    async with AsyncSessionLocal() as db:
+        user = await get_current_user_optional(token, db)
+    if user is None or not user.is_active:
+        await websocket.close(code=1008, reason="Could not validate credentials")
+        return
+    
     await manager.connect(websocket)
     try:
         while True:
@@ -77,6 +140,20 @@ async def websocket_endpoint(websocket: WebSocket):
                             websocket
                         )
                 
+                elif message_type == "subscribe_changes":
+                    if user.role.value not in CHANGE_FEED_ROLES:
+                        await manager.send_personal_message(
+                            json.dumps({"type": "error", "detail": "Not enough permissions"}),
+                            websocket
+                        )
+                        continue
+                    # Клиент сам догружает пропущенное через GET /changes?since=<rev>
+                    manager.subscribe_changes(websocket)
+                    await manager.send_personal_message(
+                        json.dumps({"type": "subscribed_changes"}),
+                        websocket
+                    )
+                
                 elif message_type == "ping":
                     await manager.send_personal_message(
                         json.dumps({"type": "pong"}),
@@ -88,76 +165,225 @@ async def websocket_endpoint(websocket: WebSocket):
         manager.disconnect(websocket)
 
 
-@router.post("/points", response_model=TrackingPointResponse)
-async def create_tracking_point(
-    point_data: TrackingPointCreate,
-    db: AsyncSession = Depends(get_db)
-):
-    vehicle_result = await db.execute(select(Vehicle).where(Vehicle.id == point_data.vehicle_id))
-    vehicle = vehicle_result.scalar_one_or_none()
-    
-    if not vehicle:
-        raise HTTPException(status_code=404, detail="Vehicle not found")
-    
-    # Use WKTElement for insertion
-    point_geom = WKTElement(f"POINT({point_data.location.lng} {point_data.location.lat})", srid=4326)
-    
-    new_point = TrackingPoint(
-        vehicle_id=point_data.vehicle_id,
-        location=point_geom,
-        speed=point_data.speed,
-        fuel_level=point_data.fuel_level,
-        heading=point_data.heading
-    )
-    
-    vehicle.current_location = point_geom
-    vehicle.current_speed = point_data.speed
-    if point_data.fuel_level is not None:
-        vehicle.fuel_level = point_data.fuel_level
-    
-    db.add(new_point)
-    await db.commit()
-    await db.refresh(new_point)
-    
-    update_message = json.dumps({
+def vehicle_update_frame(vehicle, lat: float, lng: float, speed: float, fuel_level: Optional[float]) -> dict:
+    return {
         "type": "vehicle_update",
         "vehicle_id": vehicle.id,
         "data": {
             "id": vehicle.id,
             "plate_number": vehicle.plate_number,
             "current_location": {
-                "lat": point_data.location.lat,
-                "lng": point_data.location.lng
+                "lat": lat,
+                "lng": lng
             },
-            "speed": point_data.speed,
-            "fuel_level": point_data.fuel_level,
+            "speed": speed,
+            "fuel_level": fuel_level,
             "status": vehicle.status.value
         }
-    })
+    }
+
+
+async def publish_position(result: IngestResult):
+    location = result.point_data.location
+    update_message = json.dumps(vehicle_update_frame(
+        result.vehicle, location.lat, location.lng, result.point_data.speed, result.point_data.fuel_level
+    ))
     
     await manager.broadcast(update_message)
-    await manager.broadcast_to_vehicle(vehicle.id, update_message)
+    await manager.broadcast_to_vehicle(result.vehicle.id, update_message)
+    await tile_invalidator.vehicle_moved(result.vehicle.id, location.lat, location.lng)
+
+
+@router.websocket("/playback")
+async def playback_websocket(
+    websocket: WebSocket,
+    date_from: datetime,
+    date_to: datetime,
+    vehicle_id: Optional[int] = None,
+    speed: float = 10.0,
+    token: Optional[str] = None
+):
+    """
+    Replay historical points as vehicle_update frames (with "playback": true).
+    Whole fleet when vehicle_id is omitted. Auth: ?token=<JWT>, ADMIN/DISPATCHER.
+    """
+    date_from = date_from if date_from.tzinfo else date_from.replace(tzinfo=timezone.utc)
+    date_to = date_to if date_to.tzinfo else date_to.replace(tzinfo=timezone.utc)
+    async with AsyncSessionLocal() as db:
+        user = await get_current_user_optional(token, db)
+        if user is None:
+            await websocket.close(code=1008, reason="Could not validate credentials")
+            return
+        # История всего парка - как живые тайлы, только ADMIN/DISPATCHER
+        if user.role.value not in CHANGE_FEED_ROLES:
+            await websocket.close(code=1008, reason="Not enough permissions")
+            return
+        if not 0 < speed <= settings.PLAYBACK_MAX_SPEED or date_to <= date_from \
+                or date_to - date_from > timedelta(days=settings.PLAYBACK_MAX_RANGE_DAYS):
+            await websocket.close(code=1008, reason="Invalid playback range or speed")
+            return
+        
+        query = select(Vehicle)
+        if vehicle_id is not None:
+            query = query.where(Vehicle.id == vehicle_id)
+        vehicles = {v.id: v for v in (await db.execute(query)).scalars().all()}
+        if vehicle_id is not None and vehicle_id not in vehicles:
+            await websocket.close(code=1008, reason="Vehicle not found")
+            return
+    
+    # Дальше без сессии: точки читаются страницами, у каждой своя короткая сессия
+    await websocket.accept()
+    clock = PlaybackClock(speed, settings.PLAYBACK_MAX_PAUSE_SECONDS)
+    sent = 0
+    try:
+        async for timestamp, _, point_vehicle_id, lat, lng, point_speed, fuel_level, heading in playback_points(
+            track_archive, vehicle_id, date_from, date_to
+        ):
+            vehicle = vehicles.get(point_vehicle_id)
+            if vehicle is None:
+                continue
+            await clock.wait(timestamp)
+            frame = vehicle_update_frame(vehicle, lat, lng, point_speed, fuel_level)
+            frame["playback"] = True
+            frame["data"]["heading"] = heading
+            frame["data"]["timestamp"] = timestamp.isoformat()
+            await websocket.send_text(json.dumps(frame))
+            sent += 1
+        await websocket.send_text(json.dumps({"type": "playback_finished", "points": sent}))
+        await websocket.close()
+    except (WebSocketDisconnect, RuntimeError):
+        # Клиент ушел - генераторы источников закрываются
+        pass
+
+
+async def publish_ingest_result(result: IngestResult, position: bool = True):
+    """Push results of an ingested point to WebSocket subscribers."""
+    if result.late or result.duplicate:
+        # Поздняя точка только в истории - на карте не показываем
+        return
+    vehicle = result.vehicle
+    location = {"lat": result.point_data.location.lat, "lng": result.point_data.location.lng}
     
+    if position:
+        await publish_position(result)
+    
+    for event in result.geofence_events:
+        fence = geofence_monitor.index.fences.get(event.geofence_id)
+        event_message = json.dumps({
+            "type": "geofence_event",
+            "vehicle_id": vehicle.id,
+            "data": {
+                "id": event.id,
+                "geofence_id": event.geofence_id,
+                "geofence_name": fence.name if fence else None,
+                "event_type": event.event_type.value,
+                "location": location
+            }
+        })
+        await manager.broadcast(event_message)
+        await manager.broadcast_to_vehicle(vehicle.id, event_message)
+    
+    for estimate in result.eta_updates:
+        eta_message = json.dumps({
+            "type": "eta_update",
+            "vehicle_id": vehicle.id,
+            "data": estimate.to_dict()
+        })
+        await manager.broadcast(eta_message)
+        await manager.broadcast_to_vehicle(vehicle.id, eta_message)
+    
+    if result.completed_orders:
+        await cache.invalidate_tags("orders", "vehicles", "dashboard")
+        await publish_changes()
+        for order in result.completed_orders:
+            completed_message = json.dumps({
+                "type": "order_completed",
+                "vehicle_id": vehicle.id,
+                "data": {
+                    "order_id": order.id,
+                    "completed_at": order.completed_at.isoformat(),
+                    "vehicle_status": vehicle.status.value
+                }
+            })
+            await manager.broadcast(completed_message)
+            await manager.broadcast_to_vehicle(vehicle.id, completed_message)
+
+
+async def publish_batch_result(batch: IngestBatchResult):
+    """Publish a batch: events of every point, position only for the newest point of each vehicle."""
+    newest = {}
+    for result in batch.results:
+        if not result.late:
+            newest[result.vehicle.id] = result
+    for result in batch.results:
+        await publish_ingest_result(result, position=newest.get(result.vehicle.id) is result)
+
+
+def tracking_point_to_response(point: TrackingPoint) -> TrackingPointResponse:
     point_dict = {
-        **{c.name: getattr(new_point, c.name) for c in TrackingPoint.__table__.columns},
-        "location": point_data.location
+        **{c.name: getattr(point, c.name) for c in TrackingPoint.__table__.columns},
+        "location": point_to_coords(point.location)
     }
     return TrackingPointResponse(**point_dict)
 
 
+@router.post("/points", response_model=TrackingPointResponse)
+async def create_tracking_point(
+    point_data: TrackingPointCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    batch = await ingest_and_commit(db, [point_data])
+    
+    if batch.rejected:
+        reason = batch.rejected[0][1]
+        if reason == "unknown_vehicle":
+            raise HTTPException(status_code=404, detail="Vehicle not found")
+        raise HTTPException(status_code=422, detail=f"GPS point rejected: {reason}")
+    
+    if batch.duplicates:
+        # Повтор по ключу (device_id, seq) - отвечаем уже сохраненной точкой
+        return tracking_point_to_response(batch.duplicates[0].point)
+    
+    await publish_batch_result(batch)
+    return tracking_point_to_response(batch.results[0].point)
+
+
+@router.post("/points/batch", response_model=TrackingPointBatchResponse)
+async def create_tracking_points_batch(
+    batch_data: TrackingPointBatchCreate,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Bulk ingest for telematics gateways and buffered uploads. Points are processed
+    in device time order; retries with the same (device_id, seq) are ignored.
+    """
+    batch = await ingest_and_commit(db, batch_data.points)
+    await publish_batch_result(batch)
+    
+    return TrackingPointBatchResponse(
+        accepted=sum(1 for r in batch.results if not r.late),
+        late=sum(1 for r in batch.results if r.late),
+        duplicates=len(batch.duplicates),
+        rejected=[TrackingPointRejection(index=i, reason=reason) for i, reason in sorted(batch.rejected)]
+    )
+
+
 @router.get("/vehicles/{vehicle_id}/history", response_model=List[TrackingPointResponse])
 async def get_vehicle_tracking_history(
     vehicle_id: int,
     limit: int = 100,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    result = await db.execute(
-        select(TrackingPoint)
-        .where(TrackingPoint.vehicle_id == vehicle_id)
-        .order_by(TrackingPoint.timestamp.desc())
-        .limit(limit)
-    )
+    """Newest points first. Old ranges are read from the columnar archive."""
+    query = select(TrackingPoint).where(TrackingPoint.vehicle_id == vehicle_id)
+    if date_from:
+        query = query.where(TrackingPoint.timestamp >= date_from)
+    if date_to:
+        query = query.where(TrackingPoint.timestamp < date_to)
+    result = await db.execute(query.order_by(TrackingPoint.timestamp.desc()).limit(limit))
     points = result.scalars().all()
     
     response = []
@@ -169,4 +395,60 @@ async def get_vehicle_tracking_history(
         }
         response.append(TrackingPointResponse(**point_dict))
     
-    return response
\ No newline at end of file
+    # Не хватило точек в БД - продолжаем из архива, строго раньше самой старой точки из БД
+    if len(response) < limit:
+        archived = await asyncio.to_thread(
+            track_archive.read_range,
+            vehicle_id,
+            date_from,
+            response[-1].timestamp if response else date_to,
+            limit - len(response),
+        )
+        for point_id, timestamp, lat, lng, speed, fuel_level, heading in archived:
+            response.append(TrackingPointResponse(
+                id=point_id,
+                vehicle_id=vehicle_id,
+                location=Coordinates(lat=lat, lng=lng),
+                speed=speed,
+                fuel_level=fuel_level,
+                heading=heading,
+                timestamp=timestamp,
+            ))
+    
+    return response
+
+
+@router.get("/vehicles/{vehicle_id}/trips", response_model=List[TripResponse])
+async def get_vehicle_trips(
+    vehicle_id: int,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    limit: int = 100,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Trips reconstructed from the tracking stream, newest first."""
+    query = select(Trip).where(Trip.vehicle_id == vehicle_id)
+    if date_from:
+        query = query.where(Trip.started_at >= date_from)
+    if date_to:
+        query = query.where(Trip.started_at < date_to)
+    query = query.order_by(Trip.started_at.desc()).limit(min(limit, 1000))
+    
+    result = await db.execute(query)
+    return [
+        TripResponse(**{
+            **{c.name: getattr(trip, c.name) for c in Trip.__table__.columns},
+            "start_location": point_to_coords(trip.start_location),
+            "end_location": point_to_coords(trip.end_location)
+        })
+        for trip in result.scalars().all()
+    ]
+
+
+@router.get("/stats")
+async def get_tracking_stats(
+    current_user: User = Depends(require_role(["ADMIN"]))
+):
+    """Counters of in-memory stages on the tracking ingest path."""
+    return {**ingest_stats(), "archive": await asyncio.to_thread(track_archive.stats)}
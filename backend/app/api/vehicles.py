@@ -1,5 +1,5 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from sqlalchemy.orm import selectinload
@@ -7,6 +7,9 @@ from geoalchemy2.shape import to_shape
 from geoalchemy2.elements import WKTElement
 
 from app.core.database import get_db
+from app.core.cache import cache
+from app.core.conditional import check_conditional, cached_conditional_response, table_stamp, row_stamp, rows_stamp
+from app.core.config import settings
 from app.core.security import get_current_active_user, require_role
 from app.models import User, Vehicle, VehicleStatus, Driver
 from app.schemas import (
@@ -15,6 +18,9 @@ from app.schemas import (
     VehicleResponse,
     Coordinates
 )
+from app.services.search import apply_vehicle_search
+from app.services.changes import change_log_stamp, record_change, vehicle_change_data
+from app.api.tracking import publish_changes
 
 router = APIRouter(prefix="/vehicles", tags=["vehicles"])
 
@@ -35,6 +41,7 @@ def coords_to_geom(coords: Coordinates) -> WKTElement:
 
 @router.get("", response_model=List[VehicleResponse])
 async def get_vehicles(
+    request: Request,
     status_filter: Optional[VehicleStatus] = Query(None, alias="status"),
     search: Optional[str] = Query(None),
     skip: int = Query(0, ge=0),
@@ -42,54 +49,74 @@ async def get_vehicles(
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    query = select(Vehicle).options(
-        selectinload(Vehicle.driver).selectinload(Driver.user)
-    )
-    
-    if status_filter:
-        query = query.where(Vehicle.status == status_filter)
-    
-    if search:
-        search_term = f"%{search}%"
-        query = query.where(
-            (Vehicle.plate_number.ilike(search_term)) |
-            (Vehicle.make.ilike(search_term)) |
-            (Vehicle.model.ilike(search_term)) |
-            (Vehicle.vin.ilike(search_term))
+    async def load_stamp():
+        # Позиции из трекинга в ленту не пишутся - их ловит table_stamp
+        return (
+            await change_log_stamp(db) + await table_stamp(db, Vehicle)
+            + await rows_stamp(db, Driver) + await rows_stamp(db, User)
         )
+
+    async def load_vehicles():
+        query = select(Vehicle).options(
+            selectinload(Vehicle.driver).selectinload(Driver.user)
+        )
+        
+        if status_filter:
+            query = query.where(Vehicle.status == status_filter)
+        
+        if search:
+            # Триграммные GIN-индексы + сортировка по релевантности
+            query = apply_vehicle_search(query, search)
+        
+        query = query.offset(skip).limit(limit)
+        result = await db.execute(query)
+        vehicles = result.scalars().all()
+        
+        response = []
+        for vehicle in vehicles:
+            response.append(VehicleResponse(
+                id=vehicle.id,
+                vin=vehicle.vin,
+                plate_number=vehicle.plate_number,
+                make=vehicle.make,
+                model=vehicle.model,
+                status=vehicle.status,
+                driver_id=vehicle.driver_id,
+                current_location=point_to_coords(vehicle.current_location),
+                fuel_level=vehicle.fuel_level,
+                norm_consumption=vehicle.norm_consumption,
+                current_speed=vehicle.current_speed,
+                mileage=vehicle.mileage,
+                driver=vehicle.driver,
+                created_at=vehicle.created_at
+            ))
+        return response
     
-    query = query.offset(skip).limit(limit)
-    result = await db.execute(query)
-    vehicles = result.scalars().all()
-    
-    response = []
-    for vehicle in vehicles:
-        response.append(VehicleResponse(
-            id=vehicle.id,
-            vin=vehicle.vin,
-            plate_number=vehicle.plate_number,
-            make=vehicle.make,
-            model=vehicle.model,
-            status=vehicle.status,
-            driver_id=vehicle.driver_id,
-            current_location=point_to_coords(vehicle.current_location),
-            fuel_level=vehicle.fuel_level,
-            norm_consumption=vehicle.norm_consumption,
-            current_speed=vehicle.current_speed,
-            mileage=vehicle.mileage,
-            driver=vehicle.driver,
-            created_at=vehicle.created_at
-        ))
-    
-    return response
+    # Позиции меняются трекингом постоянно - короткий TTL вместо инвалидации на каждую точку
+    return await cached_conditional_response(
+        request,
+        cache_key=f"vehicles:list:{request.url.query}",
+        load_stamp=load_stamp,
+        load_body=load_vehicles,
+        ttl=settings.CACHE_VEHICLES_TTL_SECONDS,
+        tags=["vehicles", "drivers"]
+    )
 
 
 @router.get("/{vehicle_id}", response_model=VehicleResponse)
 async def get_vehicle(
     vehicle_id: int,
+    request: Request,
+    response: Response,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    stamp = await row_stamp(db, Vehicle, vehicle_id) + await rows_stamp(db, Driver) + await rows_stamp(db, User)
+    not_modified, headers = check_conditional(request, stamp)
+    if not_modified:
+        return not_modified
+    response.headers.update(headers)
+    
     result = await db.execute(
         select(Vehicle)
         .options(selectinload(Vehicle.driver).selectinload(Driver.user))
@@ -151,8 +178,12 @@ async def create_vehicle(
     )
     
     db.add(new_vehicle)
+    await db.flush()
+    await record_change(db, "vehicle", new_vehicle.id, "created", vehicle_change_data(new_vehicle))
     await db.commit()
     await db.refresh(new_vehicle)
+    await cache.invalidate_tags("vehicles", "dashboard")
+    await publish_changes()
     
     await db.refresh(new_vehicle, ["driver"])
     if new_vehicle.driver:
@@ -219,7 +250,10 @@ async def update_vehicle(
     for field, value in update_data.items():
         setattr(vehicle, field, value)
     
+    await record_change(db, "vehicle", vehicle.id, "updated", vehicle_change_data(vehicle))
     await db.commit()
+    await cache.invalidate_tags("vehicles", "dashboard")
+    await publish_changes()
     
     # 5. Обновляем данные для ответа
     await db.refresh(vehicle)
@@ -258,5 +292,8 @@ async def delete_vehicle(
         raise HTTPException(status_code=404, detail="Vehicle not found")
     
     await db.delete(vehicle)
+    await record_change(db, "vehicle", vehicle_id, "deleted")
     await db.commit()
+    await cache.invalidate_tags("vehicles", "dashboard")
+    await publish_changes()
     return None
\ No newline at end of file
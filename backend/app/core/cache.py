@@ -0,0 +1,243 @@
+"""
+Многоуровневый кэш для данных, которые читаются намного чаще, чем пишутся.
+
+- L1: LRU с TTL в памяти процесса
+- L2: необязательный общий бэкенд (интерфейс CacheBackend; InMemoryCacheBackend -
+  локальная замена для тестов и одного процесса)
+- single-flight: параллельные промахи по одному ключу ждут одну загрузку
+- инвалидация по тегам: эндпоинты записи вызывают invalidate_tags("vehicles", ...);
+  у тегов идущих загрузок счетчик поколений - загрузка, начатая до инвалидации,
+  результат в кэш не кладет, а новые промахи не присоединяются к ней. Счетчик
+  живет, пока тег несет хотя бы одна загрузка (память не растет с числом тегов)
+
+Инвалидация L1 в других воркерах - по TTL (держите TTL L1 коротким).
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from app.core.config import settings
+
+
+class LRUCache:
+    """In-process LRU cache with per-entry TTL and tags."""
+
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        # key -> (value, expires_at, tags)
+        self._data: "OrderedDict[str, Tuple[Any, float, frozenset]]" = OrderedDict()
+        self._tag_index: Dict[str, Set[str]] = {}
+        self.evictions = 0
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return False, None
+        value, expires_at, _ = entry
+        if expires_at <= time.monotonic():
+            self.delete(key)
+            return False, None
+        self._data.move_to_end(key)
+        return True, value
+
+    def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        self.delete(key)
+        tags = frozenset(tags)
+        self._data[key] = (value, time.monotonic() + ttl, tags)
+        for tag in tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+        while len(self._data) > self.max_size:
+            oldest = next(iter(self._data))
+            self.delete(oldest)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        entry = self._data.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tag_index[tag]
+
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        removed = 0
+        for tag in tags:
+            for key in list(self._tag_index.get(tag, ())):
+                self.delete(key)
+                removed += 1
+        return removed
+
+    def clear(self):
+        self._data.clear()
+        self._tag_index.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend:
+    """Interface of a shared (cross-process) cache backend."""
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        raise NotImplementedError
+
+    async def delete(self, key: str):
+        raise NotImplementedError
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        raise NotImplementedError
+
+
+class InMemoryCacheBackend(CacheBackend):
+    """Local stand-in for a shared backend (tests, single-process deployments)."""
+
+    def __init__(self, max_size: int = 10000):
+        self._lru = LRUCache(max_size)
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        return self._lru.get(key)
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        self._lru.set(key, value, ttl, tags)
+
+    async def delete(self, key: str):
+        self._lru.delete(key)
+
+    async def invalidate_tags(self, tags: Iterable[str]):
+        self._lru.invalidate_tags(tags)
+
+
+class TieredCache:
+    """L1 LRU + optional shared L2 backend with single-flight loading and metrics."""
+
+    def __init__(self, l1_size: int = 1000, l1_ttl: float = 30, backend: Optional[CacheBackend] = None):
+        self.l1 = LRUCache(l1_size)
+        self.l1_ttl = l1_ttl
+        self.backend = backend
+        self._inflight: Dict[str, Tuple[asyncio.Future, frozenset]] = {}
+        self._generations: Dict[str, int] = {}
+        self._loading: Dict[str, int] = {}  # Тег -> число идущих загрузок с ним
+        self.metrics = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "loads": 0,
+            "load_errors": 0,
+            "stale_loads": 0,
+            "invalidations": 0,
+        }
+
+    async def get(self, key: str) -> Tuple[bool, Any]:
+        found, value = self.l1.get(key)
+        if found:
+            self.metrics["l1_hits"] += 1
+            return True, value
+        if self.backend is not None:
+            found, packed = await self.backend.get(key)
+            if found:
+                value, tags = packed
+                self.metrics["l2_hits"] += 1
+                self.l1.set(key, value, self.l1_ttl, tags)
+                return True, value
+        return False, None
+
+    async def set(self, key: str, value: Any, ttl: float, tags: Iterable[str] = ()):
+        tags = tuple(tags)
+        self.l1.set(key, value, min(ttl, self.l1_ttl), tags)
+        if self.backend is not None:
+            # Теги храним вместе со значением, чтобы L1 после L2-попадания тоже инвалидировался
+            await self.backend.set(key, (value, tags), ttl, tags)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float, tags: Iterable[str] = ()) -> Any:
+        """Return cached value or load it once, even under concurrent misses."""
+        found, value = await self.get(key)
+        if found:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.metrics["coalesced"] += 1
+            return await asyncio.shield(inflight[0])
+
+        self.metrics["misses"] += 1
+        tags = frozenset(tags)
+        for tag in tags:
+            self._loading[tag] = self._loading.get(tag, 0) + 1
+        generations = self._tag_generations(tags)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (future, tags)
+        try:
+            self.metrics["loads"] += 1
+            value = await loader()
+            if self._tag_generations(tags) == generations:
+                await self.set(key, value, ttl, tags)
+            else:
+                # Теги инвалидированы во время загрузки - значение могло устареть
+                self.metrics["stale_loads"] += 1
+            future.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            self.metrics["load_errors"] += 1
+            future.set_exception(e)
+            # Исключение уже передано ожидающим, не логируем его как "never retrieved"
+            future.exception()
+            raise
+        finally:
+            if self._inflight.get(key, (None,))[0] is future:
+                del self._inflight[key]
+            for tag in tags:
+                self._loading[tag] -= 1
+                if not self._loading[tag]:
+                    del self._loading[tag]
+                    self._generations.pop(tag, None)
+
+    def _tag_generations(self, tags: frozenset) -> Tuple[int, ...]:
+        return tuple(self._generations.get(tag, 0) for tag in sorted(tags))
+
+    async def invalidate_tags(self, *tags: str):
+        self.metrics["invalidations"] += 1
+        for tag in tags:
+            # Поколение нужно только загрузкам, которые идут сейчас
+            if tag in self._loading:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+        # Загрузки, начатые до инвалидации, больше не раздают свой результат новым промахам
+        for key, (_, inflight_tags) in list(self._inflight.items()):
+            if inflight_tags.intersection(tags):
+                del self._inflight[key]
+        self.l1.invalidate_tags(tags)
+        if self.backend is not None:
+            await self.backend.invalidate_tags(tags)
+
+    async def delete(self, key: str):
+        self.l1.delete(key)
+        if self.backend is not None:
+            await self.backend.delete(key)
+
+    def stats(self) -> dict:
+        lookups = self.metrics["l1_hits"] + self.metrics["l2_hits"] + self.metrics["misses"] + self.metrics["coalesced"]
+        hits = self.metrics["l1_hits"] + self.metrics["l2_hits"] + self.metrics["coalesced"]
+        return {
+            **self.metrics,
+            "l1_size": len(self.l1),
+            "l1_evictions": self.l1.evictions,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def create_cache() -> TieredCache:
+    backend = InMemoryCacheBackend(settings.CACHE_L2_SIZE) if settings.CACHE_BACKEND == "memory" else None
+    return TieredCache(l1_size=settings.CACHE_L1_SIZE, l1_ttl=settings.CACHE_L1_TTL_SECONDS, backend=backend)
+
+
+cache = create_cache()
@@ -0,0 +1,185 @@
+"""
+Conditional GET (ETag / If-None-Match, Last-Modified / If-Modified-Since).
+
+Версия ресурса считается дешевым запросом (max(updated_at), max(id), count)
+по индексам, без выборки и сериализации самих данных. Если клиент прислал
+совпадающий ETag, эндпоинт сразу отвечает 304.
+
+max(updated_at) не видит коммитов не по порядку: транзакция, начатая раньше
+(now() - время ее начала), коммитится позже и не двигает максимум. Поэтому
+журналируемые сущности (транспорт) добавляют ревизию ленты изменений
+(app.services.changes.change_log_stamp), а небольшие справочники (водители,
+пользователи) валидируются по версиям строк - rows_stamp.
+
+Last-Modified отдается, только если каждая часть версии датирована: у строки
+есть updated_at/created_at, а у таблицы нет - удаление и вставка без
+updated_at (Vehicle.updated_at пуст до первого изменения) не двигают
+max(updated_at), и If-Modified-Since дал бы ложный 304. Списки валидируются
+только по ETag.
+
+Использование в эндпоинте:
+
+    stamp = await table_stamp(db, Vehicle)
+    not_modified, headers = check_conditional(request, stamp, scope=current_user.id)
+    if not_modified:
+        return not_modified
+    ...
+    response.headers.update(headers)
+
+Для часто читаемых эндпоинтов - cached_conditional_response (тело и ETag из кэша).
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import literal_column, select, func
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+
+
+class VersionStamp:
+    """Cheap version of a resource: opaque parts for ETag + last modification time."""
+
+    def __init__(self, parts: tuple, last_modified: Optional[datetime] = None):
+        self.parts = parts
+        self.last_modified = last_modified
+
+    def __add__(self, other: "VersionStamp") -> "VersionStamp":
+        # Недатированная часть (таблица, ETA) - значит, и у целого нет надежной даты
+        last_modified = None
+        if self.last_modified is not None and other.last_modified is not None:
+            last_modified = max(self.last_modified, other.last_modified)
+        return VersionStamp(self.parts + other.parts, last_modified)
+
+
+async def table_stamp(db: AsyncSession, model, with_count: bool = True) -> VersionStamp:
+    """
+    Stamp of a whole table (ETag only, no Last-Modified). max(id) catches inserts,
+    max(updated_at) - updates, count - deletes (skip it for big tables where rows
+    are never deleted).
+    """
+    columns = [func.max(model.id)]
+    if hasattr(model, "updated_at"):
+        columns.append(func.max(model.updated_at))
+    if with_count:
+        columns.append(func.count(model.id))
+    row = (await db.execute(select(*columns))).one()
+    return VersionStamp((model.__tablename__,) + tuple(row))
+
+
+def rows_digest_query(model):
+    """md5 over (id, xmin) of all rows: xmin changes on every committed update."""
+    row_version = func.concat(model.id, ":", literal_column(f"{model.__tablename__}.xmin"))
+    return select(func.md5(func.string_agg(row_version, aggregate_order_by(literal_column("','"), model.id))))
+
+
+async def rows_stamp(db: AsyncSession, model) -> VersionStamp:
+    """
+    Stamp of a small table from row versions (ETag only): catches every committed
+    insert/update/delete regardless of commit order. Full scan - only for small tables.
+    """
+    return VersionStamp((model.__tablename__, await db.scalar(rows_digest_query(model))))
+
+
+async def row_stamp(db: AsyncSession, model, row_id: int) -> VersionStamp:
+    """Stamp of a single row (by primary key). xmin - row version for the ETag."""
+    columns = [model.id, literal_column(f"{model.__tablename__}.xmin").label("xmin")]
+    if hasattr(model, "updated_at"):
+        columns.append(model.updated_at)
+    if hasattr(model, "created_at"):
+        columns.append(model.created_at)
+    row = (await db.execute(select(*columns).where(model.id == row_id))).one_or_none()
+    if row is None:
+        return VersionStamp((model.__tablename__, row_id, None))
+    last_modified = max((dt for dt in row[2:] if dt is not None), default=None)
+    return VersionStamp((model.__tablename__,) + tuple(row), last_modified)
+
+
+def make_etag(stamp: VersionStamp, request: Request, scope: Any = None) -> str:
+    """Weak ETag from stamp, request path/query and caller scope (e.g. user)."""
+    raw = repr((stamp.parts, request.url.path, str(request.url.query), scope))
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:24]}"'
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # Сравнение слабых ETag: игнорируем префикс W/
+    wanted = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == wanted for candidate in header.split(","))
+
+
+def conditional_headers(request: Request, stamp: VersionStamp, scope: Any = None) -> Dict[str, str]:
+    """ETag / Last-Modified headers for a resource version."""
+    headers = {"ETag": make_etag(stamp, request, scope), "Cache-Control": "private, no-cache"}
+    last_modified = stamp.last_modified
+    if last_modified is not None:
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        headers["Last-Modified"] = format_datetime(last_modified.astimezone(timezone.utc), usegmt=True)
+    return headers
+
+
+def not_modified_response(request: Request, headers: Dict[str, str]) -> Optional[Response]:
+    """
+    304 response if request preconditions match headers, otherwise None.
+    If-None-Match has priority over If-Modified-Since (RFC 9110).
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if _etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return None
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and "Last-Modified" in headers:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+            last_modified = parsedate_to_datetime(headers["Last-Modified"])
+        except (TypeError, ValueError):
+            return None
+        # HTTP-даты с точностью до секунды
+        if last_modified <= since:
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    return None
+
+
+def check_conditional(request: Request, stamp: VersionStamp, scope: Any = None) -> Tuple[Optional[Response], Dict[str, str]]:
+    """Returns (304 response or None, headers to put on the full response)."""
+    headers = conditional_headers(request, stamp, scope)
+    return not_modified_response(request, headers), headers
+
+
+async def cached_conditional_response(
+    request: Request,
+    cache_key: str,
+    load_stamp: Callable[[], Awaitable[VersionStamp]],
+    load_body: Callable[[], Awaitable[Any]],
+    ttl: float,
+    tags: Iterable[str],
+    scope: Any = None,
+) -> Response:
+    """
+    Serve a read endpoint from the shared cache: serialized body and its ETag
+    are cached together, so both 200 and 304 are answered without touching the DB.
+    Write endpoints invalidate entries by tags.
+    """
+    async def load() -> dict:
+        stamp = await load_stamp()
+        return {
+            "headers": conditional_headers(request, stamp, scope),
+            "body": jsonable_encoder(await load_body()),
+        }
+
+    entry = await cache.get_or_load(cache_key, load, ttl=ttl, tags=tags)
+    not_modified = not_modified_response(request, entry["headers"])
+    if not_modified:
+        return not_modified
+    return JSONResponse(entry["body"], headers=entry["headers"])
@@ -1,4 +1,5 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, AsyncConnection, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 from app.core.config import settings
 
@@ -21,6 +22,15 @@ AsyncSessionLocal = async_sessionmaker(
 # Base class for models
 Base = declarative_base()
 
+# PostgreSQL extensions required by models (geometry, trigram indexes)
+REQUIRED_EXTENSIONS = ["postgis", "pg_trgm"]
+
+
+async def create_extensions(conn: AsyncConnection):
+    """Create required PostgreSQL extensions (must run before create_all)."""
+    for extension in REQUIRED_EXTENSIONS:
+        await conn.execute(text(f"CREATE EXTENSION IF NOT EXISTS {extension}"))
+
 
 # Dependency to get DB session
 async def get_db():
@@ -1,8 +1,68 @@
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-from typing import Optional
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from sqlalchemy import select, update, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
 from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import EmailOutbox, EmailStatus
+
+if TYPE_CHECKING:
+    # smtplib и email.mime загружаются при первой отправке (лениво, для старта воркера)
+    import smtplib
+    from email.mime.multipart import MIMEMultipart
+
+
+class SMTPTransport:
+    """
+    Одно постоянное SMTP-соединение на процесс.
+    Соединение (и STARTTLS) устанавливается один раз и переиспользуется,
+    при обрыве - переподключаемся при следующей отправке.
+    """
+
+    def __init__(self, server: str, port: int, user: str = "", password: str = "", use_tls: bool = True, timeout: float = 30):
+        self.server = server
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._smtp: Optional["smtplib.SMTP"] = None
+        self.connections_opened = 0
+
+    def _connect(self) -> "smtplib.SMTP":
+        import smtplib
+        smtp = smtplib.SMTP(self.server, self.port, timeout=self.timeout)
+        smtp.ehlo()
+        if self.use_tls and smtp.has_extn("starttls"):
+            smtp.starttls()
+            smtp.ehlo()
+        if self.user and self.password:
+            smtp.login(self.user, self.password)
+        self.connections_opened += 1
+        return smtp
+
+    def send(self, msg: "MIMEMultipart"):
+        import smtplib
+        if self._smtp is None:
+            self._smtp = self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Сервер закрыл простаивающее соединение - переподключаемся один раз
+            self._smtp = self._connect()
+            self._smtp.send_message(msg)
+
+    def close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
 
 
 class EmailService:
@@ -15,101 +75,258 @@ class EmailService:
         self.from_email = getattr(settings, 'FROM_EMAIL', 'noreply@logitrack.com')
         self.enabled = getattr(settings, 'EMAIL_ENABLED', False)
 
+    def build_tracking_message(self, order_id: int, customer_name: str, tracking_url: str) -> Tuple[str, str, str]:
+        """Build (subject, text, html) for order tracking email."""
+        subject = f'Your Order Tracking Code - #{order_id}'
+
+        # Create HTML email
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <meta charset="UTF-8">
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
+                .content {{ background: #ffffff; padding: 30px; border: 1px solid #e5e7eb; border-top: none; }}
+                .tracking-code {{ background: #f3f4f6; padding: 20px; border-radius: 8px; text-align: center; margin: 20px 0; }}
+                .code {{ font-size: 32px; font-weight: bold; color: #2563eb; letter-spacing: 4px; font-family: monospace; }}
+                .button {{ display: inline-block; background: #2563eb; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; margin: 20px 0; }}
+                .footer {{ background: #f9fafb; padding: 20px; text-align: center; color: #6b7280; font-size: 12px; border-radius: 0 0 10px 10px; }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>🚚 LogiTrack</h1>
+                    <p>Your Order Tracking Information</p>
+                </div>
+                <div class="content">
+                    <p>Hello {customer_name},</p>
+                    <p>Thank you for your order! You can track your shipment in real-time using the tracking code below.</p>
+                    
+                    <div class="tracking-code">
+                        <p style="margin: 0 0 10px 0; color: #6b7280; font-size: 14px;">Your Tracking Code:</p>
+                        <div class="code">{order_id}</div>
+                    </div>
+                    
+                    <p>Click the button below to track your shipment:</p>
+                    <a href="{tracking_url}" class="button">Track My Order</a>
+                    
+                    <p style="margin-top: 30px; color: #6b7280; font-size: 14px;">
+                        Or copy and paste this link into your browser:<br>
+                        <a href="{tracking_url}" style="color: #2563eb; word-break: break-all;">{tracking_url}</a>
+                    </p>
+                </div>
+                <div class="footer">
+                    <p>© 2024 LogiTrack TMS. All rights reserved.</p>
+                    <p>This is an automated message. Please do not reply to this email.</p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+        # Create plain text version
+        text_content = f"""
+        LogiTrack - Order Tracking Code
+        
+        Hello {customer_name},
+        
+        Thank you for your order! You can track your shipment using the tracking code below.
+        
+        Your Tracking Code: {order_id}
+        
+        Track your order: {tracking_url}
+        
+        © 2024 LogiTrack TMS. All rights reserved.
+        """
+
+        return subject, text_content, html_content
+
+    def build_mime(self, to_email: str, subject: str, text_body: str, html_body: Optional[str] = None) -> "MIMEMultipart":
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
+        msg = MIMEMultipart('alternative')
+        msg['Subject'] = subject
+        msg['From'] = self.from_email
+        msg['To'] = to_email
+        # Attach both versions
+        msg.attach(MIMEText(text_body, 'plain'))
+        if html_body:
+            msg.attach(MIMEText(html_body, 'html'))
+        return msg
+
+    def enqueue(self, db: AsyncSession, to_email: str, subject: str, text_body: str, html_body: Optional[str] = None) -> EmailOutbox:
+        """Add message to outbox. Caller commits it together with its own changes."""
+        message = EmailOutbox(
+            to_email=to_email,
+            subject=subject,
+            text_body=text_body,
+            html_body=html_body,
+            status=EmailStatus.PENDING
+        )
+        db.add(message)
+        return message
+
+    def enqueue_tracking_code(self, db: AsyncSession, to_email: str, order_id: int, customer_name: str, tracking_url: str) -> EmailOutbox:
+        """Queue order tracking code email for the outbox worker."""
+        subject, text_content, html_content = self.build_tracking_message(order_id, customer_name, tracking_url)
+        return self.enqueue(db, to_email, subject, text_content, html_content)
+
     def send_tracking_code(self, to_email: str, order_id: int, customer_name: str, tracking_url: str) -> bool:
-        """Send order tracking code to customer email."""
+        """Send order tracking code immediately (blocking, opens its own connection)."""
         if not self.enabled:
             print(f"[EMAIL DISABLED] Would send tracking code to {to_email} for order {order_id}")
             return True  # Return True in dev mode
 
+        transport = SMTPTransport(self.smtp_server, self.smtp_port, self.smtp_user, self.smtp_password, settings.SMTP_USE_TLS)
         try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = f'Your Order Tracking Code - #{order_id}'
-            msg['From'] = self.from_email
-            msg['To'] = to_email
-
-            # Create HTML email
-            html_content = f"""
-            <!DOCTYPE html>
-            <html>
-            <head>
-                <meta charset="UTF-8">
-                <style>
-                    body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
-                    .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
-                    .header {{ background: linear-gradient(135deg, #2563eb 0%, #1d4ed8 100%); color: white; padding: 30px; text-align: center; border-radius: 10px 10px 0 0; }}
-                    .content {{ background: #ffffff; padding: 30px; border: 1px solid #e5e7eb; border-top: none; }}
-                    .tracking-code {{ background: #f3f4f6; padding: 20px; border-radius: 8px; text-align: center; margin: 20px 0; }}
-                    .code {{ font-size: 32px; font-weight: bold; color: #2563eb; letter-spacing: 4px; font-family: monospace; }}
-                    .button {{ display: inline-block; background: #2563eb; color: white; padding: 12px 30px; text-decoration: none; border-radius: 6px; margin: 20px 0; }}
-                    .footer {{ background: #f9fafb; padding: 20px; text-align: center; color: #6b7280; font-size: 12px; border-radius: 0 0 10px 10px; }}
-                </style>
-            </head>
-            <body>
-                <div class="container">
-                    <div class="header">
-                        <h1>🚚 LogiTrack</h1>
-                        <p>Your Order Tracking Information</p>
-                    </div>
-                    <div class="content">
-                        <p>Hello {customer_name},</p>
-                        <p>Thank you for your order! You can track your shipment in real-time using the tracking code below.</p>
-                        
-                        <div class="tracking-code">
-                            <p style="margin: 0 0 10px 0; color: #6b7280; font-size: 14px;">Your Tracking Code:</p>
-                            <div class="code">{order_id}</div>
-                        </div>
-                        
-                        <p>Click the button below to track your shipment:</p>
-                        <a href="{tracking_url}" class="button">Track My Order</a>
-                        
-                        <p style="margin-top: 30px; color: #6b7280; font-size: 14px;">
-                            Or copy and paste this link into your browser:<br>
-                            <a href="{tracking_url}" style="color: #2563eb; word-break: break-all;">{tracking_url}</a>
-                        </p>
-                    </div>
-                    <div class="footer">
-                        <p>© 2024 LogiTrack TMS. All rights reserved.</p>
-                        <p>This is an automated message. Please do not reply to this email.</p>
-                    </div>
-                </div>
-            </body>
-            </html>
-            """
-
-            # Create plain text version
-            text_content = f"""
-            LogiTrack - Order Tracking Code
-            
-            Hello {customer_name},
-            
-            Thank you for your order! You can track your shipment using the tracking code below.
-            
-            Your Tracking Code: {order_id}
-            
-            Track your order: {tracking_url}
-            
-            © 2024 LogiTrack TMS. All rights reserved.
-            """
-
-            # Attach both versions
-            msg.attach(MIMEText(text_content, 'plain'))
-            msg.attach(MIMEText(html_content, 'html'))
-
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                if self.smtp_user and self.smtp_password:
-                    server.login(self.smtp_user, self.smtp_password)
-                server.send_message(msg)
-
+            subject, text_content, html_content = self.build_tracking_message(order_id, customer_name, tracking_url)
+            transport.send(self.build_mime(to_email, subject, text_content, html_content))
             print(f"Email sent successfully to {to_email} for order {order_id}")
             return True
-
         except Exception as e:
             print(f"Error sending email to {to_email}: {str(e)}")
             return False
+        finally:
+            transport.close()
 
 
-email_service = EmailService()
+class EmailOutboxWorker:
+    """
+    Асинхронный отправитель писем из таблицы email_outbox.
+
+    - забирает пачку писем через SELECT ... FOR UPDATE SKIP LOCKED (безопасно
+      при нескольких воркерах) и сразу помечает их SENDING короткой транзакцией
+    - отправляет их вне транзакции через одно постоянное SMTP-соединение и
+      записывает результат каждого письма отдельным коммитом; если воркер
+      умер посреди пачки, SENDING-письма забираются снова через
+      EMAIL_CLAIM_TIMEOUT_SECONDS (повторно может уйти не больше одного письма
+      на воркер - то, чей результат не успели записать)
+    - ограничивает скорость отправки (писем в секунду)
+    - при ошибке откладывает письмо с экспоненциальной задержкой,
+      после EMAIL_MAX_ATTEMPTS помечает FAILED
+    """
+
+    def __init__(self, service: EmailService, transport: Optional[SMTPTransport] = None):
+        self.service = service
+        self.transport = transport or SMTPTransport(
+            service.smtp_server, service.smtp_port, service.smtp_user, service.smtp_password, settings.SMTP_USE_TLS
+        )
+        self.batch_size = settings.EMAIL_BATCH_SIZE
+        self.max_attempts = settings.EMAIL_MAX_ATTEMPTS
+        self.retry_base_seconds = settings.EMAIL_RETRY_BASE_SECONDS
+        self.claim_timeout_seconds = settings.EMAIL_CLAIM_TIMEOUT_SECONDS
+        self.min_interval = 1.0 / settings.EMAIL_RATE_LIMIT_PER_SECOND if settings.EMAIL_RATE_LIMIT_PER_SECOND > 0 else 0.0
+        self._last_send = 0.0
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.failed = 0
+
+    def notify(self):
+        """Wake the worker up right away (called after enqueueing)."""
+        self._wakeup.set()
+
+    async def _throttle(self):
+        if self.min_interval:
+            wait = self._last_send + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+        self._last_send = time.monotonic()
 
+    async def _deliver(self, message: EmailOutbox):
+        if not self.service.enabled:
+            print(f"[EMAIL DISABLED] Would send '{message.subject}' to {message.to_email}")
+            return
+        msg = self.service.build_mime(message.to_email, message.subject, message.text_body, message.html_body)
+        await asyncio.to_thread(self.transport.send, msg)
+
+    async def _claim(self) -> List[EmailOutbox]:
+        """Mark a batch of due messages SENDING and commit right away - no locks are held while sending."""
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(EmailOutbox)
+                .where(
+                    or_(EmailOutbox.status == EmailStatus.PENDING, EmailOutbox.status == EmailStatus.SENDING),
+                    EmailOutbox.next_attempt_at <= func.now()
+                )
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            messages = result.scalars().all()
+            lease_until = datetime.now(timezone.utc) + timedelta(seconds=self.claim_timeout_seconds)
+            for message in messages:
+                message.status = EmailStatus.SENDING
+                message.attempts += 1
+                message.next_attempt_at = lease_until
+            await db.commit()
+            return list(messages)
+
+    async def _record(self, message: EmailOutbox, values: dict):
+        async with AsyncSessionLocal() as db:
+            # Только пока аренда наша: просроченное письмо мог забрать другой воркер
+            await db.execute(
+                update(EmailOutbox)
+                .where(
+                    EmailOutbox.id == message.id,
+                    EmailOutbox.status == EmailStatus.SENDING,
+                    EmailOutbox.next_attempt_at == message.next_attempt_at
+                )
+                .values(**values)
+            )
+            await db.commit()
+
+    async def process_batch(self) -> int:
+        """Send one batch of due messages. Returns number of messages processed."""
+        messages = await self._claim()
+
+        for message in messages:
+            await self._throttle()
+            try:
+                await self._deliver(message)
+            except Exception as e:
+                await asyncio.to_thread(self.transport.close)
+                print(f"Error sending email to {message.to_email}: {str(e)}")
+                if message.attempts >= self.max_attempts:
+                    values = {"status": EmailStatus.FAILED, "last_error": str(e)}
+                    self.failed += 1
+                else:
+                    delay = self.retry_base_seconds * (2 ** (message.attempts - 1))
+                    values = {
+                        "status": EmailStatus.PENDING,
+                        "last_error": str(e),
+                        "next_attempt_at": datetime.now(timezone.utc) + timedelta(seconds=delay),
+                    }
+            else:
+                values = {"status": EmailStatus.SENT, "sent_at": datetime.now(timezone.utc), "last_error": None}
+                self.sent += 1
+            await self._record(message, values)
+
+        return len(messages)
+
+    async def run(self, poll_seconds: float):
+        try:
+            while True:
+                try:
+                    processed = await self.process_batch()
+                except Exception as e:
+                    print(f"Email outbox worker error: {str(e)}")
+                    processed = 0
+                if processed:
+                    continue  # Есть еще письма - сразу берем следующую пачку
+                # Соединение не держим, пока очередь пуста
+                await asyncio.to_thread(self.transport.close)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.transport.close()
+
+
+email_service = EmailService()
+email_outbox_worker = EmailOutboxWorker(email_service)
@@ -0,0 +1,87 @@
+"""
+Хелперы для ревизий Alembic (migrations/versions).
+
+CREATE INDEX CONCURRENTLY не блокирует запись в таблицу, но не может идти
+внутри транзакции - поэтому выполняется в autocommit_block. Если такая
+сборка прервалась, в БД остается INVALID-индекс с тем же именем; перед
+повторной сборкой он удаляется, иначе IF NOT EXISTS молча его оставит.
+
+Остальные хелперы - DDL с IF NOT EXISTS: ревизия должна проходить и на базе,
+где таблицы и колонки уже создал create_all (DB_CREATE_ALL_ON_STARTUP).
+
+    from app.core.migrations import create_index_concurrently
+
+    def upgrade():
+        create_index_concurrently("ix_orders_status", "orders", ["status"])
+"""
+from typing import List, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy import text
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+
+def _drop_invalid_index(name: str):
+    if op.get_context().as_sql:
+        return  # Offline (--sql): БД недоступна, проверять нечего
+    invalid = op.get_bind().execute(
+        text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ),
+        {"name": name},
+    ).first()
+    if invalid:
+        op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def create_index_concurrently(name: str, table: str, columns: List[Union[str, object]], **kw):
+    """Online index build (no write lock), idempotent."""
+    with op.get_context().autocommit_block():
+        _drop_invalid_index(name)
+        op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True, **kw)
+
+
+def drop_index_concurrently(name: str, table: str):
+    with op.get_context().autocommit_block():
+        op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+
+
+def create_enum_if_not_exists(name: str, values: List[str]):
+    """CREATE TYPE ... AS ENUM; columns then use postgresql.ENUM(..., create_type=False)."""
+    labels = ", ".join(f"'{value}'" for value in values)
+    op.execute(
+        f"DO $$ BEGIN CREATE TYPE {name} AS ENUM ({labels}); "
+        f"EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+    )
+
+
+def create_table_if_not_exists(name: str, *elements):
+    """CREATE TABLE IF NOT EXISTS plus its indexes (including GeoAlchemy2 idx_<table>_<column>)."""
+    metadata = sa.MetaData()
+    # Внешние ключи ссылаются на существующие таблицы - достаточно заглушек с нужными колонками
+    for element in elements:
+        if isinstance(element, sa.ForeignKeyConstraint):
+            for fk in element.elements:
+                ref_table, ref_column = fk.target_fullname.split(".")
+                if ref_table not in metadata.tables:
+                    sa.Table(ref_table, metadata, sa.Column(ref_column, sa.Integer, primary_key=True))
+    table = sa.Table(name, metadata, *elements)
+    op.execute(CreateTable(table, if_not_exists=True))
+    for index in sorted(table.indexes, key=lambda i: i.name):
+        op.execute(CreateIndex(index, if_not_exists=True))
+
+
+def add_column_if_not_exists(table: str, column: sa.Column):
+    sa.Table(table, sa.MetaData(), column)
+    spec = CreateColumn(column).compile(dialect=op.get_context().dialect)
+    op.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {spec}")
+
+
+def add_unique_constraint_using_index(name: str, table: str):
+    """Attach a unique index built concurrently as a constraint (short lock, no table scan)."""
+    op.execute(
+        f"DO $$ BEGIN IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = '{name}') THEN "
+        f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}; END IF; END $$"
+    )
@@ -0,0 +1,113 @@
+"""
+Локальная SMTP-заглушка для тестов и разработки.
+
+Принимает письма по SMTP и складывает их в память (без TLS и авторизации).
+Запуск отдельно:
+
+    python -m app.core.smtp_stub --port 1025
+
+и в .env:
+
+    EMAIL_ENABLED=True
+    SMTP_SERVER=localhost
+    SMTP_PORT=1025
+    SMTP_USE_TLS=False
+"""
+import argparse
+import asyncio
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+
+@dataclass
+class ReceivedMessage:
+    mail_from: str
+    rcpt_to: List[str]
+    data: str
+
+
+@dataclass
+class LocalSMTPStub:
+    host: str = "127.0.0.1"
+    port: int = 1025
+    messages: List[ReceivedMessage] = field(default_factory=list)
+    connections: int = 0
+    _server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        # port=0 -> берем реально выданный порт
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+
+        async def reply(line: str):
+            writer.write((line + "\r\n").encode())
+            await writer.drain()
+
+        await reply("220 localhost LogiTrack SMTP stub")
+        mail_from, rcpt_to = "", []
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    break
+                line = raw.decode(errors="replace").rstrip("\r\n")
+                command = line[:4].upper()
+
+                if command in ("HELO", "EHLO"):
+                    await reply("250 localhost")
+                elif command == "MAIL":
+                    mail_from, rcpt_to = line.split(":", 1)[1].strip(), []
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    rcpt_to.append(line.split(":", 1)[1].strip())
+                    await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    lines = []
+                    while True:
+                        data_line = (await reader.readline()).decode(errors="replace")
+                        if data_line.rstrip("\r\n") == ".":
+                            break
+                        lines.append(data_line[1:] if data_line.startswith("..") else data_line)
+                    self.messages.append(ReceivedMessage(mail_from, rcpt_to, "".join(lines)))
+                    await reply("250 OK: queued")
+                elif command in ("RSET", "NOOP"):
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 Command not implemented")
+        finally:
+            writer.close()
+
+
+async def main(host: str, port: int):
+    stub = LocalSMTPStub(host=host, port=port)
+    await stub.start()
+    print(f"SMTP stub listening on {stub.host}:{stub.port}")
+    try:
+        while True:
+            count = len(stub.messages)
+            await asyncio.sleep(1)
+            for message in stub.messages[count:]:
+                print(f"Received message from {message.mail_from} to {', '.join(message.rcpt_to)} ({len(message.data)} bytes)")
+    finally:
+        await stub.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP stub")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.port))
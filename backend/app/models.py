@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Boolean, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, Date, DateTime, Enum, Boolean, Text, Index, Computed, UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR, JSONB
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 from geoalchemy2 import Geometry
 from app.core.database import Base
 import enum
@@ -34,6 +35,24 @@ class MaintenanceStatus(str, enum.Enum):
     COMPLETED = "COMPLETED"
 
 
+class GeofenceKind(str, enum.Enum):
+    DEPOT = "DEPOT"
+    CUSTOMER_SITE = "CUSTOMER_SITE"
+    OTHER = "OTHER"
+
+
+class GeofenceEventType(str, enum.Enum):
+    ENTER = "ENTER"
+    EXIT = "EXIT"
+
+
+class EmailStatus(str, enum.Enum):
+    PENDING = "PENDING"
+    SENDING = "SENDING"  # Забрано воркером; next_attempt_at - срок аренды
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
 class User(Base):
     __tablename__ = "users"
     
@@ -67,8 +86,30 @@ class Driver(Base):
     vehicle_assignments = relationship("Vehicle", back_populates="driver", foreign_keys="Vehicle.driver_id")
 
 
+def trgm_index(name: str, column: str) -> Index:
+    """GIN trigram index (pg_trgm) - makes ILIKE '%term%' and similarity() indexable."""
+    return Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+
+
+def geography_index(name: str, column: str) -> Index:
+    """
+    GiST index on geography(column) - for metre-based ST_DWithin/ST_Distance on geography.
+    GiST по самой geometry-колонке (idx_<table>_<column>) создает GeoAlchemy2,
+    он обслуживает &&, ST_Covers и т.п. в градусах.
+    """
+    return Index(name, text(f"geography({column})"), postgresql_using="gist")
+
+
 class Vehicle(Base):
     __tablename__ = "vehicles"
+    __table_args__ = (
+        trgm_index("ix_vehicles_plate_number_trgm", "plate_number"),
+        trgm_index("ix_vehicles_vin_trgm", "vin"),
+        trgm_index("ix_vehicles_make_trgm", "make"),
+        trgm_index("ix_vehicles_model_trgm", "model"),
+        Index("ix_vehicles_updated_at", "updated_at"),
+        geography_index("ix_vehicles_current_location_geog", "current_location"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     vin = Column(String, unique=True, index=True, nullable=False)
@@ -84,6 +125,12 @@ class Vehicle(Base):
     norm_consumption = Column(Float, nullable=False)  # L/100km
     current_speed = Column(Float, default=0.0)  # km/h
     mileage = Column(Float, default=0.0)  # Total km
+    # Последняя учтенная в пробеге позиция (не дрожание) - общая для всех воркеров
+    odometer_lat = Column(Float, nullable=True)
+    odometer_lng = Column(Float, nullable=True)
+    odometer_at = Column(DateTime(timezone=True), nullable=True)
+    # Незавершенная поездка (app.services.trips.VehicleTripState) - общая для всех воркеров
+    trip_state = Column(JSONB, nullable=True)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -98,6 +145,17 @@ class Vehicle(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        trgm_index("ix_orders_customer_name_trgm", "customer_name"),
+        trgm_index("ix_orders_pickup_address_trgm", "pickup_address"),
+        trgm_index("ix_orders_delivery_address_trgm", "delivery_address"),
+        Index("ix_orders_search_vector", "search_vector", postgresql_using="gin"),
+        Index("ix_orders_vehicle_id", "vehicle_id"),
+        Index("ix_orders_customer_id", "customer_id"),
+        Index("ix_orders_updated_at", "updated_at"),
+        geography_index("ix_orders_pickup_location_geog", "pickup_location"),
+        geography_index("ix_orders_delivery_location_geog", "delivery_location"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     customer_id = Column(Integer, ForeignKey("users.id"), nullable=False)
@@ -122,9 +180,20 @@ class Order(Base):
     price = Column(Float, nullable=False)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     delivery_date = Column(DateTime(timezone=True), nullable=True)
     completed_at = Column(DateTime(timezone=True), nullable=True)
     
+    # Полнотекстовый поиск (генерируемая колонка, обновляется самой БД)
+    search_vector = Column(
+        TSVECTOR,
+        Computed(
+            "to_tsvector('simple', coalesce(customer_name, '') || ' ' || "
+            "coalesce(pickup_address, '') || ' ' || coalesce(delivery_address, ''))",
+            persisted=True
+        )
+    )
+    
     # Relationships
     customer = relationship("User", back_populates="orders", foreign_keys=[customer_id])
     vehicle = relationship("Vehicle", back_populates="orders")
@@ -182,6 +251,11 @@ class MaintenanceRecord(Base):
 
 class TrackingPoint(Base):
     __tablename__ = "tracking_points"
+    __table_args__ = (
+        # Ключ идемпотентности: повтор той же точки от устройства не создает дубль
+        UniqueConstraint("device_id", "seq", name="uq_tracking_points_device_seq"),
+        Index("ix_tracking_points_vehicle_timestamp", "vehicle_id", "timestamp"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     vehicle_id = Column(Integer, ForeignKey("vehicles.id"), nullable=False)
@@ -191,7 +265,181 @@ class TrackingPoint(Base):
     fuel_level = Column(Float, nullable=True)
     heading = Column(Float, nullable=True)  # Direction in degrees
     
+    # Идентификатор устройства и его порядковый номер точки (необязательны)
+    device_id = Column(String, nullable=True)
+    seq = Column(BigInteger, nullable=True)
+    
+    timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)  # Время фикса на устройстве
+    received_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    
+    # Relationships
+    vehicle = relationship("Vehicle", back_populates="tracking_points")
+
+class Tariff(Base):
+    __tablename__ = "tariffs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    
+    # Область действия: зона (полигон точки забора) и/или конкретный клиент.
+    # Без зоны и клиента - тариф по умолчанию.
+    zone = Column(Geometry('POLYGON', srid=4326), nullable=True)
+    customer_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    priority = Column(Integer, nullable=False, default=0)
+    
+    base_price = Column(Float, nullable=False)
+    rate_per_km = Column(Float, nullable=False)
+    rate_per_kg = Column(Float, nullable=False)
+    volumetric_divisor = Column(Integer, nullable=False, default=5000)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    customer = relationship("User", foreign_keys=[customer_id])
+
+
+class GeocodeCacheEntry(Base):
+    __tablename__ = "geocode_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    address_key = Column(String, unique=True, index=True, nullable=False)  # Нормализованный адрес
+    address = Column(String, nullable=False)  # Адрес в исходном виде (первый встреченный)
+    location = Column(Geometry('POINT', srid=4326), nullable=True)  # NULL - адрес не найден
+    provider = Column(String, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    text_body = Column(Text, nullable=False)
+    html_body = Column(Text, nullable=True)
+    
+    status = Column(Enum(EmailStatus), default=EmailStatus.PENDING, nullable=False)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    next_attempt_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+
+
+class ChangeLogEntry(Base):
+    __tablename__ = "change_log"
+    
+    # Монотонно растущая ревизия (последовательность БД)
+    revision = Column(BigInteger, primary_key=True, autoincrement=True)
+    entity_type = Column(String, nullable=False)  # order, vehicle
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)  # created, updated, assigned, deleted
+    data = Column(JSONB, nullable=True)  # Компактный снимок изменившихся полей
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class PendingChange(Base):
+    """Изменение, записанное в транзакции автора; ревизию в change_log ему выдает sequence_changes."""
+    __tablename__ = "change_log_pending"
+    
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    entity_type = Column(String, nullable=False)
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False)
+    data = Column(JSONB, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class Geofence(Base):
+    __tablename__ = "geofences"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False)
+    kind = Column(Enum(GeofenceKind), default=GeofenceKind.OTHER, nullable=False)
+    
+    # Либо полигон (area), либо круг (center + radius_m)
+    area = Column(Geometry('POLYGON', srid=4326), nullable=True)
+    center = Column(Geometry('POINT', srid=4326), nullable=True)
+    radius_m = Column(Float, nullable=True)
+    is_active = Column(Boolean, default=True, nullable=False)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    # Relationships
+    # История событий не удаляется вместе с геозоной (RESTRICT, геозоны удаляются мягко)
+    events = relationship("GeofenceEvent", back_populates="geofence", passive_deletes="all")
+
+
+class GeofenceEvent(Base):
+    __tablename__ = "geofence_events"
+    __table_args__ = (
+        Index("ix_geofence_events_vehicle_timestamp", "vehicle_id", "timestamp"),
+        Index("ix_geofence_events_geofence_timestamp", "geofence_id", "timestamp"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    geofence_id = Column(Integer, ForeignKey("geofences.id", ondelete="RESTRICT"), nullable=False)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id", ondelete="CASCADE"), nullable=False)
+    event_type = Column(Enum(GeofenceEventType), nullable=False)
+    location = Column(Geometry('POINT', srid=4326), nullable=True)
     timestamp = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     
     # Relationships
-    vehicle = relationship("Vehicle", back_populates="tracking_points")
\ No newline at end of file
+    geofence = relationship("Geofence", back_populates="events")
+
+
+class Trip(Base):
+    """Сводка поездки, восстановленная из потока точек трекинга."""
+    __tablename__ = "trips"
+    __table_args__ = (
+        Index("ix_trips_vehicle_started_at", "vehicle_id", "started_at"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    vehicle_id = Column(Integer, ForeignKey("vehicles.id", ondelete="CASCADE"), nullable=False)
+    
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    ended_at = Column(DateTime(timezone=True), nullable=False)
+    start_location = Column(Geometry('POINT', srid=4326), nullable=True)
+    end_location = Column(Geometry('POINT', srid=4326), nullable=True)
+    
+    distance_km = Column(Float, nullable=False, default=0.0)
+    max_speed = Column(Float, nullable=False, default=0.0)  # km/h
+    avg_speed = Column(Float, nullable=False, default=0.0)  # km/h, по времени в движении
+    idle_seconds = Column(Float, nullable=False, default=0.0)  # Короткие стоянки внутри поездки
+    point_count = Column(Integer, nullable=False, default=0)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class HeatmapCell(Base):
+    """Дневной агрегат точек трекинга по ячейке сетки базового уровня (см. app.services.heatmap)."""
+    __tablename__ = "heatmap_cells"
+    
+    day = Column(Date, primary_key=True)
+    cell_x = Column(Integer, primary_key=True)
+    cell_y = Column(Integer, primary_key=True)
+    
+    point_count = Column(Integer, nullable=False, default=0)
+    speed_sum = Column(Float, nullable=False, default=0.0)
+    dwell_seconds = Column(Float, nullable=False, default=0.0)  # Время до следующей точки машины
+    idle_seconds = Column(Float, nullable=False, default=0.0)  # То же, но на скорости ниже порога движения
+
+
+class HeatmapDay(Base):
+    """Дни, для которых heatmap_cells уже посчитаны."""
+    __tablename__ = "heatmap_days"
+    
+    day = Column(Date, primary_key=True)
+    point_count = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -1,6 +1,6 @@
-from pydantic import BaseModel, EmailStr, Field, ConfigDict
-from typing import Optional, List
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, ConfigDict, model_validator
+from typing import Optional, List, Any, Dict
+from datetime import date, datetime
 from enum import Enum
 
 
@@ -32,6 +32,17 @@ class MaintenanceStatus(str, Enum):
     COMPLETED = "COMPLETED"
 
 
+class GeofenceKind(str, Enum):
+    DEPOT = "DEPOT"
+    CUSTOMER_SITE = "CUSTOMER_SITE"
+    OTHER = "OTHER"
+
+
+class GeofenceEventType(str, Enum):
+    ENTER = "ENTER"
+    EXIT = "EXIT"
+
+
 # Coordinates helper
 class Coordinates(BaseModel):
     lat: float
@@ -158,6 +169,8 @@ class OrderCalculateResponse(BaseModel):
     distance_km: float
     volume_m3: float
     chargeable_weight: float
+    tariff_id: Optional[int] = None
+    tariff_name: Optional[str] = None
 
 # Схема для назначения водителя
 class OrderAssignRequest(BaseModel):
@@ -167,7 +180,8 @@ class OrderCreate(BaseModel):
     customer_name: str
     pickup_address: str
     delivery_address: str
-    price: float
+    # Цена и расстояние считаются на сервере; поля оставлены для совместимости и игнорируются
+    price: Optional[float] = None
     
     # Геоданные
     pickup_location: Optional[Coordinates] = None
@@ -178,7 +192,7 @@ class OrderCreate(BaseModel):
     length: float
     width: float
     height: float
-    distance_km: float
+    distance_km: Optional[float] = None
     
     delivery_date: Optional[datetime] = None
 
@@ -190,6 +204,13 @@ class OrderUpdate(BaseModel):
     price: Optional[float] = None
 
 
+class OrderEta(BaseModel):
+    remaining_km: float
+    speed_kmh: float
+    eta: datetime
+    updated_at: datetime
+
+
 class OrderResponse(BaseModel):
     id: int
     customer_id: int
@@ -210,6 +231,173 @@ class OrderResponse(BaseModel):
     delivery_date: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     vehicle: Optional[VehicleResponse] = None
+    eta: Optional[OrderEta] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============ TARIFF SCHEMAS ============
+class TariffCreate(BaseModel):
+    name: str
+    zone: Optional[List[Coordinates]] = Field(None, description="Полигон зоны забора груза")
+    customer_id: Optional[int] = None
+    priority: int = 0
+    base_price: float = Field(ge=0)
+    rate_per_km: float = Field(ge=0)
+    rate_per_kg: float = Field(ge=0)
+    volumetric_divisor: int = Field(5000, gt=0)
+    is_active: bool = True
+
+
+class TariffUpdate(BaseModel):
+    name: Optional[str] = None
+    zone: Optional[List[Coordinates]] = None
+    customer_id: Optional[int] = None
+    priority: Optional[int] = None
+    base_price: Optional[float] = Field(None, ge=0)
+    rate_per_km: Optional[float] = Field(None, ge=0)
+    rate_per_kg: Optional[float] = Field(None, ge=0)
+    volumetric_divisor: Optional[int] = Field(None, gt=0)
+    is_active: Optional[bool] = None
+
+
+class TariffResponse(BaseModel):
+    id: int
+    name: str
+    zone: Optional[List[Coordinates]] = None
+    customer_id: Optional[int] = None
+    priority: int
+    base_price: float
+    rate_per_km: float
+    rate_per_kg: float
+    volumetric_divisor: int
+    is_active: bool
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+# ============ GEOCODING SCHEMAS ============
+class GeocodeBatchRequest(BaseModel):
+    addresses: List[str] = Field(..., max_length=1000)
+
+
+class GeocodeResult(BaseModel):
+    address: str
+    location: Optional[Coordinates] = None
+    found: bool
+
+
+# ============ SEARCH SCHEMAS ============
+class SearchHit(BaseModel):
+    type: str  # order, vehicle
+    id: int
+    title: str
+    subtitle: Optional[str] = None
+    status: Optional[str] = None
+
+
+class SearchResponse(BaseModel):
+    orders: List[SearchHit] = []
+    vehicles: List[SearchHit] = []
+
+
+# ============ CHANGE FEED SCHEMAS ============
+class ChangeEntry(BaseModel):
+    revision: int
+    entity_type: str
+    entity_id: int
+    action: str
+    data: Optional[Dict[str, Any]] = None
+    created_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ChangeFeedResponse(BaseModel):
+    changes: List[ChangeEntry]
+    revision: int  # Передать как since в следующем запросе
+    has_more: bool
+
+
+# ============ SPATIAL QUERY SCHEMAS ============
+class OrderPointKind(str, Enum):
+    PICKUP = "pickup"
+    DELIVERY = "delivery"
+
+
+class SpatialPolygonQuery(BaseModel):
+    polygon: List[Coordinates] = Field(..., min_length=3)
+    status: Optional[VehicleStatus] = None
+
+
+class SpatialCorridorQuery(BaseModel):
+    path: List[Coordinates] = Field(..., min_length=2, description="Линия маршрута")
+    width_m: float = Field(..., gt=0, le=50000, description="Расстояние от линии, м")
+    point: OrderPointKind = OrderPointKind.DELIVERY
+    active_only: bool = True
+
+
+class SpatialOrderResponse(BaseModel):
+    id: int
+    status: OrderStatus
+    customer_name: str
+    pickup_address: str
+    delivery_address: str
+    vehicle_id: Optional[int] = None
+    location: Coordinates  # Точка, по которой шел поиск (забор или доставка)
+    distance_m: float
+    route_fraction: Optional[float] = None  # Для коридора: положение вдоль линии, 0..1
+
+
+class SpatialVehicleResponse(BaseModel):
+    id: int
+    plate_number: str
+    status: VehicleStatus
+    location: Coordinates
+    current_speed: Optional[float] = None
+
+
+# ============ GEOFENCE SCHEMAS ============
+class GeofenceCreate(BaseModel):
+    name: str
+    kind: GeofenceKind = GeofenceKind.OTHER
+    area: Optional[List[Coordinates]] = Field(None, description="Полигон (для круга не указывать)")
+    center: Optional[Coordinates] = None
+    radius_m: Optional[float] = Field(None, gt=0)
+    is_active: bool = True
+
+
+class GeofenceUpdate(BaseModel):
+    name: Optional[str] = None
+    kind: Optional[GeofenceKind] = None
+    area: Optional[List[Coordinates]] = None
+    center: Optional[Coordinates] = None
+    radius_m: Optional[float] = Field(None, gt=0)
+    is_active: Optional[bool] = None
+
+
+class GeofenceResponse(BaseModel):
+    id: int
+    name: str
+    kind: GeofenceKind
+    area: Optional[List[Coordinates]] = None
+    center: Optional[Coordinates] = None
+    radius_m: Optional[float] = None
+    is_active: bool
+    created_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class GeofenceEventResponse(BaseModel):
+    id: int
+    geofence_id: int
+    vehicle_id: int
+    event_type: GeofenceEventType
+    location: Optional[Coordinates] = None
+    timestamp: datetime
     
     model_config = ConfigDict(from_attributes=True)
 
@@ -276,6 +464,31 @@ class TrackingPointCreate(BaseModel):
     speed: float = 0.0
     fuel_level: Optional[float] = None
     heading: Optional[float] = None
+    timestamp: Optional[datetime] = Field(None, description="Время фикса на устройстве (по умолчанию - время приема)")
+    device_id: Optional[str] = Field(None, max_length=64, description="Идентификатор устройства (IMEI и т.п.)")
+    seq: Optional[int] = Field(None, ge=0, description="Порядковый номер точки на устройстве")
+    
+    @model_validator(mode="after")
+    def check_idempotency_key(self):
+        if (self.device_id is None) != (self.seq is None):
+            raise ValueError("device_id and seq must be provided together")
+        return self
+
+
+class TrackingPointBatchCreate(BaseModel):
+    points: List[TrackingPointCreate] = Field(..., min_length=1, max_length=5000)
+
+
+class TrackingPointRejection(BaseModel):
+    index: int
+    reason: str
+
+
+class TrackingPointBatchResponse(BaseModel):
+    accepted: int
+    late: int
+    duplicates: int
+    rejected: List[TrackingPointRejection] = []
 
 
 class TrackingPointResponse(BaseModel):
@@ -285,12 +498,50 @@ class TrackingPointResponse(BaseModel):
     speed: float
     fuel_level: Optional[float] = None
     heading: Optional[float] = None
+    device_id: Optional[str] = None
+    seq: Optional[int] = None
     timestamp: datetime
+    received_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TripResponse(BaseModel):
+    id: int
+    vehicle_id: int
+    started_at: datetime
+    ended_at: datetime
+    start_location: Optional[Coordinates] = None
+    end_location: Optional[Coordinates] = None
+    distance_km: float
+    max_speed: float
+    avg_speed: float
+    idle_seconds: float
+    point_count: int
     
     model_config = ConfigDict(from_attributes=True)
 
 
 # ============ ANALYTICS SCHEMAS ============
+class HeatmapCellResponse(BaseModel):
+    lat: float  # Центр ячейки
+    lng: float
+    count: int
+    avg_speed: float
+    dwell_seconds: float
+    idle_seconds: float
+
+
+class HeatmapResponse(BaseModel):
+    zoom: int
+    cell_size_deg: float
+    date_from: date
+    date_to: date
+    rolled_up_days: int  # Дни из предрасчитанных агрегатов
+    live_days: int  # Дни, посчитанные по сырым точкам
+    cells: List[HeatmapCellResponse]
+
+
 class FuelAnalysisResult(BaseModel):
     vehicle_id: int
     plate_number: str
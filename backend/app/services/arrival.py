@@ -0,0 +1,158 @@
+"""
+Автоматическое завершение заказов по GPS.
+
+Если назначенная машина простояла в радиусе ARRIVAL_RADIUS_M от точки доставки
+не меньше ARRIVAL_DWELL_MINUTES, заказ переводится в COMPLETED, а машина без
+других активных заказов - в IDLE.
+
+Активные заказы машины (id + координаты доставки) кэшируются в памяти, поэтому
+обычная точка трекинга не делает запросов к БД: только сравнение расстояний.
+Кэш сбрасывается при назначении заказа (forget) и перечитывается не реже раза
+в ARRIVAL_STATE_TTL_SECONDS - так подхватываются назначения из других воркеров.
+"""
+import time
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Order, OrderStatus, Vehicle, VehicleStatus
+from app.services.changes import record_change, order_change_data, vehicle_change_data
+from app.services.pricing import calculate_haversine_distance
+
+
+@dataclass
+class ActiveDelivery:
+    order_id: int
+    lat: float
+    lng: float
+    dwell_since: Optional[datetime] = None
+
+
+class ArrivalDetector:
+    """Per-vehicle active-order cache and dwell tracking."""
+
+    def __init__(self, radius_m: float, dwell_minutes: float, state_ttl_seconds: float):
+        self.radius_km = radius_m / 1000
+        self.dwell = timedelta(minutes=dwell_minutes)
+        self.state_ttl = state_ttl_seconds
+        # vehicle_id -> (loaded_at, активные доставки)
+        self._active: Dict[int, Tuple[float, List[ActiveDelivery]]] = {}
+        self.state_loads = 0
+        self.arrivals_detected = 0
+
+    def forget(self, *vehicle_ids: Optional[int]):
+        """Drop cached state so the next point reloads active orders."""
+        for vehicle_id in vehicle_ids:
+            if vehicle_id is not None:
+                self._active.pop(vehicle_id, None)
+
+    def snapshot(self, vehicle_ids: Iterable[int]) -> dict:
+        snapshot = {}
+        for vehicle_id in vehicle_ids:
+            cached = self._active.get(vehicle_id)
+            snapshot[vehicle_id] = (cached[0], [replace(d) for d in cached[1]]) if cached else None
+        return snapshot
+
+    def restore(self, snapshot: dict):
+        """Put back dwell state taken by snapshot() (the points were not committed)."""
+        for vehicle_id, cached in snapshot.items():
+            if cached is None:
+                self._active.pop(vehicle_id, None)
+            else:
+                self._active[vehicle_id] = cached
+
+    async def _load(self, db: AsyncSession, vehicle_id: int) -> List[ActiveDelivery]:
+        result = await db.execute(
+            select(Order.id, func.ST_Y(Order.delivery_location), func.ST_X(Order.delivery_location))
+            .where(
+                Order.vehicle_id == vehicle_id,
+                Order.status == OrderStatus.IN_PROGRESS,
+                Order.delivery_location.is_not(None)
+            )
+        )
+        self.state_loads += 1
+        return [ActiveDelivery(order_id, lat, lng) for order_id, lat, lng in result.all()]
+
+    async def active_deliveries(self, db: AsyncSession, vehicle_id: int) -> List[ActiveDelivery]:
+        """In-progress deliveries of a vehicle (cached, reloaded after TTL)."""
+        now = time.monotonic()
+        cached = self._active.get(vehicle_id)
+        if cached is not None and now - cached[0] < self.state_ttl:
+            return cached[1]
+
+        deliveries = await self._load(db, vehicle_id)
+        if cached is not None:
+            # Не теряем уже накопленное время стоянки при перечитывании
+            dwell = {d.order_id: d.dwell_since for d in cached[1]}
+            for delivery in deliveries:
+                delivery.dwell_since = dwell.get(delivery.order_id)
+        self._active[vehicle_id] = (now, deliveries)
+        return deliveries
+
+    async def process(self, db: AsyncSession, vehicle_id: int, lat: float, lng: float, at: datetime) -> List[int]:
+        """Feed a position; returns ids of orders whose delivery point was reached."""
+        deliveries = await self.active_deliveries(db, vehicle_id)
+        if not deliveries:
+            return []
+
+        arrived = []
+        for delivery in deliveries:
+            if calculate_haversine_distance(lat, lng, delivery.lat, delivery.lng) > self.radius_km:
+                delivery.dwell_since = None
+                continue
+            if delivery.dwell_since is None:
+                delivery.dwell_since = at
+            if at - delivery.dwell_since >= self.dwell:
+                arrived.append(delivery.order_id)
+
+        if arrived:
+            deliveries[:] = [d for d in deliveries if d.order_id not in arrived]
+            self.arrivals_detected += len(arrived)
+        return arrived
+
+    def stats(self) -> dict:
+        return {
+            "tracked_vehicles": len(self._active),
+            "active_deliveries": sum(len(d) for _, d in self._active.values()),
+            "state_loads": self.state_loads,
+            "arrivals_detected": self.arrivals_detected,
+        }
+
+
+async def complete_arrived_orders(
+    db: AsyncSession, vehicle: Vehicle, order_ids: List[int], at: datetime
+) -> List[Order]:
+    """Mark orders COMPLETED and free the vehicle. Caller commits."""
+    result = await db.execute(
+        select(Order).where(Order.id.in_(order_ids), Order.status == OrderStatus.IN_PROGRESS)
+    )
+    orders = list(result.scalars().all())
+    for order in orders:
+        order.status = OrderStatus.COMPLETED
+        order.completed_at = at
+        await record_change(db, "order", order.id, "completed", order_change_data(order))
+
+    if orders:
+        remaining = await db.execute(
+            select(func.count(Order.id)).where(
+                Order.vehicle_id == vehicle.id,
+                Order.status == OrderStatus.IN_PROGRESS,
+                Order.id.not_in(order_ids)
+            )
+        )
+        if not remaining.scalar():
+            vehicle.status = VehicleStatus.IDLE
+            await record_change(db, "vehicle", vehicle.id, "updated", vehicle_change_data(vehicle))
+
+    return orders
+
+
+arrival_detector = ArrivalDetector(
+    settings.ARRIVAL_RADIUS_M,
+    settings.ARRIVAL_DWELL_MINUTES,
+    settings.ARRIVAL_STATE_TTL_SECONDS,
+)
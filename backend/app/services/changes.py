@@ -0,0 +1,197 @@
+"""
+Лента изменений (change feed) заказов и транспорта.
+
+Изменение записывается в change_log_pending в той же транзакции, что и само
+изменение, без блокировок. Ревизию ему выдает sequence_changes - отдельная
+короткая транзакция после коммита автора: под advisory-блокировкой она
+переносит закоммиченные записи в change_log. Поэтому ревизии коммитятся строго
+по возрастанию (клиент, прочитавший ревизию N, уже никогда не получит ревизию
+меньше N и может синхронизироваться запросом ?since=N), а блокировка не
+держится на время транзакции автора (например, пачки точек трекинга).
+
+sequence_changes вызывают авторы сразу после коммита; run_sequencer в фоне
+подбирает записи, оставленные другими процессами (шлюз) или упавшим автором.
+
+Частые обновления позиции из трекинга сюда не пишутся - для них есть
+vehicle_update в WebSocket.
+
+Записи старше CHANGE_LOG_RETENTION_DAYS удаляет run_pruner - только с начала
+ленты, без дыр, и последняя ревизия остается всегда. Клиент, у которого since
+меньше удаленного хвоста, получает 410 и загружает списки заново.
+"""
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.conditional import VersionStamp
+from app.core.database import AsyncSessionLocal
+from app.models import ChangeLogEntry, Order, PendingChange, Vehicle
+
+# Ключ advisory-блокировки, сериализующей выдачу ревизий
+CHANGE_LOG_LOCK_KEY = 0x4C54_4346  # "LTCF"
+SEQUENCE_BATCH_SIZE = 1000
+PRUNE_BATCH_SIZE = 1000
+
+
+def order_change_data(order: Order) -> dict:
+    return {
+        "status": order.status.value if order.status else None,
+        "vehicle_id": order.vehicle_id,
+        "customer_id": order.customer_id,
+        "customer_name": order.customer_name,
+        "price": order.price,
+    }
+
+
+def vehicle_change_data(vehicle: Vehicle) -> dict:
+    return {
+        "status": vehicle.status.value if vehicle.status else None,
+        "plate_number": vehicle.plate_number,
+        "driver_id": vehicle.driver_id,
+        "fuel_level": vehicle.fuel_level,
+        "mileage": vehicle.mileage,
+    }
+
+
+async def record_change(db: AsyncSession, entity_type: str, entity_id: int, action: str, data: Optional[dict] = None) -> PendingChange:
+    """Queue change for the feed. Must be called before the caller's commit; publish with sequence_changes after it."""
+    # Сначала пишем само изменение (и берем блокировки строк): у конкурирующих
+    # изменений одной сущности порядок id совпадает с порядком коммитов
+    await db.flush()
+    change = PendingChange(entity_type=entity_type, entity_id=entity_id, action=action, data=data)
+    db.add(change)
+    await db.flush([change])
+    return change
+
+
+async def sequence_changes() -> List[ChangeLogEntry]:
+    """Assign revisions to committed pending changes (short transaction of its own). Returns new entries."""
+    columns = ["entity_type", "entity_id", "action", "data", "created_at"]
+    sequenced: List[ChangeLogEntry] = []
+    async with AsyncSessionLocal() as db:
+        while True:
+            await db.execute(select(func.pg_advisory_xact_lock(CHANGE_LOG_LOCK_KEY)))
+            batch = select(PendingChange.id).order_by(PendingChange.id).limit(SEQUENCE_BATCH_SIZE).scalar_subquery()
+            moved = (
+                delete(PendingChange).where(PendingChange.id.in_(batch))
+                .returning(PendingChange.id, *(getattr(PendingChange, c) for c in columns))
+                .cte("moved")
+            )
+            entries = list((await db.scalars(
+                insert(ChangeLogEntry)
+                .from_select(columns, select(*(moved.c[c] for c in columns)).order_by(moved.c.id))
+                .returning(ChangeLogEntry)
+            )).all())
+            await db.commit()
+            sequenced.extend(sorted(entries, key=lambda entry: entry.revision))
+            if len(entries) < SEQUENCE_BATCH_SIZE:
+                return sequenced
+
+
+async def run_sequencer(interval_seconds: float, on_changes: Callable[[List[ChangeLogEntry]], Awaitable[None]]):
+    """Sequence changes left by other processes (gateway) or by a writer that failed after its commit."""
+    while True:
+        await asyncio.sleep(interval_seconds)
+        try:
+            entries = await sequence_changes()
+            if entries:
+                await on_changes(entries)
+        except Exception as e:
+            print(f"Error sequencing changes: {str(e)}")
+
+
+async def get_changes(db: AsyncSession, since: int, limit: int, entity_type: Optional[str] = None) -> Tuple[List[ChangeLogEntry], bool]:
+    """Changes with revision > since, oldest first. Returns (entries, has_more)."""
+    query = select(ChangeLogEntry).where(ChangeLogEntry.revision > since)
+    if entity_type:
+        query = query.where(ChangeLogEntry.entity_type == entity_type)
+    query = query.order_by(ChangeLogEntry.revision).limit(limit + 1)
+    entries = list((await db.execute(query)).scalars().all())
+    return entries[:limit], len(entries) > limit
+
+
+async def get_latest_revision(db: AsyncSession) -> int:
+    result = await db.execute(select(func.coalesce(func.max(ChangeLogEntry.revision), 0)))
+    return int(result.scalar() or 0)
+
+
+async def change_log_stamp(db: AsyncSession) -> VersionStamp:
+    """
+    Version of everything recorded in the feed (ETag part). Revisions are
+    committed in order; a committed but not yet sequenced change is counted in
+    change_log_pending, and sequencing it raises the revision.
+    """
+    row = (await db.execute(select(
+        select(func.coalesce(func.max(ChangeLogEntry.revision), 0)).scalar_subquery(),
+        select(func.count(PendingChange.id)).scalar_subquery(),
+    ))).one()
+    return VersionStamp(("change_log",) + tuple(row))
+
+
+async def get_oldest_revision(db: AsyncSession) -> Optional[int]:
+    """Oldest retained revision (None if the log is empty)."""
+    return await db.scalar(select(func.min(ChangeLogEntry.revision)))
+
+
+def is_resync_required(since: int, oldest_revision: Optional[int]) -> bool:
+    """Changes after `since` were partly pruned: the client must reload full lists."""
+    return oldest_revision is not None and since < oldest_revision - 1
+
+
+def prune_boundary(rows: Sequence[Tuple[int, datetime]], cutoff: datetime, latest: int) -> Optional[int]:
+    """Last revision of the leading run of (revision, created_at) rows older than cutoff, keeping `latest`."""
+    boundary = None
+    for revision, created_at in rows:
+        if revision >= latest or created_at is None or created_at >= cutoff:
+            break
+        boundary = revision
+    return boundary
+
+
+async def prune_changes(retention_days: int, now: Optional[datetime] = None) -> int:
+    """Delete changes older than retention_days from the head of the log. Returns deleted count."""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=retention_days)
+    deleted = 0
+    async with AsyncSessionLocal() as db:
+        while True:
+            latest = await get_latest_revision(db)
+            rows = (await db.execute(
+                select(ChangeLogEntry.revision, ChangeLogEntry.created_at)
+                .order_by(ChangeLogEntry.revision).limit(PRUNE_BATCH_SIZE)
+            )).all()
+            boundary = prune_boundary(rows, cutoff, latest)
+            if boundary is None:
+                return deleted
+            result = await db.execute(delete(ChangeLogEntry).where(ChangeLogEntry.revision <= boundary))
+            await db.commit()
+            deleted += result.rowcount
+            if boundary != rows[-1][0]:
+                return deleted
+
+
+async def run_pruner(interval_seconds: float, retention_days: int):
+    """Periodically delete changes older than the retention period."""
+    while True:
+        try:
+            deleted = await prune_changes(retention_days)
+            if deleted:
+                print(f"Change log pruned {deleted} entries")
+        except Exception as e:
+            print(f"Error pruning change log: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+
+def change_message(entry: ChangeLogEntry) -> str:
+    """WebSocket frame for a change."""
+    return json.dumps({
+        "type": "change",
+        "revision": entry.revision,
+        "entity_type": entry.entity_type,
+        "entity_id": entry.entity_id,
+        "action": entry.action,
+        "data": entry.data,
+    })
@@ -0,0 +1,235 @@
+"""
+Провайдеры расстояний для ценообразования и диспетчеризации.
+
+- HaversineDistanceProvider - расстояние по прямой (по умолчанию)
+- RoadGraphDistanceProvider - расстояние по дорожному графу из локального файла (A*)
+- CachedDistanceProvider - LRU/TTL кэш поверх любого провайдера
+"""
+import heapq
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.pricing import calculate_haversine_distance
+
+
+class DistanceProvider:
+    """Base class for distance providers. Result is always in kilometers."""
+
+    name = "base"
+
+    def distance_km(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        raise NotImplementedError
+
+
+class HaversineDistanceProvider(DistanceProvider):
+    """Straight-line distance."""
+
+    name = "haversine"
+
+    def distance_km(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        return calculate_haversine_distance(lat1, lon1, lat2, lon2)
+
+
+class RoadGraphDistanceProvider(DistanceProvider):
+    """
+    Расстояние по дорожной сети из предобработанного JSON-файла:
+
+        {
+            "nodes": [[node_id, lat, lng], ...],
+            "edges": [[from_id, to_id, length_km, oneway], ...]
+        }
+
+    `oneway` необязателен (по умолчанию ребро двунаправленное).
+    Точки привязываются к ближайшему узлу через сеточный индекс, маршрут
+    ищется алгоритмом A* с гаверсинусом в качестве эвристики.
+    Если узел не найден или граф несвязен - возвращаем расстояние по прямой.
+    """
+
+    name = "road_graph"
+
+    def __init__(self, graph_path: str, snap_radius_km: float = 5.0, grid_size_deg: float = 0.05):
+        self.graph_path = graph_path
+        self.snap_radius_km = snap_radius_km
+        self.grid_size_deg = grid_size_deg
+        self.fallback = HaversineDistanceProvider()
+
+        self.nodes: Dict[int, Tuple[float, float]] = {}
+        self.adjacency: Dict[int, List[Tuple[int, float]]] = {}
+        self.grid: Dict[Tuple[int, int], List[int]] = {}
+        self._load()
+
+    def _load(self):
+        with open(self.graph_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        for node_id, lat, lng in data.get("nodes", []):
+            self.nodes[node_id] = (lat, lng)
+            self.adjacency[node_id] = []
+            self.grid.setdefault(self._cell(lat, lng), []).append(node_id)
+
+        for edge in data.get("edges", []):
+            u, v, length_km = edge[0], edge[1], float(edge[2])
+            oneway = bool(edge[3]) if len(edge) > 3 else False
+            if u not in self.nodes or v not in self.nodes:
+                continue
+            self.adjacency[u].append((v, length_km))
+            if not oneway:
+                self.adjacency[v].append((u, length_km))
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.grid_size_deg)), int(math.floor(lng / self.grid_size_deg)))
+
+    def nearest_node(self, lat: float, lng: float) -> Optional[int]:
+        """Find nearest graph node within snap radius."""
+        # Сколько ячеек сетки покрывает радиус привязки (1° широты ~ 111 км)
+        cos_lat = max(math.cos(math.radians(lat)), 0.01)
+        lat_rings = int(math.ceil(self.snap_radius_km / (111.0 * self.grid_size_deg)))
+        lng_rings = int(math.ceil(self.snap_radius_km / (111.0 * cos_lat * self.grid_size_deg)))
+        c_lat, c_lng = self._cell(lat, lng)
+
+        best_node, best_dist = None, self.snap_radius_km
+        for d_lat in range(-lat_rings, lat_rings + 1):
+            for d_lng in range(-lng_rings, lng_rings + 1):
+                for node_id in self.grid.get((c_lat + d_lat, c_lng + d_lng), ()):
+                    n_lat, n_lng = self.nodes[node_id]
+                    dist = calculate_haversine_distance(lat, lng, n_lat, n_lng)
+                    if dist <= best_dist:
+                        best_node, best_dist = node_id, dist
+        return best_node
+
+    def shortest_path_km(self, source: int, target: int) -> Optional[float]:
+        """A* search between two graph nodes."""
+        if source == target:
+            return 0.0
+        t_lat, t_lng = self.nodes[target]
+
+        def heuristic(node_id: int) -> float:
+            n_lat, n_lng = self.nodes[node_id]
+            return calculate_haversine_distance(n_lat, n_lng, t_lat, t_lng)
+
+        best: Dict[int, float] = {source: 0.0}
+        queue = [(heuristic(source), 0.0, source)]
+        while queue:
+            _, cost, node_id = heapq.heappop(queue)
+            if node_id == target:
+                return cost
+            if cost > best.get(node_id, math.inf):
+                continue
+            for neighbour, length_km in self.adjacency[node_id]:
+                new_cost = cost + length_km
+                if new_cost < best.get(neighbour, math.inf):
+                    best[neighbour] = new_cost
+                    heapq.heappush(queue, (new_cost + heuristic(neighbour), new_cost, neighbour))
+        return None
+
+    def distance_km(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        source = self.nearest_node(lat1, lon1)
+        target = self.nearest_node(lat2, lon2)
+        if source is None or target is None:
+            return self.fallback.distance_km(lat1, lon1, lat2, lon2)
+
+        path_km = self.shortest_path_km(source, target)
+        if path_km is None:
+            return self.fallback.distance_km(lat1, lon1, lat2, lon2)
+
+        # Добавляем подъезд от точки до узла графа и от узла до точки
+        s_lat, s_lng = self.nodes[source]
+        t_lat, t_lng = self.nodes[target]
+        return (
+            calculate_haversine_distance(lat1, lon1, s_lat, s_lng)
+            + path_km
+            + calculate_haversine_distance(t_lat, t_lng, lat2, lon2)
+        )
+
+
+class CachedDistanceProvider(DistanceProvider):
+    """LRU cache with TTL in front of another provider, keyed on rounded coordinates.
+
+    Вызывается из потоков (asyncio.to_thread), поэтому операции с OrderedDict и
+    счетчиками - под блокировкой; сам расчет провайдера идет без нее.
+    """
+
+    def __init__(self, provider: DistanceProvider, max_size: int = 10000, ttl_seconds: float = 3600, precision: int = 4):
+        self.provider = provider
+        self.name = provider.name
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.precision = precision
+        self._cache: "OrderedDict[tuple, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, lat1: float, lon1: float, lat2: float, lon2: float) -> tuple:
+        p = self.precision
+        return (round(lat1, p), round(lon1, p), round(lat2, p), round(lon2, p))
+
+    def distance_km(self, lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+        key = self._key(lat1, lon1, lat2, lon2)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None and entry[1] > now:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = self.provider.distance_km(*key)
+        with self._lock:
+            self._cache[key] = (value, now + self.ttl_seconds)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "provider": self.name,
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_distance_provider: Optional[DistanceProvider] = None
+
+
+def create_distance_provider() -> DistanceProvider:
+    """Build provider from settings."""
+    if settings.DISTANCE_PROVIDER == "road_graph" and settings.ROAD_GRAPH_PATH:
+        provider: DistanceProvider = RoadGraphDistanceProvider(
+            settings.ROAD_GRAPH_PATH,
+            snap_radius_km=settings.ROAD_GRAPH_SNAP_RADIUS_KM,
+        )
+    else:
+        provider = HaversineDistanceProvider()
+
+    if settings.DISTANCE_CACHE_SIZE > 0:
+        provider = CachedDistanceProvider(
+            provider,
+            max_size=settings.DISTANCE_CACHE_SIZE,
+            ttl_seconds=settings.DISTANCE_CACHE_TTL_SECONDS,
+            precision=settings.DISTANCE_CACHE_PRECISION,
+        )
+    return provider
+
+
+def get_distance_provider() -> DistanceProvider:
+    """Get process-wide distance provider (created lazily)."""
+    global _distance_provider
+    if _distance_provider is None:
+        _distance_provider = create_distance_provider()
+    return _distance_provider
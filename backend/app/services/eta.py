@@ -0,0 +1,193 @@
+"""
+ETA заказов в пути.
+
+На каждую точку трекинга:
+- обновляется скользящая (EWMA) оценка скорости машины - по скорости из
+  точки или, если ее нет, по смещению между соседними точками
+- для активных заказов машины пересчитывается оставшееся расстояние до точки
+  доставки (гаверсинус с коэффициентом извилистости или провайдер расстояний)
+  и ETA
+
+Наружу (WebSocket) ETA публикуется, только если изменилась заметно: не меньше
+ETA_MIN_CHANGE_SECONDS и не меньше ETA_MIN_CHANGE_RATIO от оставшегося времени.
+Все состояние - в памяти процесса; активные заказы берутся из кэша
+arrival_detector, поэтому пересчет не делает запросов к БД. Расстояния по
+дорожному графу (ETA_USE_DISTANCE_PROVIDER) считаются в потоке (asyncio.to_thread),
+одним вызовом на точку, - A* не блокирует event loop.
+
+Оценки заказов, которые ушли из активных заказов машины (отмена, переназначение,
+завершение вручную или другим воркером), удаляются на следующей точке машины.
+"""
+import asyncio
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.arrival import ActiveDelivery
+from app.services.distance import DistanceProvider, get_distance_provider
+from app.services.pricing import calculate_haversine_distance
+
+
+@dataclass
+class EtaEstimate:
+    order_id: int
+    vehicle_id: int
+    remaining_km: float
+    speed_kmh: float
+    eta: datetime
+    updated_at: datetime
+    version: int = 0  # Растет при каждой публикации
+
+    def to_dict(self) -> dict:
+        return {
+            "order_id": self.order_id,
+            "vehicle_id": self.vehicle_id,
+            "remaining_km": round(self.remaining_km, 2),
+            "speed_kmh": round(self.speed_kmh, 1),
+            "eta": self.eta.isoformat(),
+            "updated_at": self.updated_at.isoformat(),
+        }
+
+
+class EtaEngine:
+    """Rolling per-vehicle speed and per-order ETA, recomputed incrementally per point."""
+
+    def __init__(
+        self,
+        speed_alpha: float,
+        min_speed_kmh: float,
+        default_speed_kmh: float,
+        detour_factor: float,
+        min_change_seconds: float,
+        min_change_ratio: float,
+        distance_provider: Optional[DistanceProvider] = None,
+    ):
+        self.speed_alpha = speed_alpha
+        self.min_speed_kmh = min_speed_kmh
+        self.default_speed_kmh = default_speed_kmh
+        self.detour_factor = detour_factor
+        self.min_change_seconds = min_change_seconds
+        self.min_change_ratio = min_change_ratio
+        self.distance_provider = distance_provider
+        # vehicle_id -> (скорость EWMA, lat, lng, время последней точки)
+        self._vehicles: Dict[int, Tuple[float, float, float, datetime]] = {}
+        # order_id -> последняя рассчитанная оценка / последняя опубликованная
+        self._current: Dict[int, EtaEstimate] = {}
+        self._published: Dict[int, EtaEstimate] = {}
+        # vehicle_id -> заказы, по которым машина считала ETA на прошлой точке
+        self._vehicle_orders: Dict[int, Set[int]] = {}
+        self.recomputed = 0
+        self.published = 0
+
+    def _update_speed(self, vehicle_id: int, lat: float, lng: float, speed: Optional[float], at: datetime) -> float:
+        previous = self._vehicles.get(vehicle_id)
+        sample = speed if speed and speed > 0 else None
+        if sample is None and previous is not None:
+            elapsed_h = (at - previous[3]).total_seconds() / 3600
+            if elapsed_h > 0:
+                sample = calculate_haversine_distance(previous[1], previous[2], lat, lng) / elapsed_h
+
+        if previous is None:
+            estimate = sample if sample is not None else self.default_speed_kmh
+        elif sample is None:
+            estimate = previous[0]
+        else:
+            estimate = previous[0] + self.speed_alpha * (sample - previous[0])
+
+        self._vehicles[vehicle_id] = (estimate, lat, lng, at)
+        return estimate
+
+    def _road_distances(self, lat: float, lng: float, deliveries: List[ActiveDelivery]) -> List[float]:
+        return [self.distance_provider.distance_km(lat, lng, d.lat, d.lng) for d in deliveries]
+
+    async def _remaining_km(self, lat: float, lng: float, deliveries: List[ActiveDelivery]) -> List[float]:
+        if self.distance_provider is not None:
+            return await asyncio.to_thread(self._road_distances, lat, lng, deliveries)
+        return [calculate_haversine_distance(lat, lng, d.lat, d.lng) * self.detour_factor for d in deliveries]
+
+    def _forget_left_orders(self, vehicle_id: int, order_ids: Set[int]):
+        """Drop estimates of orders that are no longer active for the vehicle."""
+        for order_id in self._vehicle_orders.get(vehicle_id, set()) - order_ids:
+            estimate = self._current.get(order_id)
+            # Переназначенный заказ мог уже получить оценку от новой машины
+            if estimate is None or estimate.vehicle_id == vehicle_id:
+                self.forget_order(order_id)
+        if order_ids:
+            self._vehicle_orders[vehicle_id] = order_ids
+        else:
+            self._vehicle_orders.pop(vehicle_id, None)
+
+    def _is_meaningful(self, previous: Optional[EtaEstimate], estimate: EtaEstimate) -> bool:
+        if previous is None:
+            return True
+        delta = abs((estimate.eta - previous.eta).total_seconds())
+        remaining = max((estimate.eta - estimate.updated_at).total_seconds(), 0)
+        return delta >= max(self.min_change_seconds, self.min_change_ratio * remaining)
+
+    async def process(
+        self,
+        vehicle_id: int,
+        lat: float,
+        lng: float,
+        speed: Optional[float],
+        at: datetime,
+        deliveries: List[ActiveDelivery],
+    ) -> List[EtaEstimate]:
+        """Feed a position; returns ETAs that changed enough to be published."""
+        speed_kmh = max(self._update_speed(vehicle_id, lat, lng, speed, at), self.min_speed_kmh)
+        deliveries = list(deliveries)
+        self._forget_left_orders(vehicle_id, {d.order_id for d in deliveries})
+
+        to_publish = []
+        for delivery, remaining_km in zip(deliveries, await self._remaining_km(lat, lng, deliveries)):
+            estimate = EtaEstimate(
+                order_id=delivery.order_id,
+                vehicle_id=vehicle_id,
+                remaining_km=remaining_km,
+                speed_kmh=speed_kmh,
+                eta=at + timedelta(hours=remaining_km / speed_kmh),
+                updated_at=at,
+            )
+            self.recomputed += 1
+            previous = self._published.get(delivery.order_id)
+            if self._is_meaningful(previous, estimate):
+                estimate.version = previous.version + 1 if previous else 1
+                self._published[delivery.order_id] = estimate
+                to_publish.append(estimate)
+                self.published += 1
+            else:
+                estimate.version = previous.version
+            self._current[delivery.order_id] = estimate
+        return to_publish
+
+    def get(self, order_id: int) -> Optional[EtaEstimate]:
+        return self._current.get(order_id)
+
+    def forget_order(self, *order_ids: int):
+        for order_id in order_ids:
+            self._current.pop(order_id, None)
+            self._published.pop(order_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "tracked_vehicles": len(self._vehicles),
+            "orders_with_eta": len(self._current),
+            "recomputed": self.recomputed,
+            "published": self.published,
+        }
+
+
+def create_eta_engine() -> EtaEngine:
+    return EtaEngine(
+        speed_alpha=settings.ETA_SPEED_ALPHA,
+        min_speed_kmh=settings.ETA_MIN_SPEED_KMH,
+        default_speed_kmh=settings.ETA_DEFAULT_SPEED_KMH,
+        detour_factor=settings.ETA_DETOUR_FACTOR,
+        min_change_seconds=settings.ETA_MIN_CHANGE_SECONDS,
+        min_change_ratio=settings.ETA_MIN_CHANGE_RATIO,
+        distance_provider=get_distance_provider() if settings.ETA_USE_DISTANCE_PROVIDER else None,
+    )
+
+
+eta_engine = create_eta_engine()
@@ -0,0 +1,285 @@
+"""
+TCP/UDP шлюз для трекеров (протокол LTP, см. app.services.telematics).
+
+Устройства держат постоянные TCP-соединения (или шлют UDP-датаграммы), точки
+декодируются без Pydantic-валидации и без отдельной сессии БД на точку и
+складываются в общий буфер. IngestBatcher сбрасывает буфер пачками в тот же
+конвейер, что и POST /tracking/points (ingest_and_commit), и только после commit
+отправляет устройству ACK - устройство может удалить точки из своей памяти.
+Если общая пачка не сохранилась, точки пишутся заново отдельной транзакцией на
+устройство: ошибка в данных одной машины не лишает ACK остальные.
+
+Запуск отдельным процессом: python gateway.py. Для рассылки по WebSocket
+подписчикам API шлюз нужно запускать внутри API (GATEWAY_EMBEDDED=True):
+состояние потоковых стадий и WebSocket-подключения живут в памяти процесса.
+"""
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from app.core.database import AsyncSessionLocal
+from app.schemas import Coordinates, TrackingPointCreate
+from app.services.ingest import IngestBatchResult, ingest_and_commit
+from app.services.telematics import (
+    ERROR_BAD_FRAME, ERROR_NOT_LOGGED_IN, FRAME_FIXES, FRAME_LOGIN, HEADER,
+    Fix, ProtocolError, decode_fixes, decode_header, decode_login, decode_udp_frame,
+    encode_ack, encode_error,
+)
+
+
+def fixes_to_points(vehicle_id: int, device_id: str, fixes) -> List[TrackingPointCreate]:
+    """Decoded fixes -> ingest input. model_construct: данные уже типизированы протоколом."""
+    points = []
+    for seq, ts, lat, lng, speed, heading, fuel in fixes:
+        points.append(TrackingPointCreate.model_construct(
+            vehicle_id=vehicle_id,
+            location=Coordinates.model_construct(lat=lat, lng=lng),
+            speed=speed,
+            heading=heading,
+            fuel_level=fuel,
+            timestamp=datetime.fromtimestamp(ts, tz=timezone.utc),
+            device_id=device_id,
+            seq=seq,
+        ))
+    return points
+
+
+def device_key(point: TrackingPointCreate) -> Tuple[int, Optional[str]]:
+    return point.vehicle_id, point.device_id
+
+
+class IngestBatcher:
+    """Collects points from many connections and flushes them in batches."""
+
+    def __init__(
+        self,
+        batch_size: int,
+        flush_interval: float,
+        max_pending: int,
+        on_batch: Optional[Callable[[IngestBatchResult], Awaitable[None]]] = None,
+    ):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.on_batch = on_batch
+        self._buffer: List[TrackingPointCreate] = []
+        self._futures: Dict[Tuple[int, Optional[str]], asyncio.Future] = {}
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self.metrics = {
+            "points_in": 0,
+            "batches": 0,
+            "points_stored": 0,
+            "duplicates": 0,
+            "rejected": 0,
+            "flush_errors": 0,
+            "device_flush_errors": 0,
+            "flush_seconds": 0.0,
+        }
+
+    async def submit(self, points: List[TrackingPointCreate]) -> asyncio.Future:
+        """Queue points of one device; returned future resolves after they are committed."""
+        # Backpressure: пока буфер полон, соединения не читают новые кадры
+        while len(self._buffer) >= self.max_pending:
+            self._space.clear()
+            await self._space.wait()
+
+        key = device_key(points[0])
+        future = self._futures.get(key)
+        if future is None:
+            future = self._futures[key] = asyncio.get_running_loop().create_future()
+        self._buffer.extend(points)
+        self.metrics["points_in"] += len(points)
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        return future
+
+    async def _ingest(self, points: List[TrackingPointCreate]) -> IngestBatchResult:
+        async with AsyncSessionLocal() as db:
+            return await ingest_and_commit(db, points)
+
+    async def _flush_per_device(
+        self, points: List[TrackingPointCreate], futures: Dict[Tuple[int, Optional[str]], asyncio.Future]
+    ) -> IngestBatchResult:
+        """Fallback after a failed batch: one transaction per device, failures stay with their device."""
+        groups: Dict[Tuple[int, Optional[str]], List[int]] = {}
+        for i, point in enumerate(points):
+            groups.setdefault(device_key(point), []).append(i)
+
+        merged = IngestBatchResult()
+        for key, indices in groups.items():
+            future = futures[key]
+            try:
+                batch = await self._ingest([points[i] for i in indices])
+            except Exception as e:
+                self.metrics["device_flush_errors"] += 1
+                print(f"Gateway batch failed for vehicle {key[0]}: {str(e)}")
+                future.set_exception(e)
+                future.exception()  # Ошибку получат ожидающие, не логируем как "never retrieved"
+                continue
+            future.set_result(batch)
+            merged.results.extend(batch.results)
+            merged.duplicates.extend(batch.duplicates)
+            merged.rejected.extend((indices[i], reason) for i, reason in batch.rejected)
+        return merged
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        points, futures = self._buffer, self._futures
+        self._buffer, self._futures = [], {}
+        self._space.set()
+
+        started = time.perf_counter()
+        try:
+            try:
+                batch = await self._ingest(points)
+            except Exception as e:
+                self.metrics["flush_errors"] += 1
+                print(f"Gateway batch failed, retrying per device: {str(e)}")
+                batch = await self._flush_per_device(points, futures)
+            else:
+                for future in futures.values():
+                    future.set_result(batch)
+        finally:
+            self.metrics["flush_seconds"] += time.perf_counter() - started
+
+        self.metrics["batches"] += 1
+        self.metrics["points_stored"] += len(batch.results)
+        self.metrics["duplicates"] += len(batch.duplicates)
+        self.metrics["rejected"] += len(batch.rejected)
+        if self.on_batch is not None:
+            try:
+                await self.on_batch(batch)
+            except Exception as e:
+                print(f"Gateway publish failed: {str(e)}")
+
+    async def run(self):
+        """Flush loop: by size or every flush_interval."""
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def stats(self) -> dict:
+        return {**self.metrics, "pending": len(self._buffer)}
+
+
+class TelematicsGateway:
+    """asyncio TCP server + UDP endpoint speaking LTP v1."""
+
+    def __init__(self, batcher: IngestBatcher):
+        self.batcher = batcher
+        self._tcp_server: Optional[asyncio.AbstractServer] = None
+        self._udp_transport: Optional[asyncio.DatagramTransport] = None
+        self._tasks: List[asyncio.Task] = []
+        self.connections = 0
+        self.frames = 0
+        self.protocol_errors = 0
+
+    async def start(self, host: str, tcp_port: int, udp_port: Optional[int] = None):
+        self._tasks.append(asyncio.create_task(self.batcher.run()))
+        self._tcp_server = await asyncio.start_server(self._handle_tcp, host, tcp_port)
+        if udp_port is not None:
+            loop = asyncio.get_running_loop()
+            self._udp_transport, _ = await loop.create_datagram_endpoint(
+                lambda: _UDPProtocol(self), local_addr=(host, udp_port)
+            )
+
+    @property
+    def tcp_port(self) -> int:
+        return self._tcp_server.sockets[0].getsockname()[1]
+
+    @property
+    def udp_port(self) -> Optional[int]:
+        return self._udp_transport.get_extra_info("sockname")[1] if self._udp_transport else None
+
+    async def stop(self):
+        if self._tcp_server is not None:
+            self._tcp_server.close()
+            await self._tcp_server.wait_closed()
+        if self._udp_transport is not None:
+            self._udp_transport.close()
+        for task in self._tasks:
+            task.cancel()
+        await self.batcher.flush()
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        vehicle_id, device_id = None, None
+        try:
+            while True:
+                frame_type, length = decode_header(await reader.readexactly(HEADER.size))
+                payload = memoryview(await reader.readexactly(length))
+                self.frames += 1
+
+                if frame_type == FRAME_LOGIN:
+                    vehicle_id, device_id = decode_login(payload)
+                    writer.write(encode_ack(0))
+                elif frame_type == FRAME_FIXES:
+                    if vehicle_id is None:
+                        writer.write(encode_error(ERROR_NOT_LOGGED_IN))
+                        break
+                    fixes = list(decode_fixes(payload))
+                    if fixes:
+                        await self._submit_and_wait(vehicle_id, device_id, fixes)
+                        writer.write(encode_ack(max(fix[0] for fix in fixes)))
+                else:
+                    raise ProtocolError(f"unexpected frame type {frame_type}")
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except ProtocolError:
+            self.protocol_errors += 1
+            writer.write(encode_error(ERROR_BAD_FRAME))
+        except Exception as e:
+            # Пачка не сохранилась - без ACK устройство переотправит точки
+            print(f"Gateway connection error: {str(e)}")
+        finally:
+            self.connections -= 1
+            writer.close()
+
+    async def _submit_and_wait(self, vehicle_id: int, device_id: str, fixes: List[Fix]):
+        future = await self.batcher.submit(fixes_to_points(vehicle_id, device_id, fixes))
+        await asyncio.shield(future)
+
+    async def handle_datagram(self, data: bytes, addr):
+        self.frames += 1
+        try:
+            vehicle_id, device_id, fixes = decode_udp_frame(data)
+            fixes = list(fixes)
+        except (ProtocolError, UnicodeDecodeError, ValueError):
+            self.protocol_errors += 1
+            return
+        if not fixes:
+            return
+        try:
+            await self._submit_and_wait(vehicle_id, device_id, fixes)
+        except Exception:
+            return
+        if self._udp_transport is not None:
+            self._udp_transport.sendto(encode_ack(max(fix[0] for fix in fixes)), addr)
+
+    def stats(self) -> dict:
+        return {
+            "connections": self.connections,
+            "frames": self.frames,
+            "protocol_errors": self.protocol_errors,
+            **self.batcher.stats(),
+        }
+
+
+class _UDPProtocol(asyncio.DatagramProtocol):
+    def __init__(self, gateway: TelematicsGateway):
+        self.gateway = gateway
+        self._tasks = set()
+
+    def datagram_received(self, data: bytes, addr):
+        task = asyncio.ensure_future(self.gateway.handle_datagram(data, addr))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
@@ -0,0 +1,213 @@
+"""
+Геокодирование адресов заказов.
+
+Порядок поиска: LRU в памяти процесса -> таблица geocode_cache -> провайдер.
+Результаты провайдера (в том числе "не найдено") сохраняются в geocode_cache,
+поэтому повторный адрес никогда не доходит до провайдера.
+"""
+import csv
+import re
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from geoalchemy2.elements import WKTElement
+from geoalchemy2.shape import to_shape
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import GeocodeCacheEntry
+
+LatLng = Tuple[float, float]
+
+# Сокращения, которые пишут по-разному: "улица"/"ул."/"ул" -> "ул"
+_ABBREVIATIONS = {
+    "улица": "ул",
+    "проспект": "пр-т",
+    "переулок": "пер",
+    "шоссе": "ш",
+    "бульвар": "б-р",
+    "площадь": "пл",
+    "дом": "д",
+    "корпус": "к",
+    "корп": "к",
+    "строение": "стр",
+    "город": "г",
+    "street": "st",
+    "avenue": "ave",
+    "road": "rd",
+}
+_PUNCTUATION = re.compile(r"[.,;:\"'()«»]+")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_address(address: str) -> str:
+    """Normalize free-text address into a stable cache key."""
+    text = address.lower().replace("ё", "е")
+    text = _PUNCTUATION.sub(" ", text)
+    tokens = [_ABBREVIATIONS.get(token, token) for token in _SPACES.split(text) if token]
+    return " ".join(tokens)
+
+
+class GeocodingProvider:
+    """Base class for geocoding providers."""
+
+    name = "base"
+    # Запоминать ли "не найдено" (для заглушки не нужно - адрес может найтись позже)
+    cache_misses = True
+
+    async def geocode(self, address: str) -> Optional[LatLng]:
+        raise NotImplementedError
+
+    async def geocode_batch(self, addresses: List[str]) -> List[Optional[LatLng]]:
+        return [await self.geocode(address) for address in addresses]
+
+
+class NullGeocodingProvider(GeocodingProvider):
+    """Provider that never finds anything (geocoding disabled)."""
+
+    name = "none"
+    cache_misses = False
+
+    async def geocode(self, address: str) -> Optional[LatLng]:
+        return None
+
+
+class GazetteerGeocodingProvider(GeocodingProvider):
+    """
+    Офлайн-справочник адресов из CSV-файла с колонками address,lat,lng.
+    Поиск по нормализованному адресу.
+    """
+
+    name = "gazetteer"
+
+    def __init__(self, path: str):
+        self.path = path
+        self.entries: Dict[str, LatLng] = {}
+        self._load()
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                try:
+                    self.entries[normalize_address(row["address"])] = (float(row["lat"]), float(row["lng"]))
+                except (KeyError, TypeError, ValueError):
+                    continue
+
+    async def geocode(self, address: str) -> Optional[LatLng]:
+        return self.entries.get(normalize_address(address))
+
+
+class GeocodingService:
+    """Cached geocoder: in-process LRU + persistent geocode_cache table + provider."""
+
+    def __init__(self, provider: GeocodingProvider, lru_size: int = 20000):
+        self.provider = provider
+        self.lru_size = lru_size
+        # Значение None в LRU означает "адрес известен, но не найден"
+        self._lru: "OrderedDict[str, Optional[LatLng]]" = OrderedDict()
+        self.lru_hits = 0
+        self.db_hits = 0
+        self.provider_calls = 0
+
+    def _lru_get(self, key: str) -> Tuple[bool, Optional[LatLng]]:
+        if key in self._lru:
+            self._lru.move_to_end(key)
+            return True, self._lru[key]
+        return False, None
+
+    def _lru_put(self, key: str, value: Optional[LatLng]):
+        self._lru[key] = value
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    async def geocode(self, db: AsyncSession, address: str) -> Optional[LatLng]:
+        """Geocode a single address. Returns (lat, lng) or None."""
+        results = await self.geocode_batch(db, [address])
+        return results[0]
+
+    async def geocode_batch(self, db: AsyncSession, addresses: Iterable[str]) -> List[Optional[LatLng]]:
+        """Geocode many addresses with one cache query and one provider batch."""
+        addresses = list(addresses)
+        keys = [normalize_address(address) for address in addresses]
+        resolved: Dict[str, Optional[LatLng]] = {}
+
+        # 1. LRU в памяти
+        missing: Dict[str, str] = {}
+        for key, address in zip(keys, addresses):
+            if not key or key in resolved or key in missing:
+                continue
+            found, value = self._lru_get(key)
+            if found:
+                self.lru_hits += 1
+                resolved[key] = value
+            else:
+                missing[key] = address
+
+        # 2. Постоянный кэш в БД
+        if missing:
+            result = await db.execute(
+                select(GeocodeCacheEntry).where(GeocodeCacheEntry.address_key.in_(list(missing)))
+            )
+            for entry in result.scalars().all():
+                value = None
+                if entry.location is not None:
+                    shape = to_shape(entry.location)
+                    value = (shape.y, shape.x)
+                resolved[entry.address_key] = value
+                self._lru_put(entry.address_key, value)
+                self.db_hits += 1
+                missing.pop(entry.address_key, None)
+
+        # 3. Провайдер - только для действительно новых адресов
+        if missing:
+            new_keys = list(missing)
+            self.provider_calls += len(new_keys)
+            values = await self.provider.geocode_batch([missing[key] for key in new_keys])
+            rows = []
+            for key, value in zip(new_keys, values):
+                resolved[key] = value
+                if value is None and not self.provider.cache_misses:
+                    continue
+                self._lru_put(key, value)
+                rows.append({
+                    "address_key": key,
+                    "address": missing[key],
+                    "location": WKTElement(f"POINT({value[1]} {value[0]})", srid=4326) if value else None,
+                    "provider": self.provider.name,
+                })
+            if rows:
+                await db.execute(
+                    insert(GeocodeCacheEntry).values(rows).on_conflict_do_nothing(index_elements=["address_key"])
+                )
+                await db.commit()
+
+        return [resolved.get(key) for key in keys]
+
+    def stats(self) -> dict:
+        return {
+            "provider": self.provider.name,
+            "lru_size": len(self._lru),
+            "lru_hits": self.lru_hits,
+            "db_hits": self.db_hits,
+            "provider_calls": self.provider_calls,
+        }
+
+
+def create_geocoding_provider() -> GeocodingProvider:
+    if settings.GEOCODER_PROVIDER == "gazetteer" and settings.GAZETTEER_PATH:
+        return GazetteerGeocodingProvider(settings.GAZETTEER_PATH)
+    return NullGeocodingProvider()
+
+
+_geocoding_service: Optional[GeocodingService] = None
+
+
+def get_geocoding_service() -> GeocodingService:
+    """Get process-wide geocoding service (created lazily)."""
+    global _geocoding_service
+    if _geocoding_service is None:
+        _geocoding_service = GeocodingService(create_geocoding_provider(), lru_size=settings.GEOCODE_CACHE_SIZE)
+    return _geocoding_service
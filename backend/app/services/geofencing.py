@@ -0,0 +1,236 @@
+"""
+Геозоны: определение въезда/выезда транспорта на пути приема GPS-точек.
+
+Геозоны загружаются из БД в неизменяемый индекс в памяти (равномерная сетка
+ячеек -> кандидаты), который подменяется целиком при изменениях. Проверка
+точки - O(кандидатов в ячейке), без запросов к БД и PostGIS:
+
+- круг: равнопромежуточная аппроксимация расстояния (точна на радиусах до десятков км)
+- полигон: подготовленная (shapely.prepare) геометрия + contains_xy
+
+Для машины, уже находящейся внутри зоны, выезд проверяется по зоне,
+расширенной на GEOFENCE_EXIT_BUFFER_M - чтобы GPS-шум на границе не давал
+серию ENTER/EXIT.
+
+Состояние "в каких зонах машина" хранится в памяти процесса. После рестарта
+первая точка машины только инициализирует состояние, событий не порождает.
+"""
+import asyncio
+import math
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+import shapely
+import shapely.affinity
+from geoalchemy2.shape import to_shape
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Geofence, GeofenceEventType, GeofenceKind
+
+METERS_PER_DEG_LAT = 110_540.0
+METERS_PER_DEG_LNG = 111_320.0
+
+
+class FenceShape:
+    """Compiled geofence geometry for fast point tests."""
+
+    __slots__ = ("id", "name", "kind", "bbox", "_center", "_cos_lat", "_r2", "_r2_exit", "_poly", "_poly_exit")
+
+    def __init__(self, fence_id: int, name: str, kind: GeofenceKind, exit_buffer_m: float,
+                 polygon=None, center: Optional[Tuple[float, float]] = None, radius_m: Optional[float] = None):
+        self.id = fence_id
+        self.name = name
+        self.kind = kind
+        self._poly = self._poly_exit = None
+        self._center = None
+        if polygon is not None:
+            exit_polygon = polygon
+            if exit_buffer_m > 0:
+                # Буфер в метрах: градус долготы короче в cos(lat) раз - расширяем
+                # в координатах, где по обеим осям градус равен METERS_PER_DEG_LAT
+                origin = polygon.centroid
+                x_scale = METERS_PER_DEG_LNG * max(math.cos(math.radians(origin.y)), 0.01) / METERS_PER_DEG_LAT
+                exit_polygon = shapely.affinity.scale(
+                    shapely.affinity.scale(polygon, xfact=x_scale, origin=origin).buffer(exit_buffer_m / METERS_PER_DEG_LAT),
+                    xfact=1 / x_scale, origin=origin,
+                )
+            shapely.prepare(polygon)
+            shapely.prepare(exit_polygon)
+            self._poly, self._poly_exit = polygon, exit_polygon
+            min_x, min_y, max_x, max_y = exit_polygon.bounds
+            self.bbox = (min_y, min_x, max_y, max_x)
+        else:
+            lat, lng = center
+            self._center = center
+            self._cos_lat = max(math.cos(math.radians(lat)), 0.01)
+            self._r2 = radius_m ** 2
+            self._r2_exit = (radius_m + exit_buffer_m) ** 2
+            d_lat = (radius_m + exit_buffer_m) / METERS_PER_DEG_LAT
+            d_lng = (radius_m + exit_buffer_m) / (METERS_PER_DEG_LNG * self._cos_lat)
+            self.bbox = (lat - d_lat, lng - d_lng, lat + d_lat, lng + d_lng)
+
+    def contains(self, lat: float, lng: float, for_exit: bool = False) -> bool:
+        if self._center is not None:
+            dy = (lat - self._center[0]) * METERS_PER_DEG_LAT
+            dx = (lng - self._center[1]) * METERS_PER_DEG_LNG * self._cos_lat
+            return dx * dx + dy * dy <= (self._r2_exit if for_exit else self._r2)
+        geom = self._poly_exit if for_exit else self._poly
+        return bool(shapely.contains_xy(geom, lng, lat))
+
+
+@dataclass(frozen=True)
+class GeofenceIndex:
+    version: int = 0
+    grid_size: float = 0.01
+    fences: Dict[int, FenceShape] = field(default_factory=dict)
+    grid: Dict[Tuple[int, int], Tuple[int, ...]] = field(default_factory=dict)
+
+    def cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (int(math.floor(lat / self.grid_size)), int(math.floor(lng / self.grid_size)))
+
+    def candidates(self, lat: float, lng: float) -> Tuple[int, ...]:
+        return self.grid.get(self.cell(lat, lng), ())
+
+
+def build_index(geofences: List[Geofence], version: int, grid_size: float, exit_buffer_m: float) -> GeofenceIndex:
+    fences: Dict[int, FenceShape] = {}
+    grid: Dict[Tuple[int, int], List[int]] = {}
+
+    for geofence in geofences:
+        if not geofence.is_active:
+            continue
+        if geofence.area is not None:
+            shape = FenceShape(geofence.id, geofence.name, geofence.kind, exit_buffer_m, polygon=to_shape(geofence.area))
+        elif geofence.center is not None and geofence.radius_m:
+            point = to_shape(geofence.center)
+            shape = FenceShape(geofence.id, geofence.name, geofence.kind, exit_buffer_m,
+                               center=(point.y, point.x), radius_m=geofence.radius_m)
+        else:
+            continue
+        fences[shape.id] = shape
+
+        min_lat, min_lng, max_lat, max_lng = shape.bbox
+        for i in range(int(math.floor(min_lat / grid_size)), int(math.floor(max_lat / grid_size)) + 1):
+            for j in range(int(math.floor(min_lng / grid_size)), int(math.floor(max_lng / grid_size)) + 1):
+                grid.setdefault((i, j), []).append(shape.id)
+
+    return GeofenceIndex(
+        version=version,
+        grid_size=grid_size,
+        fences=fences,
+        grid={cell: tuple(ids) for cell, ids in grid.items()},
+    )
+
+
+class GeofenceMonitor:
+    """Holds geofence index and per-vehicle inside-state; detects ENTER/EXIT."""
+
+    def __init__(self, grid_size: float, exit_buffer_m: float):
+        self.grid_size = grid_size
+        self.exit_buffer_m = exit_buffer_m
+        self.index = GeofenceIndex(grid_size=grid_size)
+        self._inside: Dict[int, FrozenSet[int]] = {}
+        self._stamp: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+        self.points_checked = 0
+        self.events_detected = 0
+
+    def process(self, vehicle_id: int, lat: float, lng: float) -> List[Tuple[FenceShape, GeofenceEventType]]:
+        """Test point against geofences; returns transitions for this vehicle."""
+        index = self.index
+        self.points_checked += 1
+        previous = self._inside.get(vehicle_id)
+
+        inside = set()
+        # Зоны, в которых машина была - проверяем с буфером на выезд
+        for fence_id in previous or ():
+            fence = index.fences.get(fence_id)
+            if fence is not None and fence.contains(lat, lng, for_exit=True):
+                inside.add(fence_id)
+        for fence_id in index.candidates(lat, lng):
+            if fence_id not in inside and index.fences[fence_id].contains(lat, lng):
+                inside.add(fence_id)
+
+        current = frozenset(inside)
+        self._inside[vehicle_id] = current
+        if previous is None or current == previous:
+            return []
+
+        events = [(index.fences[fence_id], GeofenceEventType.ENTER) for fence_id in current - previous]
+        events += [
+            (index.fences[fence_id], GeofenceEventType.EXIT)
+            for fence_id in previous - current
+            if fence_id in index.fences  # Удаленные зоны просто забываем
+        ]
+        self.events_detected += len(events)
+        return events
+
+    def inside(self, vehicle_id: int) -> FrozenSet[int]:
+        return self._inside.get(vehicle_id, frozenset())
+
+    def snapshot(self, vehicle_ids: Iterable[int]) -> Dict[int, Optional[FrozenSet[int]]]:
+        return {vehicle_id: self._inside.get(vehicle_id) for vehicle_id in vehicle_ids}
+
+    def restore(self, snapshot: Dict[int, Optional[FrozenSet[int]]]):
+        """Put back inside-state taken by snapshot() (the events were not committed)."""
+        for vehicle_id, inside in snapshot.items():
+            if inside is None:
+                self._inside.pop(vehicle_id, None)
+            else:
+                self._inside[vehicle_id] = inside
+
+    async def _read_stamp(self, db: AsyncSession) -> tuple:
+        result = await db.execute(
+            select(
+                func.count(Geofence.id),
+                func.max(func.coalesce(Geofence.updated_at, Geofence.created_at))
+            )
+        )
+        return tuple(result.one())
+
+    async def reload(self, db: Optional[AsyncSession] = None, force: bool = True) -> bool:
+        """Load geofences from DB and swap index. Returns True if index changed."""
+        async with self._lock:
+            if db is None:
+                async with AsyncSessionLocal() as session:
+                    return await self._reload(session, force)
+            return await self._reload(db, force)
+
+    async def _reload(self, db: AsyncSession, force: bool) -> bool:
+        stamp = await self._read_stamp(db)
+        if not force and stamp == self._stamp:
+            return False
+        result = await db.execute(select(Geofence).where(Geofence.is_active.is_(True)))
+        self.index = build_index(
+            list(result.scalars().all()),
+            self.index.version + 1,
+            self.grid_size,
+            self.exit_buffer_m,
+        )
+        self._stamp = stamp
+        return True
+
+    async def watch(self, interval_seconds: float):
+        """Periodically pick up geofence changes made by other workers."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.reload(force=False)
+            except Exception as e:
+                print(f"Error refreshing geofences: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "version": self.index.version,
+            "geofences": len(self.index.fences),
+            "grid_cells": len(self.index.grid),
+            "tracked_vehicles": len(self._inside),
+            "points_checked": self.points_checked,
+            "events_detected": self.events_detected,
+        }
+
+
+geofence_monitor = GeofenceMonitor(settings.GEOFENCE_GRID_SIZE_DEG, settings.GEOFENCE_EXIT_BUFFER_M)
@@ -0,0 +1,143 @@
+"""
+Проверка GPS-точек перед приемом.
+
+Отбрасываются:
+- невалидные координаты (вне диапазона, "нулевой остров" 0,0)
+- точки вне окна времени (из будущего или старше GPS_MAX_AGE_HOURS)
+- дубликаты по времени устройства
+- скачки: скорость между соседними фиксами выше GPS_MAX_SPEED_KMH
+
+Точки, пришедшие позже более свежих (буфер устройства после туннеля), не
+теряются: они сохраняются в историю по своему времени, но не двигают текущую
+позицию машины и не идут в потоковые стадии (геозоны, поездки, ETA).
+
+Состояние на машину - O(1): последний принятый фикс, несколько последних
+временных меток для поиска дублей и счетчик подряд отброшенных скачков.
+"""
+import math
+from collections import Counter
+from dataclasses import dataclass, field, replace
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+
+from app.core.config import settings
+from app.services.pricing import calculate_haversine_distance
+
+ACCEPTED = "accepted"
+LATE = "late"
+
+
+class GpsPointRejected(Exception):
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+@dataclass
+class VehicleFixState:
+    lat: float
+    lng: float
+    at: datetime
+    recent: Tuple[datetime, ...] = field(default_factory=tuple)  # Последние метки времени (для дублей)
+    rejected_jumps: int = 0
+
+
+class GpsValidator:
+    """Stateful validation of incoming fixes with rejection metrics."""
+
+    def __init__(
+        self,
+        max_speed_kmh: float,
+        min_jump_km: float,
+        max_age: timedelta,
+        max_future: timedelta,
+        dedupe_window: int,
+        resync_after: int,
+    ):
+        self.max_speed_kmh = max_speed_kmh
+        self.min_jump_km = min_jump_km
+        self.max_age = max_age
+        self.max_future = max_future
+        self.dedupe_window = dedupe_window
+        self.resync_after = resync_after
+        self._state: Dict[int, VehicleFixState] = {}
+        self.metrics: Counter = Counter()
+
+    def _reject(self, reason: str):
+        self.metrics[f"rejected_{reason}"] += 1
+        raise GpsPointRejected(reason)
+
+    def check(self, vehicle_id: int, lat: float, lng: float, at: datetime, now: datetime) -> str:
+        """
+        Validate a fix. Returns ACCEPTED (newest fix of the vehicle) or LATE
+        (older than an already accepted fix); raises GpsPointRejected otherwise.
+        """
+        self.metrics["checked"] += 1
+
+        if not (math.isfinite(lat) and math.isfinite(lng)) or abs(lat) > 90 or abs(lng) > 180:
+            self._reject("invalid_coordinates")
+        if abs(lat) < 1e-6 and abs(lng) < 1e-6:
+            self._reject("null_island")
+        if at > now + self.max_future:
+            self._reject("future_timestamp")
+        if now - at > self.max_age:
+            self._reject("too_old")
+
+        state = self._state.get(vehicle_id)
+        if state is None:
+            self._state[vehicle_id] = VehicleFixState(lat, lng, at, (at,))
+            self.metrics[ACCEPTED] += 1
+            return ACCEPTED
+
+        if at in state.recent:
+            self._reject("duplicate")
+
+        elapsed_h = abs((at - state.at).total_seconds()) / 3600
+        jump_km = calculate_haversine_distance(state.lat, state.lng, lat, lng)
+        if jump_km > self.min_jump_km and (elapsed_h == 0 or jump_km / elapsed_h > self.max_speed_kmh):
+            state.rejected_jumps += 1
+            # Если "скачков" много подряд - скорее ошибочен прошлый фикс: принимаем новую позицию
+            if state.rejected_jumps < self.resync_after:
+                self._reject("speed_jump")
+            self.metrics["resynced"] += 1
+
+        state.recent = (state.recent + (at,))[-self.dedupe_window:]
+        if at < state.at:
+            self.metrics[LATE] += 1
+            return LATE
+
+        state.lat, state.lng, state.at = lat, lng, at
+        state.rejected_jumps = 0
+        self.metrics[ACCEPTED] += 1
+        return ACCEPTED
+
+    def snapshot(self, vehicle_ids: Iterable[int]) -> Dict[int, Optional[VehicleFixState]]:
+        return {vehicle_id: replace(state) if (state := self._state.get(vehicle_id)) else None for vehicle_id in vehicle_ids}
+
+    def restore(self, snapshot: Dict[int, Optional[VehicleFixState]]):
+        """Put back state taken by snapshot() (the points were not committed)."""
+        for vehicle_id, state in snapshot.items():
+            if state is None:
+                self._state.pop(vehicle_id, None)
+            else:
+                self._state[vehicle_id] = state
+
+    def stats(self) -> dict:
+        checked = self.metrics["checked"]
+        rejected = sum(v for k, v in self.metrics.items() if k.startswith("rejected_"))
+        return {
+            **self.metrics,
+            "tracked_vehicles": len(self._state),
+            "rejected": rejected,
+            "rejection_ratio": round(rejected / checked, 4) if checked else 0.0,
+        }
+
+
+gps_validator = GpsValidator(
+    max_speed_kmh=settings.GPS_MAX_SPEED_KMH,
+    min_jump_km=settings.GPS_MIN_JUMP_M / 1000,
+    max_age=timedelta(hours=settings.GPS_MAX_AGE_HOURS),
+    max_future=timedelta(seconds=settings.GPS_MAX_FUTURE_SECONDS),
+    dedupe_window=settings.GPS_DEDUPE_WINDOW,
+    resync_after=settings.GPS_RESYNC_AFTER,
+)
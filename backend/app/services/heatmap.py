@@ -0,0 +1,261 @@
+"""
+Тепловая карта парка: агрегаты точек трекинга по ячейкам сетки.
+
+Сетка в градусах (как ST_SnapToGrid), ячейка на zoom z - 22.5 / 2^z градуса
+(~16 пикселей тайла 256px). Базовый уровень HEATMAP_BASE_ZOOM (~40 м);
+номер ячейки - floor((lng + 180) / size), floor((lat + 90) / size), поэтому
+ячейки крупных zoom получаются из базовых делением номера на 2^(base - z).
+
+На ячейку: число точек, сумма скоростей, dwell - время до следующей точки той
+же машины (не больше HEATMAP_MAX_DWELL_SECONDS) и idle - dwell на стоянке.
+
+Закрытые дни (UTC) один раз сворачиваются в heatmap_cells на базовом уровне,
+запрос берет готовые дни из агрегатов и досчитывает по сырым точкам только
+несвернутые (обычно сегодня). День сворачивается после окончания + окна
+GPS_MAX_AGE_HOURS, когда поздние точки за него уже не принимаются.
+
+Свертка читает только tracking_points, поэтому дни старше
+TRACK_ARCHIVE_AFTER_DAYS (точки могли уйти в архив) не пересчитываются -
+готовый агрегат не затирается нулями. Запрос за такой несвернутый день
+отклоняется, а не считается по неполным сырым точкам. Параллельные свертки одного дня
+(несколько воркеров, ручной POST /heatmap/rollup) идут по очереди под
+advisory-блокировкой дня.
+"""
+import asyncio
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from typing import List, Optional, Tuple
+
+from sqlalchemy import Float, Integer, and_, case, cast, delete, func, literal, or_, select, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import HeatmapCell, HeatmapDay, TrackingPoint
+from app.services.track_archive import archive_cutoff_day
+
+BASE_CELL_DEG = 22.5 / 2 ** settings.HEATMAP_BASE_ZOOM
+# Ключ advisory-блокировки свертки (второй ключ - день)
+HEATMAP_LOCK_KEY = 0x484D_4150  # "HMAP"
+
+
+def cell_size(zoom: int) -> float:
+    return 22.5 / 2 ** zoom
+
+
+def _day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, dtime.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _day_ranges(days: List[date]) -> List[Tuple[date, date]]:
+    """Consecutive days -> [(first, last)]."""
+    ranges = []
+    for day in sorted(days):
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+
+def raw_cells_query(time_filter):
+    """Base-level cells aggregated from tracking_points matching time_filter."""
+    next_timestamp = func.lead(TrackingPoint.timestamp).over(
+        partition_by=TrackingPoint.vehicle_id, order_by=TrackingPoint.timestamp
+    )
+    points = select(
+        cast(func.floor((func.ST_X(TrackingPoint.location) + 180) / BASE_CELL_DEG), Integer).label("cell_x"),
+        cast(func.floor((func.ST_Y(TrackingPoint.location) + 90) / BASE_CELL_DEG), Integer).label("cell_y"),
+        TrackingPoint.speed.label("speed"),
+        func.least(
+            func.coalesce(cast(func.extract("epoch", next_timestamp - TrackingPoint.timestamp), Float), 0.0),
+            settings.HEATMAP_MAX_DWELL_SECONDS,
+        ).label("dwell"),
+    ).where(time_filter).subquery()
+
+    return select(
+        points.c.cell_x,
+        points.c.cell_y,
+        func.count().label("point_count"),
+        func.coalesce(func.sum(points.c.speed), 0.0).label("speed_sum"),
+        func.sum(points.c.dwell).label("dwell_seconds"),
+        func.sum(case((points.c.speed < settings.TRIP_MOVING_SPEED_KMH, points.c.dwell), else_=0.0)).label("idle_seconds"),
+    ).group_by(points.c.cell_x, points.c.cell_y)
+
+
+async def rollup_day(db: AsyncSession, day: date) -> int:
+    """(Re)compute heatmap_cells for one UTC day. Caller commits."""
+    if day < archive_cutoff_day(settings.TRACK_ARCHIVE_AFTER_DAYS):
+        raise ValueError(f"Points of {day} may already be archived, rollup is refused")
+    start, end = _day_bounds(day)
+    cells = raw_cells_query((TrackingPoint.timestamp >= start) & (TrackingPoint.timestamp < end)).subquery()
+
+    await db.execute(select(func.pg_advisory_xact_lock(HEATMAP_LOCK_KEY, day.toordinal())))
+    await db.execute(delete(HeatmapCell).where(HeatmapCell.day == day))
+    await db.execute(
+        pg_insert(HeatmapCell).from_select(
+            ["day", "cell_x", "cell_y", "point_count", "speed_sum", "dwell_seconds", "idle_seconds"],
+            select(
+                literal(day), cells.c.cell_x, cells.c.cell_y, cells.c.point_count,
+                cells.c.speed_sum, cells.c.dwell_seconds, cells.c.idle_seconds,
+            ),
+        )
+    )
+    point_count = await db.scalar(
+        select(func.coalesce(func.sum(HeatmapCell.point_count), 0)).where(HeatmapCell.day == day)
+    )
+    await db.execute(
+        pg_insert(HeatmapDay)
+        .values(day=day, point_count=point_count)
+        .on_conflict_do_update(index_elements=["day"], set_={"point_count": point_count, "computed_at": func.now()})
+    )
+    return point_count
+
+
+def last_closed_day(now: Optional[datetime] = None) -> date:
+    """Latest day that can no longer receive points (GPS_MAX_AGE_HOURS)."""
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(hours=settings.GPS_MAX_AGE_HOURS)).date() - timedelta(days=1)
+
+
+async def rollup_pending(now: Optional[datetime] = None) -> List[date]:
+    """Roll up every closed day that has points and no aggregate yet."""
+    last_day = last_closed_day(now)
+    async with AsyncSessionLocal() as db:
+        last_rolled = await db.scalar(select(func.max(HeatmapDay.day)))
+        if last_rolled is None:
+            first_point = await db.scalar(select(func.min(TrackingPoint.timestamp)))
+            if first_point is None:
+                return []
+            day = first_point.astimezone(timezone.utc).date()
+        else:
+            day = last_rolled + timedelta(days=1)
+        # Дни, которые могли уйти в архив, не сворачиваем
+        cutoff = archive_cutoff_day(settings.TRACK_ARCHIVE_AFTER_DAYS)
+        if day < cutoff:
+            print(f"Heatmap days {day} .. {cutoff - timedelta(days=1)} may be archived, skipped rollup")
+            day = cutoff
+
+        rolled = []
+        while day <= last_day:
+            await rollup_day(db, day)
+            await db.commit()
+            rolled.append(day)
+            day += timedelta(days=1)
+        return rolled
+
+
+async def run_rollup(interval_seconds: float):
+    """Background task: roll up closed days."""
+    while True:
+        try:
+            rolled = await rollup_pending()
+            if rolled:
+                print(f"Heatmap rolled up {len(rolled)} day(s): {rolled[0]} .. {rolled[-1]}")
+        except Exception as e:
+            print(f"Error rolling up heatmap: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+
+async def query_heatmap(
+    db: AsyncSession,
+    date_from: date,
+    date_to: date,
+    zoom: int,
+    bbox: Optional[Tuple[float, float, float, float]] = None,
+    min_count: int = 1,
+) -> dict:
+    """Cells for the inclusive day range at the zoom resolution.
+
+    Raises ValueError if a day without aggregate may already be archived.
+    """
+    days = [date_from + timedelta(days=i) for i in range((date_to - date_from).days + 1)]
+    result = await db.execute(
+        select(HeatmapDay.day).where(HeatmapDay.day >= date_from, HeatmapDay.day <= date_to)
+    )
+    rolled_days = set(result.scalars().all())
+    live_days = [d for d in days if d not in rolled_days]
+    # Сырые точки таких дней могли частично уйти в архив - посчитали бы заниженную карту
+    cutoff = archive_cutoff_day(settings.TRACK_ARCHIVE_AFTER_DAYS)
+    archived_days = [d for d in live_days if d < cutoff]
+    if archived_days:
+        raise ValueError(
+            f"Days {archived_days[0]} .. {archived_days[-1]} are not rolled up and their points may already be archived"
+        )
+
+    sources = []
+    if rolled_days:
+        sources.append(select(
+            HeatmapCell.cell_x, HeatmapCell.cell_y, HeatmapCell.point_count,
+            HeatmapCell.speed_sum, HeatmapCell.dwell_seconds, HeatmapCell.idle_seconds,
+        ).where(HeatmapCell.day.in_(sorted(rolled_days))))
+    if live_days:
+        time_filter = or_(*(
+            and_(TrackingPoint.timestamp >= _day_bounds(first)[0], TrackingPoint.timestamp < _day_bounds(last)[1])
+            for first, last in _day_ranges(live_days)
+        ))
+        sources.append(raw_cells_query(time_filter))
+    base = (union_all(*sources) if len(sources) > 1 else sources[0]).subquery()
+
+    factor = 2 ** (settings.HEATMAP_BASE_ZOOM - zoom)
+    cell_x, cell_y = (base.c.cell_x // factor).label("x"), (base.c.cell_y // factor).label("y")
+    query = select(
+        cell_x,
+        cell_y,
+        func.sum(base.c.point_count).label("count"),
+        func.sum(base.c.speed_sum).label("speed_sum"),
+        func.sum(base.c.dwell_seconds).label("dwell_seconds"),
+        func.sum(base.c.idle_seconds).label("idle_seconds"),
+    )
+    if bbox is not None:
+        min_lng, min_lat, max_lng, max_lat = bbox
+        query = query.where(
+            base.c.cell_x >= int((min_lng + 180) // BASE_CELL_DEG),
+            base.c.cell_x <= int((max_lng + 180) // BASE_CELL_DEG),
+            base.c.cell_y >= int((min_lat + 90) // BASE_CELL_DEG),
+            base.c.cell_y <= int((max_lat + 90) // BASE_CELL_DEG),
+        )
+    query = query.group_by(cell_x, cell_y).having(func.sum(base.c.point_count) >= min_count)
+
+    size = cell_size(zoom)
+    cells = [
+        {
+            "lat": (row.y + 0.5) * size - 90,
+            "lng": (row.x + 0.5) * size - 180,
+            "count": row.count,
+            "avg_speed": round(row.speed_sum / row.count, 1) if row.count else 0.0,
+            "dwell_seconds": round(row.dwell_seconds or 0.0, 1),
+            "idle_seconds": round(row.idle_seconds or 0.0, 1),
+        }
+        for row in (await db.execute(query)).all()
+    ]
+    return {
+        "zoom": zoom,
+        "cell_size_deg": size,
+        "date_from": date_from,
+        "date_to": date_to,
+        "rolled_up_days": len(rolled_days),
+        "live_days": len(live_days),
+        "cells": cells,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Roll up tracking points into daily heatmap cells")
+    parser.add_argument("--day", type=date.fromisoformat, help="Recompute one day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    async def main():
+        if args.day:
+            async with AsyncSessionLocal() as db:
+                count = await rollup_day(db, args.day)
+                await db.commit()
+            print(f"Rolled up {args.day}: {count} points")
+        else:
+            rolled = await rollup_pending()
+            print(f"Rolled up {len(rolled)} day(s)")
+
+    asyncio.run(main())
@@ -0,0 +1,278 @@
+"""
+Прием GPS-точек: проверка и потоковые стадии в одной транзакции.
+
+    validate -> tracking_points -> текущая позиция машины -> геозоны -> пробег/поездки
+             -> автозавершение заказов -> ETA
+
+Стадии работают с состоянием в памяти и не делают запросов к БД на обычной
+точке; пробег и незавершенная поездка хранятся в строке машины. Поздние точки (старше уже принятых) сохраняются только в историю.
+Строки машин пачки блокируются (FOR UPDATE): пачки одной машины из разных
+воркеров проходят стадии по очереди. Если транзакция не закоммичена,
+ingest_and_commit возвращает состояние стадий в памяти к снимку до пачки -
+повтор тех же точек не отклоняется как дубль и не теряет события.
+
+Идемпотентность: точка с ключом (device_id, seq) вставляется через
+INSERT ... ON CONFLICT DO NOTHING, повтор после таймаута или переотправка
+буфера устройства не создают дублей и не проходят стадии второй раз.
+Пачка точек сортируется по времени устройства и вставляется одним запросом.
+
+Рассылка результатов по WebSocket - в app.api.tracking (publish_ingest_result).
+"""
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from geoalchemy2.elements import WKTElement
+from sqlalchemy import select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import GeofenceEvent, Order, TrackingPoint, Vehicle
+from app.schemas import TrackingPointCreate
+from app.services.arrival import arrival_detector, complete_arrived_orders
+from app.services.eta import EtaEstimate, eta_engine
+from app.services.geofencing import geofence_monitor
+from app.services.gps_validation import LATE, GpsPointRejected, gps_validator
+from app.services.trips import trip_engine
+
+INSERT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class IngestResult:
+    vehicle: Vehicle
+    point: TrackingPoint
+    point_data: TrackingPointCreate
+    late: bool = False
+    duplicate: bool = False
+    geofence_events: List[GeofenceEvent] = field(default_factory=list)
+    eta_updates: List[EtaEstimate] = field(default_factory=list)
+    completed_orders: List[Order] = field(default_factory=list)
+
+
+class StageSnapshot:
+    """In-memory stage state of the batch's vehicles before the batch."""
+
+    def __init__(self):
+        self._parts = []
+
+    def take(self, vehicle_ids):
+        vehicle_ids = list(vehicle_ids)
+        self._parts = [
+            (stage, stage.snapshot(vehicle_ids))
+            for stage in (gps_validator, geofence_monitor, arrival_detector)
+        ]
+
+    def restore(self):
+        for stage, snapshot in self._parts:
+            stage.restore(snapshot)
+        self._parts = []
+
+
+@dataclass
+class IngestBatchResult:
+    results: List[IngestResult] = field(default_factory=list)  # Новые точки, по времени устройства
+    duplicates: List[IngestResult] = field(default_factory=list)
+    rejected: List[Tuple[int, str]] = field(default_factory=list)  # (индекс во входной пачке, причина)
+
+
+def point_time(point_data: TrackingPointCreate, now: datetime) -> datetime:
+    at = point_data.timestamp or now
+    return at if at.tzinfo is not None else at.replace(tzinfo=timezone.utc)
+
+
+def point_key(point_data: TrackingPointCreate) -> Optional[Tuple[str, int]]:
+    return (point_data.device_id, point_data.seq) if point_data.device_id is not None else None
+
+
+def _point_row(vehicle_id: int, point_data: TrackingPointCreate, at: datetime, received_at: datetime) -> dict:
+    lat, lng = point_data.location.lat, point_data.location.lng
+    return {
+        "vehicle_id": vehicle_id,
+        "location": WKTElement(f"POINT({lng} {lat})", srid=4326),
+        "speed": point_data.speed,
+        "fuel_level": point_data.fuel_level,
+        "heading": point_data.heading,
+        "device_id": point_data.device_id,
+        "seq": point_data.seq,
+        "timestamp": at,
+        "received_at": received_at,
+    }
+
+
+async def _load_existing(db: AsyncSession, keys: List[Tuple[str, int]]) -> Dict[Tuple[str, int], TrackingPoint]:
+    if not keys:
+        return {}
+    result = await db.execute(
+        select(TrackingPoint).where(tuple_(TrackingPoint.device_id, TrackingPoint.seq).in_(keys))
+    )
+    return {(p.device_id, p.seq): p for p in result.scalars().all()}
+
+
+async def _apply_stages(db: AsyncSession, result: IngestResult, at: datetime):
+    """Streaming stages for a newly stored, in-order point."""
+    vehicle, point_data = result.vehicle, result.point_data
+    lat, lng = point_data.location.lat, point_data.location.lng
+    point_geom = WKTElement(f"POINT({lng} {lat})", srid=4326)
+
+    vehicle.current_location = point_geom
+    vehicle.current_speed = point_data.speed
+    if point_data.fuel_level is not None:
+        vehicle.fuel_level = point_data.fuel_level
+
+    # Въезд/выезд из геозон - в той же транзакции, что и точка
+    result.geofence_events = [
+        GeofenceEvent(
+            geofence_id=fence.id,
+            vehicle_id=vehicle.id,
+            event_type=event_type,
+            location=point_geom,
+            timestamp=at
+        )
+        for fence, event_type in geofence_monitor.process(vehicle.id, lat, lng)
+    ]
+    db.add_all(result.geofence_events)
+
+    # Пробег и поездки (состояние в строке машины)
+    trip_engine.advance_odometer(vehicle, lat, lng, at)
+    closed_trip = trip_engine.process(vehicle, lat, lng, point_data.speed, at)
+    if closed_trip is not None:
+        db.add(closed_trip.to_model())
+
+    # Автоматическое завершение заказов по стоянке у точки доставки
+    if settings.ARRIVAL_DETECTION_ENABLED:
+        arrived_ids = await arrival_detector.process(db, vehicle.id, lat, lng, at)
+        if arrived_ids:
+            result.completed_orders = await complete_arrived_orders(db, vehicle, arrived_ids, at)
+            eta_engine.forget_order(*arrived_ids)
+
+    # ETA по оставшимся активным заказам (из того же кэша, без запросов к БД)
+    result.eta_updates = await eta_engine.process(
+        vehicle.id, lat, lng, point_data.speed, at,
+        await arrival_detector.active_deliveries(db, vehicle.id)
+    )
+
+
+async def ingest_points(
+    db: AsyncSession,
+    points: List[TrackingPointCreate],
+    now: Optional[datetime] = None,
+    snapshot: Optional[StageSnapshot] = None,
+) -> IngestBatchResult:
+    """Validate, store and process a batch of points. Caller commits (see ingest_and_commit)."""
+    now = now or datetime.now(timezone.utc)
+    batch = IngestBatchResult()
+
+    vehicle_ids = {p.vehicle_id for p in points}
+    # Блокировка в порядке id - без взаимных блокировок между пачками
+    vehicles_result = await db.execute(
+        select(Vehicle).where(Vehicle.id.in_(vehicle_ids)).order_by(Vehicle.id).with_for_update()
+    )
+    vehicles = {v.id: v for v in vehicles_result.scalars().all()}
+    if snapshot is not None:
+        snapshot.take(vehicles)
+
+    # Буфер устройства может прийти не по порядку - обрабатываем по времени фикса
+    ordered = sorted(range(len(points)), key=lambda i: point_time(points[i], now))
+
+    pending: List[Tuple[int, datetime, bool]] = []  # (индекс, время, поздняя)
+    replayed_keys = []
+    seen_keys = set()
+    for i in ordered:
+        point_data = points[i]
+        at = point_time(point_data, now)
+        key = point_key(point_data)
+        if point_data.vehicle_id not in vehicles:
+            batch.rejected.append((i, "unknown_vehicle"))
+            continue
+        if key is not None and key in seen_keys:
+            replayed_keys.append((i, key))
+            continue
+        try:
+            verdict = gps_validator.check(point_data.vehicle_id, point_data.location.lat, point_data.location.lng, at, now) \
+                if settings.GPS_VALIDATION_ENABLED else None
+        except GpsPointRejected as e:
+            # Повтор точки с ключом - не ошибка, отвечаем как на исходную
+            if e.reason == "duplicate" and key is not None:
+                replayed_keys.append((i, key))
+            else:
+                batch.rejected.append((i, e.reason))
+            continue
+        if key is not None:
+            seen_keys.add(key)
+        pending.append((i, at, verdict == LATE))
+
+    keyed = [(i, at, late) for i, at, late in pending if points[i].device_id is not None]
+    unkeyed = [(i, at, late) for i, at, late in pending if points[i].device_id is None]
+
+    stored: Dict[int, TrackingPoint] = {}
+    if keyed:
+        by_key = {}
+        # Лимит параметров запроса в PostgreSQL - вставляем частями
+        for start in range(0, len(keyed), INSERT_CHUNK_SIZE):
+            chunk = keyed[start:start + INSERT_CHUNK_SIZE]
+            inserted = await db.scalars(
+                pg_insert(TrackingPoint)
+                .values([_point_row(points[i].vehicle_id, points[i], at, now) for i, at, _ in chunk])
+                .on_conflict_do_nothing(constraint="uq_tracking_points_device_seq")
+                .returning(TrackingPoint)
+            )
+            by_key.update({(p.device_id, p.seq): p for p in inserted.all()})
+        for i, _, _ in keyed:
+            point = by_key.get(point_key(points[i]))
+            if point is None:
+                replayed_keys.append((i, point_key(points[i])))
+            else:
+                stored[i] = point
+    if unkeyed:
+        new_points = {i: TrackingPoint(**_point_row(points[i].vehicle_id, points[i], at, now)) for i, at, _ in unkeyed}
+        db.add_all(new_points.values())
+        await db.flush(list(new_points.values()))
+        stored.update(new_points)
+
+    existing = await _load_existing(db, list({key for _, key in replayed_keys}))
+    for i, key in replayed_keys:
+        point = existing.get(key)
+        if point is None:
+            # Тот же ключ внутри пачки, первая копия отклонена
+            batch.rejected.append((i, "duplicate"))
+            continue
+        batch.duplicates.append(IngestResult(
+            vehicle=vehicles[points[i].vehicle_id], point=point, point_data=points[i], duplicate=True
+        ))
+
+    for i, at, late in pending:
+        point = stored.get(i)
+        if point is None:
+            continue
+        result = IngestResult(vehicle=vehicles[points[i].vehicle_id], point=point, point_data=points[i], late=late)
+        if not late:
+            await _apply_stages(db, result, at)
+        batch.results.append(result)
+
+    return batch
+
+
+async def ingest_and_commit(
+    db: AsyncSession, points: List[TrackingPointCreate], now: Optional[datetime] = None
+) -> IngestBatchResult:
+    """ingest_points + commit; in-memory stage state is rolled back if the commit does not happen."""
+    snapshot = StageSnapshot()
+    try:
+        batch = await ingest_points(db, points, now, snapshot)
+        await db.commit()
+    except BaseException:
+        snapshot.restore()
+        raise
+    return batch
+
+
+def ingest_stats() -> dict:
+    return {
+        "validation": gps_validator.stats(),
+        "geofences": geofence_monitor.stats(),
+        "arrivals": arrival_detector.stats(),
+        "eta": eta_engine.stats(),
+        "trips": trip_engine.stats(),
+    }
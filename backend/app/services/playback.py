@@ -0,0 +1,161 @@
+"""
+Воспроизведение трека: исторические точки машины или всего парка в порядке
+времени с ускорением.
+
+Источники читаются потоково, диапазон целиком в память не загружается:
+- tracking_points - страницами по PLAYBACK_FETCH_SIZE строк (ключ timestamp, id),
+  каждая страница - своя короткая сессия: соединение из пула не держится,
+  пока воспроизведение ждет PlaybackClock (диапазон может идти днями);
+- колоночный архив (app.services.track_archive) - окнами по
+  PLAYBACK_ARCHIVE_WINDOW_MINUTES, в памяти только точки текущего окна.
+
+Оба потока упорядочены по времени и сливаются на лету (heapq). Темп задает
+PlaybackClock: точка со временем t уходит в момент start + (t - t0) / speed,
+длинные паузы в данных (стоянки, ночь) сжимаются до PLAYBACK_MAX_PAUSE_SECONDS.
+"""
+import asyncio
+import heapq
+from datetime import date, datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import func, select, tuple_
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import TrackingPoint
+from app.services.track_archive import TrackArchive
+
+# (timestamp, point id, vehicle_id, lat, lng, speed, fuel_level, heading)
+PlaybackPoint = Tuple[datetime, int, int, float, float, float, Optional[float], Optional[float]]
+
+
+async def stream_db_points(vehicle_id: Optional[int], start: datetime, end: datetime) -> AsyncIterator[PlaybackPoint]:
+    base = select(
+        TrackingPoint.timestamp,
+        TrackingPoint.id,
+        TrackingPoint.vehicle_id,
+        func.ST_Y(TrackingPoint.location),
+        func.ST_X(TrackingPoint.location),
+        TrackingPoint.speed,
+        TrackingPoint.fuel_level,
+        TrackingPoint.heading,
+    ).where(TrackingPoint.timestamp >= start, TrackingPoint.timestamp < end)
+    if vehicle_id is not None:
+        base = base.where(TrackingPoint.vehicle_id == vehicle_id)
+    base = base.order_by(TrackingPoint.timestamp, TrackingPoint.id).limit(settings.PLAYBACK_FETCH_SIZE)
+
+    after = None
+    while True:
+        query = base if after is None else base.where(tuple_(TrackingPoint.timestamp, TrackingPoint.id) > after)
+        # Сессия закрывается до отдачи точек: между страницами соединение свободно
+        async with AsyncSessionLocal() as db:
+            rows = [tuple(row) for row in (await db.execute(query)).all()]
+        for row in rows:
+            yield row
+        if len(rows) < settings.PLAYBACK_FETCH_SIZE:
+            return
+        after = tuple_(rows[-1][0], rows[-1][1])
+
+
+def _archive_days(archive: TrackArchive, vehicle_id: Optional[int], start: datetime, end: datetime) -> Dict[int, Set[date]]:
+    vehicle_ids = [vehicle_id] if vehicle_id is not None else archive.vehicle_ids()
+    days = {}
+    for vid in vehicle_ids:
+        in_range = {d for d in archive.vehicle_days(vid) if start.date() <= d <= end.date()}
+        if in_range:
+            days[vid] = in_range
+    return days
+
+
+def _read_fleet_window(
+    archive: TrackArchive, days: Dict[int, Set[date]], start: datetime, end: datetime
+) -> List[PlaybackPoint]:
+    window_days = {start.date(), (end - timedelta(microseconds=1)).date()}
+    points = []
+    for vid, vehicle_days in days.items():
+        if window_days.isdisjoint(vehicle_days):
+            continue
+        for point_id, ts, lat, lng, speed, fuel_level, heading in archive.read_window(vid, start, end):
+            points.append((ts, point_id, vid, lat, lng, speed, fuel_level, heading))
+    points.sort(key=lambda p: (p[0], p[1]))
+    return points
+
+
+async def stream_archive_points(
+    archive: TrackArchive, vehicle_id: Optional[int], start: datetime, end: datetime
+) -> AsyncIterator[PlaybackPoint]:
+    days = await asyncio.to_thread(_archive_days, archive, vehicle_id, start, end)
+    if not days:
+        return
+    all_days = set().union(*days.values())
+    window = timedelta(minutes=settings.PLAYBACK_ARCHIVE_WINDOW_MINUTES)
+
+    cursor = start
+    while cursor < end:
+        if cursor.date() not in all_days:
+            # Пропускаем дни без архивных файлов целиком
+            next_days = [d for d in all_days if d > cursor.date()]
+            if not next_days:
+                return
+            cursor = max(cursor, datetime.combine(min(next_days), datetime.min.time(), tzinfo=timezone.utc))
+            continue
+        window_end = min(cursor + window, end)
+        for point in await asyncio.to_thread(_read_fleet_window, archive, days, cursor, window_end):
+            yield point
+        cursor = window_end
+
+
+async def merge_by_time(*sources: AsyncIterator[PlaybackPoint]) -> AsyncIterator[PlaybackPoint]:
+    """Merge time-ordered streams, holding one point per source."""
+    heads = []
+
+    async def advance(index: int):
+        try:
+            point = await sources[index].__anext__()
+        except StopAsyncIteration:
+            return
+        heapq.heappush(heads, (point[0], point[1], index, point))
+
+    for index in range(len(sources)):
+        await advance(index)
+    while heads:
+        _, _, index, point = heapq.heappop(heads)
+        yield point
+        await advance(index)
+
+
+async def playback_points(
+    archive: TrackArchive, vehicle_id: Optional[int], start: datetime, end: datetime
+) -> AsyncIterator[PlaybackPoint]:
+    """Archived and live-table points for the range, in timestamp order."""
+    db_points = stream_db_points(vehicle_id, start, end)
+    archive_points = stream_archive_points(archive, vehicle_id, start, end)
+    try:
+        async for point in merge_by_time(archive_points, db_points):
+            yield point
+    finally:
+        await db_points.aclose()
+        await archive_points.aclose()
+
+
+class PlaybackClock:
+    """Paces data time against wall time with a speed-up factor."""
+
+    def __init__(self, speed: float, max_pause: float):
+        self.speed = speed
+        self.max_pause = max_pause
+        self._origin: Optional[Tuple[datetime, float]] = None
+
+    async def wait(self, at: datetime):
+        loop = asyncio.get_running_loop()
+        if self._origin is None:
+            self._origin = (at, loop.time())
+            return
+        origin_at, origin_wall = self._origin
+        delay = origin_wall + (at - origin_at).total_seconds() / self.speed - loop.time()
+        if delay > self.max_pause:
+            # Сжимаем паузу: сдвигаем начало отсчета, а не копим задержку
+            self._origin = (origin_at, origin_wall - (delay - self.max_pause))
+            delay = self.max_pause
+        if delay > 0:
+            await asyncio.sleep(delay)
@@ -1,5 +1,6 @@
 import math
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class PricingConfig:
@@ -9,6 +10,28 @@ class PricingConfig:
     RATE_PER_KG: float = 10.0        # Цена за кг (физический или объемный)
     VOLUMETRIC_DIVISOR: int = 5000   # Стандарт логистики: см³/5000 = объемный кг
 
+
+@dataclass(frozen=True)
+class TariffRates:
+    """Набор ставок, по которым считается цена (из БД или PricingConfig)."""
+    base_price: float
+    rate_per_km: float
+    rate_per_kg: float
+    volumetric_divisor: int
+    tariff_id: Optional[int] = None
+    name: str = "default"
+
+
+def default_rates() -> TariffRates:
+    """Ставки из PricingConfig - используются, если в БД нет подходящего тарифа."""
+    return TariffRates(
+        base_price=PricingConfig.BASE_PRICE,
+        rate_per_km=PricingConfig.RATE_PER_KM,
+        rate_per_kg=PricingConfig.RATE_PER_KG,
+        volumetric_divisor=PricingConfig.VOLUMETRIC_DIVISOR,
+    )
+
+
 def calculate_haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
     Рассчитывает расстояние между двумя координатами по формуле гаверсинуса (по прямой).
@@ -28,16 +51,21 @@ def calculate_order_price(
     weight_kg: float,
     length_cm: float,
     width_cm: float,
-    height_cm: float
+    height_cm: float,
+    rates: Optional[TariffRates] = None
 ) -> dict:
     """
     Рассчитывает итоговую стоимость доставки и метаданные груза.
+    Если тариф не передан, используются ставки PricingConfig.
     """
+    if rates is None:
+        rates = default_rates()
+    
     # 1. Расчет объемного веса
     # Объем в м³
     volume_m3 = (length_cm * width_cm * height_cm) / 1_000_000
     # Объемный вес (кг)
-    volumetric_weight = (length_cm * width_cm * height_cm) / PricingConfig.VOLUMETRIC_DIVISOR
+    volumetric_weight = (length_cm * width_cm * height_cm) / rates.volumetric_divisor
     
     # 2. Оплачиваемый вес (берем максимум между реальным и объемным)
     chargeable_weight = max(weight_kg, volumetric_weight)
@@ -45,9 +73,9 @@ def calculate_order_price(
     # 3. Формула цены:
     # Цена = База + (Км * Тариф_Км) + (Оплачиваемый_Вес * Тариф_Вес)
     raw_price = (
-        PricingConfig.BASE_PRICE +
-        (dist_km * PricingConfig.RATE_PER_KM) +
-        (chargeable_weight * PricingConfig.RATE_PER_KG)
+        rates.base_price +
+        (dist_km * rates.rate_per_km) +
+        (chargeable_weight * rates.rate_per_kg)
     )
     
     # Округление до 10 рублей в большую сторону (бизнес-правило)
@@ -58,5 +86,7 @@ def calculate_order_price(
         "distance_km": round(dist_km, 2),
         "volume_m3": round(volume_m3, 4),
         "volumetric_weight": round(volumetric_weight, 2),
-        "chargeable_weight": round(chargeable_weight, 2)
+        "chargeable_weight": round(chargeable_weight, 2),
+        "tariff_id": rates.tariff_id,
+        "tariff_name": rates.name
     }
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Кэш котировок для /orders/calculate.
+
+Калькулятор на фронте дергает эндпоинт на каждое изменение формы, при этом
+координаты и габариты почти не меняются. Ключ кэша - выбранный тариф,
+квантованные координаты, вес и габариты; весь кэш сбрасывается при изменении
+PricingConfig или подмене снимка тарифов из БД.
+
+Квантованные значения - это и есть входные данные цены: create_order считает
+заказ через тот же get_quote, поэтому клиент платит ровно ту цену, которую видел
+в калькуляторе.
+"""
+import asyncio
+import time
+from collections import OrderedDict
+from dataclasses import fields
+from typing import Optional, Tuple
+
+from app.core.config import settings
+from app.services.distance import get_distance_provider
+from app.services.pricing import PricingConfig, calculate_order_price
+from app.services.tariffs import tariff_registry
+
+
+def pricing_config_fingerprint() -> tuple:
+    """Changes whenever PricingConfig values or the DB tariff snapshot change."""
+    return (tariff_registry.version,) + tuple(getattr(PricingConfig, f.name) for f in fields(PricingConfig))
+
+
+class QuoteCache:
+    """Bounded LRU cache of price quotes with hit/miss metrics."""
+
+    def __init__(self, max_size: int = 5000, coord_precision: int = 4, dimension_step: float = 1.0, weight_step: float = 0.1):
+        self.max_size = max_size
+        self.coord_precision = coord_precision
+        self.dimension_step = dimension_step
+        self.weight_step = weight_step
+        self._cache: "OrderedDict[tuple, dict]" = OrderedDict()
+        self._fingerprint: Optional[tuple] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.compute_time_ms = 0.0
+
+    def _quantize(self, value: float, step: float) -> float:
+        return round(round(value / step) * step, 6)
+
+    def _key(self, tariff_id: Optional[int], pickup: Tuple[float, float], delivery: Tuple[float, float], weight: float, length: float, width: float, height: float) -> tuple:
+        p = self.coord_precision
+        return (
+            tariff_id,
+            round(pickup[0], p), round(pickup[1], p),
+            round(delivery[0], p), round(delivery[1], p),
+            self._quantize(weight, self.weight_step),
+            self._quantize(length, self.dimension_step),
+            self._quantize(width, self.dimension_step),
+            self._quantize(height, self.dimension_step),
+        )
+
+    def _check_config(self):
+        fingerprint = pricing_config_fingerprint()
+        if fingerprint != self._fingerprint:
+            if self._fingerprint is not None:
+                self.invalidations += 1
+            self._cache.clear()
+            self._fingerprint = fingerprint
+
+    def _compute(self, key: tuple, rates) -> dict:
+        _, p_lat, p_lng, d_lat, d_lng, q_weight, q_length, q_width, q_height = key
+        dist_km = get_distance_provider().distance_km(p_lat, p_lng, d_lat, d_lng)
+        return calculate_order_price(
+            dist_km=dist_km,
+            weight_kg=q_weight,
+            length_cm=q_length,
+            width_cm=q_width,
+            height_cm=q_height,
+            rates=rates
+        )
+
+    async def get_quote(self, pickup: Tuple[float, float], delivery: Tuple[float, float], weight: float, length: float, width: float, height: float, customer_id: Optional[int] = None) -> dict:
+        """Return quote for (lat, lng) pickup/delivery; computes and stores it on miss."""
+        self._check_config()
+        fingerprint = self._fingerprint
+        rates = tariff_registry.resolve(pickup[0], pickup[1], customer_id)
+        key = self._key(rates.tariff_id, pickup, delivery, weight, length, width, height)
+
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        get_distance_provider()  # создаем провайдер в event loop, а не в потоке
+        started = time.perf_counter()
+        # A* по дорожному графу - чистый CPU, выносим из event loop
+        result = await asyncio.to_thread(self._compute, key, rates)
+        self.compute_time_ms += (time.perf_counter() - started) * 1000
+
+        # Тарифы могли смениться, пока считали: такую котировку не кэшируем
+        if fingerprint == self._fingerprint:
+            self._cache[key] = result
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        self._cache.clear()
+        self.invalidations += 1
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._cache),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "avg_compute_ms": round(self.compute_time_ms / self.misses, 3) if self.misses else 0.0,
+        }
+
+
+quote_cache = QuoteCache(
+    max_size=settings.QUOTE_CACHE_SIZE,
+    coord_precision=settings.QUOTE_CACHE_COORD_PRECISION,
+)
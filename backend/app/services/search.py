@@ -0,0 +1,90 @@
+"""
+Поиск заказов и транспорта.
+
+- заказы: tsvector-колонка orders.search_vector (GIN) + триграммные индексы
+  по имени клиента и адресам для поиска по подстроке и опечаткам
+- транспорт: триграммные индексы по госномеру, VIN, марке и модели
+
+Все условия построены так, чтобы PostgreSQL мог использовать GIN-индексы
+(BitmapOr), без последовательного сканирования таблицы.
+"""
+import re
+from typing import Optional
+
+from sqlalchemy import Select, func, or_, literal
+from sqlalchemy.sql.elements import ColumnElement
+
+from app.models import Order, Vehicle
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+_ORDER_ID = re.compile(r"[0-9]+")
+INT4_MAX = 2_147_483_647  # orders.id - INTEGER: большее число PostgreSQL не приведет к int4
+
+
+def build_prefix_tsquery(text: str) -> Optional[str]:
+    """'ivan petr' -> 'ivan:* & petr:*' (safe for to_tsquery)."""
+    tokens = _TOKEN.findall(text.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def escape_like(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def order_search_condition(text: str) -> ColumnElement:
+    pattern = f"%{escape_like(text)}%"
+    conditions = [
+        Order.customer_name.ilike(pattern),
+        Order.pickup_address.ilike(pattern),
+        Order.delivery_address.ilike(pattern),
+    ]
+    tsquery = build_prefix_tsquery(text)
+    if tsquery:
+        conditions.append(Order.search_vector.op("@@")(func.to_tsquery("simple", tsquery)))
+    digits = text.strip()
+    if _ORDER_ID.fullmatch(digits) and int(digits) <= INT4_MAX:
+        conditions.append(Order.id == int(digits))
+    return or_(*conditions)
+
+
+def order_search_rank(text: str) -> ColumnElement:
+    tsquery = build_prefix_tsquery(text)
+    text_rank = func.ts_rank(Order.search_vector, func.to_tsquery("simple", tsquery)) if tsquery else literal(0.0)
+    similarity = func.greatest(
+        func.similarity(Order.customer_name, text),
+        func.similarity(Order.pickup_address, text),
+        func.similarity(Order.delivery_address, text),
+    )
+    return text_rank + similarity
+
+
+def apply_order_search(query: Select, text: str) -> Select:
+    """Filter and rank orders by search text."""
+    return query.where(order_search_condition(text)).order_by(order_search_rank(text).desc())
+
+
+def vehicle_search_condition(text: str) -> ColumnElement:
+    pattern = f"%{escape_like(text)}%"
+    return or_(
+        Vehicle.plate_number.ilike(pattern),
+        Vehicle.vin.ilike(pattern),
+        Vehicle.make.ilike(pattern),
+        Vehicle.model.ilike(pattern),
+    )
+
+
+def vehicle_search_rank(text: str) -> ColumnElement:
+    return func.greatest(
+        func.similarity(Vehicle.plate_number, text),
+        func.similarity(Vehicle.vin, text),
+        func.similarity(Vehicle.make, text),
+        func.similarity(Vehicle.model, text),
+        func.similarity(Vehicle.make + " " + Vehicle.model, text),
+    )
+
+
+def apply_vehicle_search(query: Select, text: str) -> Select:
+    """Filter and rank vehicles by search text."""
+    return query.where(vehicle_search_condition(text)).order_by(vehicle_search_rank(text).desc())
@@ -0,0 +1,127 @@
+"""
+Пространственные запросы по заказам и транспорту.
+
+Колонки хранятся как geometry(POINT, 4326). Расстояния в метрах считаются на
+geography: фильтр - ST_DWithin(geography(col), geography(X), r), он использует
+GiST-индексы по выражению geography(col) (geography_index в app.models).
+Выражение в запросе должно совпадать с индексом, поэтому везде - func.geography.
+Полигон проверяется на geometry (ST_Covers, индекс idx_<table>_<column>).
+
+Построители запросов (*_query) отдельно от выполнения - их же проверяет
+spatial_explain.py через EXPLAIN.
+"""
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import Order, OrderStatus, Vehicle, VehicleStatus
+
+ACTIVE_ORDER_STATUSES = [OrderStatus.NEW, OrderStatus.IN_PROGRESS]
+
+
+def _geometry(wkt: str):
+    # Строка WKT + SRID: параметр запроса остается обычным text
+    return func.ST_GeomFromText(wkt, 4326)
+
+
+def point_element(lat: float, lng: float):
+    return _geometry(f"POINT({lng} {lat})")
+
+
+def line_element(path: Sequence[Tuple[float, float]]):
+    """[(lat, lng), ...] -> LINESTRING."""
+    return _geometry("LINESTRING(" + ", ".join(f"{lng} {lat}" for lat, lng in path) + ")")
+
+
+def polygon_element(ring: Sequence[Tuple[float, float]]):
+    """[(lat, lng), ...] -> closed POLYGON."""
+    ring = list(ring)
+    if ring[0] != ring[-1]:
+        ring.append(ring[0])
+    return _geometry("POLYGON((" + ", ".join(f"{lng} {lat}" for lat, lng in ring) + "))")
+
+
+def order_location_column(point: str):
+    return Order.pickup_location if point == "pickup" else Order.delivery_location
+
+
+def orders_within_radius_query(
+    lat: float, lng: float, radius_m: float, point: str = "delivery",
+    statuses: Optional[List[OrderStatus]] = None, limit: int = 100,
+):
+    """Orders whose pickup/delivery point is within radius_m, nearest first."""
+    location = order_location_column(point)
+    center = func.geography(point_element(lat, lng))
+    distance = func.ST_Distance(func.geography(location), center)
+    query = select(
+        Order, func.ST_Y(location), func.ST_X(location), distance.label("distance_m")
+    ).where(func.ST_DWithin(func.geography(location), center, radius_m))
+    if statuses:
+        query = query.where(Order.status.in_(statuses))
+    return query.order_by(distance).limit(limit)
+
+
+def vehicles_within_polygon_query(ring: Sequence[Tuple[float, float]], status: Optional[VehicleStatus] = None):
+    """Vehicles whose current position is inside (or on the edge of) the polygon."""
+    query = select(
+        Vehicle, func.ST_Y(Vehicle.current_location), func.ST_X(Vehicle.current_location)
+    ).where(func.ST_Covers(polygon_element(ring), Vehicle.current_location))
+    if status is not None:
+        query = query.where(Vehicle.status == status)
+    return query.order_by(Vehicle.id)
+
+
+def orders_along_corridor_query(
+    path: Sequence[Tuple[float, float]], width_m: float, point: str = "delivery",
+    statuses: Optional[List[OrderStatus]] = None, limit: int = 500,
+):
+    """Orders within width_m of the path, ordered by position along it."""
+    location = order_location_column(point)
+    line = line_element(path)
+    distance = func.ST_Distance(func.geography(location), func.geography(line))
+    fraction = func.ST_LineLocatePoint(line, location)
+    query = select(
+        Order, func.ST_Y(location), func.ST_X(location), distance.label("distance_m"), fraction.label("route_fraction")
+    ).where(func.ST_DWithin(func.geography(location), func.geography(line), width_m))
+    if statuses:
+        query = query.where(Order.status.in_(statuses))
+    return query.order_by(fraction, distance).limit(limit)
+
+
+def _order_row(order: Order, lat: float, lng: float, distance_m: float, route_fraction: Optional[float] = None) -> dict:
+    return {
+        "id": order.id,
+        "status": order.status,
+        "customer_name": order.customer_name,
+        "pickup_address": order.pickup_address,
+        "delivery_address": order.delivery_address,
+        "vehicle_id": order.vehicle_id,
+        "location": {"lat": lat, "lng": lng},
+        "distance_m": round(distance_m, 1),
+        "route_fraction": round(route_fraction, 4) if route_fraction is not None else None,
+    }
+
+
+async def orders_within_radius(db: AsyncSession, lat: float, lng: float, radius_m: float, **kwargs) -> List[dict]:
+    result = await db.execute(orders_within_radius_query(lat, lng, radius_m, **kwargs))
+    return [_order_row(*row) for row in result.all()]
+
+
+async def vehicles_within_polygon(db: AsyncSession, ring: Sequence[Tuple[float, float]], **kwargs) -> List[dict]:
+    result = await db.execute(vehicles_within_polygon_query(ring, **kwargs))
+    return [
+        {
+            "id": vehicle.id,
+            "plate_number": vehicle.plate_number,
+            "status": vehicle.status,
+            "location": {"lat": lat, "lng": lng},
+            "current_speed": vehicle.current_speed,
+        }
+        for vehicle, lat, lng in result.all()
+    ]
+
+
+async def orders_along_corridor(db: AsyncSession, path: Sequence[Tuple[float, float]], width_m: float, **kwargs) -> List[dict]:
+    result = await db.execute(orders_along_corridor_query(path, width_m, **kwargs))
+    return [_order_row(*row) for row in result.all()]
@@ -0,0 +1,172 @@
+"""
+Тарифы из БД в виде неизменяемого снимка в памяти.
+
+Снимок (TariffSnapshot) строится целиком при загрузке и подменяется одной
+операцией присваивания, поэтому расчет цены никогда не ходит в БД и не видит
+"полуобновленных" тарифов. Зоны индексируются STRtree, поиск зоны для точки -
+микросекунды даже на тысячах полигонов.
+
+Порядок выбора тарифа (побеждает больший priority внутри группы):
+    1. тариф клиента с зоной, содержащей точку забора
+    2. тариф клиента без зоны
+    3. тариф зоны, содержащей точку забора
+    4. тариф без зоны и клиента (по умолчанию)
+    5. PricingConfig
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from shapely import STRtree
+from shapely.geometry import Point
+from shapely.prepared import prep
+from geoalchemy2.shape import to_shape
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models import Tariff
+from app.services.pricing import TariffRates, default_rates
+
+
+@dataclass(frozen=True)
+class TariffSnapshot:
+    version: int = 0
+    default: Optional[TariffRates] = None
+    by_customer: Dict[int, TariffRates] = field(default_factory=dict)
+    zone_rates: Tuple[TariffRates, ...] = ()
+    zone_customers: Tuple[Optional[int], ...] = ()
+    zone_priorities: Tuple[int, ...] = ()
+    zone_geoms: tuple = ()
+    zone_tree: Optional[STRtree] = None
+
+    def resolve(self, lat: float, lng: float, customer_id: Optional[int] = None) -> TariffRates:
+        """Pick tariff for a pickup point and (optional) customer."""
+        if self.zone_tree is not None:
+            point = Point(lng, lat)
+            best_customer, best_zone = None, None
+            for idx in self.zone_tree.query(point):
+                if not self.zone_geoms[idx].contains(point):
+                    continue
+                zone_customer = self.zone_customers[idx]
+                priority = self.zone_priorities[idx]
+                if zone_customer is None:
+                    if best_zone is None or priority > best_zone[0]:
+                        best_zone = (priority, idx)
+                elif zone_customer == customer_id:
+                    if best_customer is None or priority > best_customer[0]:
+                        best_customer = (priority, idx)
+            if best_customer is not None:
+                return self.zone_rates[best_customer[1]]
+            if customer_id is not None and customer_id in self.by_customer:
+                return self.by_customer[customer_id]
+            if best_zone is not None:
+                return self.zone_rates[best_zone[1]]
+        elif customer_id is not None and customer_id in self.by_customer:
+            return self.by_customer[customer_id]
+
+        return self.default or default_rates()
+
+
+def tariff_to_rates(tariff: Tariff) -> TariffRates:
+    return TariffRates(
+        base_price=tariff.base_price,
+        rate_per_km=tariff.rate_per_km,
+        rate_per_kg=tariff.rate_per_kg,
+        volumetric_divisor=tariff.volumetric_divisor,
+        tariff_id=tariff.id,
+        name=tariff.name,
+    )
+
+
+def build_snapshot(tariffs: List[Tariff], version: int) -> TariffSnapshot:
+    """Build immutable snapshot from active tariff rows."""
+    default: Optional[Tuple[int, TariffRates]] = None
+    by_customer: Dict[int, Tuple[int, TariffRates]] = {}
+    zone_rates, zone_customers, zone_priorities, zone_geoms, raw_geoms = [], [], [], [], []
+
+    for tariff in tariffs:
+        if not tariff.is_active:
+            continue
+        rates = tariff_to_rates(tariff)
+        priority = tariff.priority or 0
+
+        if tariff.zone is not None:
+            geom = to_shape(tariff.zone)
+            raw_geoms.append(geom)
+            zone_geoms.append(prep(geom))
+            zone_rates.append(rates)
+            zone_customers.append(tariff.customer_id)
+            zone_priorities.append(priority)
+        elif tariff.customer_id is not None:
+            current = by_customer.get(tariff.customer_id)
+            if current is None or priority > current[0]:
+                by_customer[tariff.customer_id] = (priority, rates)
+        elif default is None or priority > default[0]:
+            default = (priority, rates)
+
+    return TariffSnapshot(
+        version=version,
+        default=default[1] if default else None,
+        by_customer={customer_id: rates for customer_id, (_, rates) in by_customer.items()},
+        zone_rates=tuple(zone_rates),
+        zone_customers=tuple(zone_customers),
+        zone_priorities=tuple(zone_priorities),
+        zone_geoms=tuple(zone_geoms),
+        zone_tree=STRtree(raw_geoms) if raw_geoms else None,
+    )
+
+
+class TariffRegistry:
+    """Holds current snapshot; reload() swaps it atomically."""
+
+    def __init__(self):
+        self.snapshot = TariffSnapshot()
+        self._stamp: Optional[tuple] = None
+        self._lock = asyncio.Lock()
+
+    def resolve(self, lat: float, lng: float, customer_id: Optional[int] = None) -> TariffRates:
+        return self.snapshot.resolve(lat, lng, customer_id)
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    async def _read_stamp(self, db: AsyncSession) -> tuple:
+        result = await db.execute(
+            select(
+                func.count(Tariff.id),
+                func.max(func.coalesce(Tariff.updated_at, Tariff.created_at))
+            )
+        )
+        return tuple(result.one())
+
+    async def reload(self, db: Optional[AsyncSession] = None, force: bool = True) -> bool:
+        """Load tariffs from DB and swap snapshot. Returns True if snapshot changed."""
+        async with self._lock:
+            if db is None:
+                async with AsyncSessionLocal() as session:
+                    return await self._reload(session, force)
+            return await self._reload(db, force)
+
+    async def _reload(self, db: AsyncSession, force: bool) -> bool:
+        stamp = await self._read_stamp(db)
+        if not force and stamp == self._stamp:
+            return False
+        result = await db.execute(select(Tariff).where(Tariff.is_active.is_(True)))
+        snapshot = build_snapshot(list(result.scalars().all()), self.snapshot.version + 1)
+        self.snapshot = snapshot
+        self._stamp = stamp
+        return True
+
+    async def watch(self, interval_seconds: float):
+        """Periodically pick up tariff changes made by other workers."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                await self.reload(force=False)
+            except Exception as e:
+                print(f"Error refreshing tariffs: {str(e)}")
+
+
+tariff_registry = TariffRegistry()
@@ -0,0 +1,162 @@
+"""
+Бинарный протокол трекеров LogiTrack (LTP v1).
+
+Все числа little-endian. Кадр = заголовок 6 байт + полезная нагрузка:
+
+    magic    u16   0x544C ("LT")
+    version  u8    1
+    type     u8    тип кадра
+    length   u16   длина полезной нагрузки, байт
+
+Типы кадров:
+
+    0x01 LOGIN      (TCP, устройство -> сервер)
+                    vehicle_id u32, device_id - ASCII до 64 байт (остаток кадра)
+    0x02 FIXES      (TCP, устройство -> сервер)
+                    N записей FIX подряд (N = length / 22)
+    0x03 UDP_FIXES  (UDP, одна датаграмма = один кадр)
+                    vehicle_id u32, id_len u8, device_id, затем записи FIX
+    0x81 ACK        (сервер -> устройство)
+                    seq u32 последней сохраненной точки; после ACK устройство
+                    может удалить точки до seq включительно из своего буфера
+    0x82 ERROR      (сервер -> устройство)
+                    code u8 (1 - нет LOGIN, 2 - неверный кадр)
+
+Запись FIX, 22 байта:
+
+    seq       u32   порядковый номер точки на устройстве (ключ идемпотентности)
+    time      u32   время фикса, unix-секунды UTC
+    lat       i32   широта × 1e7
+    lng       i32   долгота × 1e7
+    speed     u16   скорость × 10, км/ч
+    heading   u16   курс × 10, градусы
+    fuel      u8    уровень топлива, %; 0xFF - нет данных
+    flags     u8    зарезервировано
+
+Декодирование идет по memoryview без копирования буфера (struct.iter_unpack).
+"""
+import struct
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+MAGIC = 0x544C
+VERSION = 1
+
+FRAME_LOGIN = 0x01
+FRAME_FIXES = 0x02
+FRAME_UDP_FIXES = 0x03
+FRAME_ACK = 0x81
+FRAME_ERROR = 0x82
+
+ERROR_NOT_LOGGED_IN = 1
+ERROR_BAD_FRAME = 2
+
+HEADER = struct.Struct("<HBBH")
+FIX = struct.Struct("<IIiiHHBB")
+LOGIN = struct.Struct("<I")
+UDP_PREFIX = struct.Struct("<IB")
+ACK = struct.Struct("<I")
+
+COORD_SCALE = 1e7
+NO_FUEL = 0xFF
+MAX_PAYLOAD = 0xFFFF
+MAX_FIXES_PER_FRAME = MAX_PAYLOAD // FIX.size
+
+# (seq, time, lat, lng, speed, heading, fuel) - уже в обычных единицах
+Fix = Tuple[int, int, float, float, float, float, Optional[float]]
+
+
+class ProtocolError(Exception):
+    pass
+
+
+def decode_header(data) -> Tuple[int, int]:
+    """Returns (frame type, payload length)."""
+    if len(data) < HEADER.size:
+        raise ProtocolError("truncated header")
+    magic, version, frame_type, length = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ProtocolError("bad magic or version")
+    return frame_type, length
+
+
+def decode_fixes(payload: memoryview) -> Iterator[Fix]:
+    if len(payload) % FIX.size:
+        raise ProtocolError("truncated FIX record")
+    for seq, ts, lat, lng, speed, heading, fuel, _flags in FIX.iter_unpack(payload):
+        yield (
+            seq,
+            ts,
+            lat / COORD_SCALE,
+            lng / COORD_SCALE,
+            speed / 10,
+            heading / 10,
+            None if fuel == NO_FUEL else float(fuel),
+        )
+
+
+def decode_login(payload: memoryview) -> Tuple[int, str]:
+    if len(payload) < LOGIN.size:
+        raise ProtocolError("truncated LOGIN")
+    (vehicle_id,) = LOGIN.unpack_from(payload)
+    return vehicle_id, bytes(payload[LOGIN.size:]).decode("ascii")
+
+
+def decode_udp_frame(data: bytes) -> Tuple[int, str, Iterator[Fix]]:
+    """Decode a whole UDP datagram: (vehicle_id, device_id, fixes)."""
+    view = memoryview(data)
+    frame_type, length = decode_header(view)
+    if frame_type != FRAME_UDP_FIXES or len(view) != HEADER.size + length:
+        raise ProtocolError("bad UDP frame")
+    payload = view[HEADER.size:]
+    if len(payload) < UDP_PREFIX.size:
+        raise ProtocolError("truncated UDP prefix")
+    vehicle_id, id_len = UDP_PREFIX.unpack_from(payload)
+    start = UDP_PREFIX.size + id_len
+    if len(payload) < start:
+        raise ProtocolError("truncated device id")
+    device_id = bytes(payload[UDP_PREFIX.size:start]).decode("ascii")
+    return vehicle_id, device_id, decode_fixes(payload[start:])
+
+
+def encode_frame(frame_type: int, payload: bytes) -> bytes:
+    if len(payload) > MAX_PAYLOAD:
+        raise ProtocolError("payload too large")
+    return HEADER.pack(MAGIC, VERSION, frame_type, len(payload)) + payload
+
+
+def encode_fix_records(fixes: Sequence[Fix]) -> bytes:
+    buffer = bytearray(FIX.size * len(fixes))
+    for i, (seq, ts, lat, lng, speed, heading, fuel) in enumerate(fixes):
+        FIX.pack_into(
+            buffer, i * FIX.size, seq, ts,
+            round(lat * COORD_SCALE), round(lng * COORD_SCALE),
+            round(speed * 10), round(heading * 10) % 3600,
+            NO_FUEL if fuel is None else int(fuel), 0
+        )
+    return bytes(buffer)
+
+
+def encode_login(vehicle_id: int, device_id: str) -> bytes:
+    return encode_frame(FRAME_LOGIN, LOGIN.pack(vehicle_id) + device_id.encode("ascii"))
+
+
+def encode_fixes(fixes: Sequence[Fix]) -> bytes:
+    return encode_frame(FRAME_FIXES, encode_fix_records(fixes))
+
+
+def encode_udp_fixes(vehicle_id: int, device_id: str, fixes: Sequence[Fix]) -> bytes:
+    raw_id = device_id.encode("ascii")
+    return encode_frame(FRAME_UDP_FIXES, UDP_PREFIX.pack(vehicle_id, len(raw_id)) + raw_id + encode_fix_records(fixes))
+
+
+def encode_ack(seq: int) -> bytes:
+    return encode_frame(FRAME_ACK, ACK.pack(seq))
+
+
+def encode_error(code: int) -> bytes:
+    return encode_frame(FRAME_ERROR, bytes([code]))
+
+
+def split_fixes(fixes: List[Fix], per_frame: int = MAX_FIXES_PER_FRAME) -> Iterator[List[Fix]]:
+    for start in range(0, len(fixes), per_frame):
+        yield fixes[start:start + per_frame]
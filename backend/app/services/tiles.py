@@ -0,0 +1,145 @@
+"""
+Векторные тайлы карты (Mapbox Vector Tile) через PostGIS ST_AsMVT.
+
+Слои тайла z/x/y (Web Mercator):
+- vehicles - текущие позиции машин (id, plate_number, status, speed)
+- orders - точки забора и доставки активных заказов (id, kind, status)
+- tracks - упрощенные треки за TILES_TRACK_HOURS, с zoom >= TILES_TRACK_MIN_ZOOM
+
+Все слои считаются одним запросом, байты слоев склеиваются (MVT допускает
+конкатенацию слоев).
+
+Кэш: общий cache (app.core.cache), ключ и тег - tile:z:x:y. Широкие теги
+"orders"/"vehicles" тайлы не несут: иначе любая запись сбрасывала бы все тайлы.
+Когда машина переходит в другой тайл, сбрасываются ее старый и новый тайл
+этого zoom (только zoom >= TILES_INVALIDATE_MIN_ZOOM). Сдвиг внутри тайла,
+изменения заказов и мелкие zoom обновляются по TTL (TILES_CACHE_TTL_SECONDS).
+"""
+import math
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+from sqlalchemy import String, cast, func, literal, select, union_all
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.models import Order, OrderStatus, TrackingPoint, Vehicle
+
+MVT_EXTENT = 4096
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def tile_key(z: int, x: int, y: int) -> str:
+    return f"tile:{z}:{x}:{y}"
+
+
+def tile_for(lat: float, lng: float, z: int) -> Tuple[int, int]:
+    """XYZ tile containing the point."""
+    n = 2 ** z
+    lat = max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat))
+    x = int((lng + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def point_tile_keys(lat: float, lng: float) -> List[str]:
+    """Keys of tiles containing the point on zooms that are invalidated live."""
+    max_zoom = settings.TILES_MAX_ZOOM
+    x, y = tile_for(lat, lng, max_zoom)
+    return [
+        tile_key(z, x >> (max_zoom - z), y >> (max_zoom - z))
+        for z in range(settings.TILES_INVALIDATE_MIN_ZOOM, max_zoom + 1)
+    ]
+
+
+def _mvt_layer(rows, name: str):
+    layer = rows.subquery(name)
+    return select(func.ST_AsMVT(layer.table_valued(), name, MVT_EXTENT, "geom")).scalar_subquery()
+
+
+def tile_query(z: int, x: int, y: int, now: datetime):
+    envelope = func.ST_TileEnvelope(z, x, y)
+    bbox = func.ST_Transform(envelope, 4326)
+
+    def mvt_geom(geometry):
+        return func.ST_AsMVTGeom(func.ST_Transform(geometry, 3857), envelope, MVT_EXTENT).label("geom")
+
+    vehicles = select(
+        mvt_geom(Vehicle.current_location),
+        Vehicle.id,
+        Vehicle.plate_number,
+        cast(Vehicle.status, String).label("status"),
+        Vehicle.current_speed.label("speed"),
+    ).where(Vehicle.current_location.isnot(None), Vehicle.current_location.op("&&")(bbox))
+
+    active = Order.status.in_([OrderStatus.NEW, OrderStatus.IN_PROGRESS])
+    orders = union_all(*(
+        select(
+            mvt_geom(location),
+            Order.id,
+            literal(kind).label("kind"),
+            cast(Order.status, String).label("status"),
+        ).where(active, location.isnot(None), location.op("&&")(bbox))
+        for kind, location in (("pickup", Order.pickup_location), ("delivery", Order.delivery_location))
+    ))
+
+    layers = [_mvt_layer(vehicles, "vehicles"), _mvt_layer(orders, "orders")]
+
+    if z >= settings.TILES_TRACK_MIN_ZOOM:
+        recent = TrackingPoint.timestamp >= now - timedelta(hours=settings.TILES_TRACK_HOURS)
+        in_tile = select(TrackingPoint.vehicle_id).where(recent, TrackingPoint.location.op("&&")(bbox))
+        # Линия строится по всему треку машины и обрезается тайлом, иначе выход
+        # из тайла и возврат в него соединились бы прямой
+        tolerance = 360.0 / 2 ** z / MVT_EXTENT * settings.TILES_SIMPLIFY_PIXELS
+        lines = select(
+            TrackingPoint.vehicle_id,
+            func.ST_Simplify(
+                func.ST_MakeLine(aggregate_order_by(TrackingPoint.location, TrackingPoint.timestamp)), tolerance
+            ).label("line"),
+        ).where(recent, TrackingPoint.vehicle_id.in_(in_tile)).group_by(TrackingPoint.vehicle_id).subquery()
+        tracks = select(mvt_geom(lines.c.line), lines.c.vehicle_id).where(func.ST_NPoints(lines.c.line) > 1)
+        layers.append(_mvt_layer(tracks, "tracks"))
+
+    return select(*layers)
+
+
+async def render_tile(db: AsyncSession, z: int, x: int, y: int) -> bytes:
+    row = (await db.execute(tile_query(z, x, y, datetime.now(timezone.utc)))).one()
+    return b"".join(bytes(layer) for layer in row if layer)
+
+
+async def get_tile(db: AsyncSession, z: int, x: int, y: int) -> bytes:
+    key = tile_key(z, x, y)
+    return await cache.get_or_load(
+        key,
+        lambda: render_tile(db, z, x, y),
+        ttl=settings.TILES_CACHE_TTL_SECONDS,
+        tags=("tiles", key),
+    )
+
+
+class TileInvalidator:
+    """Drops cached tiles when a vehicle crosses into another tile."""
+
+    def __init__(self):
+        self._last_keys: Dict[int, List[str]] = {}
+        self.invalidations = 0
+
+    async def vehicle_moved(self, vehicle_id: int, lat: float, lng: float):
+        keys = point_tile_keys(lat, lng)
+        previous = self._last_keys.get(vehicle_id)
+        self._last_keys[vehicle_id] = keys
+        if previous is None:
+            # Первая точка после старта: старый тайл неизвестен
+            changed = set(keys)
+        else:
+            # Ключи выровнены по zoom: сбрасываем только zoom, где тайл сменился
+            changed = {key for pair in zip(previous, keys) if pair[0] != pair[1] for key in pair}
+        if changed:
+            await cache.invalidate_tags(*changed)
+            self.invalidations += 1
+
+
+tile_invalidator = TileInvalidator()
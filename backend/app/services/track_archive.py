@@ -0,0 +1,360 @@
+"""
+Колоночный архив старых точек трекинга.
+
+Точки старше TRACK_ARCHIVE_AFTER_DAYS переносятся из tracking_points в файлы
+на локальном диске - один файл на машину и день:
+
+    {TRACK_ARCHIVE_DIR}/{vehicle_id}/{YYYY-MM-DD}.ltc
+
+Формат файла (little-endian):
+
+    magic       4 байта  b"LTCA"
+    version     u16      1
+    header_len  u32      длина JSON-заголовка
+    header      JSON     {"count", "columns": [{"name", "dtype", "offset", "base", "scale", "delta"}]}
+    данные      колонки подряд, каждая выровнена на 8 байт
+
+Колонки:
+- id, time (мс с эпохи) - дельта-кодирование от base
+- lat, lng - фиксированная точка (×1e6), дельта-кодирование
+- speed, heading - ×10, uint16 (heading 65535 = нет данных); fuel - uint8, 255 = нет данных
+
+Для каждой дельта-колонки выбирается самый узкий целый тип, в который
+помещаются дельты (обычно int16), так что точка занимает ~13-17 байт против
+~100 байт строки PostGIS. Чтение - через np.memmap без загрузки файла целиком.
+"""
+import asyncio
+import json
+import os
+import struct
+from dataclasses import dataclass
+from datetime import date, datetime, time as dtime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from geoalchemy2.shape import to_shape
+from sqlalchemy import select, delete, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import TrackingPoint
+
+MAGIC = b"LTCA"
+VERSION = 1
+PREAMBLE = struct.Struct("<4sHI")
+ALIGN = 8
+
+COORD_SCALE = 1e6
+NO_FUEL = 255
+NO_HEADING = 65535
+
+# (id, timestamp, lat, lng, speed, fuel_level, heading)
+ArchivedPoint = Tuple[int, datetime, float, float, float, Optional[float], Optional[float]]
+
+
+@dataclass
+class TrackColumns:
+    """Decoded day of points, sorted by time."""
+    ids: np.ndarray
+    times_ms: np.ndarray
+    lat: np.ndarray
+    lng: np.ndarray
+    speed: np.ndarray
+    heading: np.ndarray
+    fuel: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.times_ms)
+
+    def slice(self, start: int, stop: int) -> "TrackColumns":
+        return TrackColumns(*(getattr(self, name)[start:stop] for name in self.__dataclass_fields__))
+
+
+def _narrowest_int(values: np.ndarray) -> np.dtype:
+    if values.size == 0:
+        return np.dtype("<i2")
+    low, high = int(values.min()), int(values.max())
+    for dtype in ("<i2", "<i4", "<i8"):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    raise ValueError("value out of int64 range")
+
+
+def _encode_delta(values: np.ndarray) -> Tuple[int, np.ndarray]:
+    values = values.astype(np.int64)
+    base = int(values[0]) if values.size else 0
+    deltas = np.diff(values, prepend=base)
+    return base, deltas.astype(_narrowest_int(deltas))
+
+
+def encode_columns(columns: TrackColumns) -> bytes:
+    lat_fixed = np.round(columns.lat * COORD_SCALE).astype(np.int64)
+    lng_fixed = np.round(columns.lng * COORD_SCALE).astype(np.int64)
+
+    arrays = []
+    for name, values, scale in (
+        ("id", columns.ids, 1),
+        ("time", columns.times_ms, 1),
+        ("lat", lat_fixed, COORD_SCALE),
+        ("lng", lng_fixed, COORD_SCALE),
+    ):
+        base, deltas = _encode_delta(values)
+        arrays.append((name, deltas, base, scale, True))
+    arrays.append(("speed", np.clip(np.round(columns.speed * 10), 0, 65535).astype("<u2"), 0, 10, False))
+    arrays.append(("heading", np.where(np.isnan(columns.heading), NO_HEADING, np.clip(np.round(columns.heading * 10), 0, 65534)).astype("<u2"), 0, 10, False))
+    arrays.append(("fuel", np.where(np.isnan(columns.fuel), NO_FUEL, np.clip(np.round(columns.fuel), 0, 254)).astype("u1"), 0, 1, False))
+
+    header_columns, offset = [], 0
+    for name, array, base, scale, is_delta in arrays:
+        header_columns.append({
+            "name": name, "dtype": array.dtype.str, "offset": offset,
+            "base": base, "scale": scale, "delta": is_delta,
+        })
+        offset += -(-array.nbytes // ALIGN) * ALIGN
+
+    header = json.dumps({"count": len(columns), "columns": header_columns}).encode()
+    data_start = -(-(PREAMBLE.size + len(header)) // ALIGN) * ALIGN
+    buffer = bytearray(data_start + offset)
+    PREAMBLE.pack_into(buffer, 0, MAGIC, VERSION, len(header))
+    buffer[PREAMBLE.size:PREAMBLE.size + len(header)] = header
+    for column, (_, array, _, _, _) in zip(header_columns, arrays):
+        start = data_start + column["offset"]
+        buffer[start:start + array.nbytes] = array.tobytes()
+    return bytes(buffer)
+
+
+def read_columns(path: Path) -> TrackColumns:
+    """Memory-map an archive file and decode its columns."""
+    raw = np.memmap(path, dtype=np.uint8, mode="r")
+    magic, version, header_len = PREAMBLE.unpack_from(raw)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"Not a track archive file: {path}")
+    header = json.loads(bytes(raw[PREAMBLE.size:PREAMBLE.size + header_len]))
+    data_start = -(-(PREAMBLE.size + header_len) // ALIGN) * ALIGN
+    count = header["count"]
+
+    decoded: Dict[str, np.ndarray] = {}
+    for column in header["columns"]:
+        dtype = np.dtype(column["dtype"])
+        start = data_start + column["offset"]
+        values = raw[start:start + count * dtype.itemsize].view(dtype)
+        if column["delta"]:
+            values = np.cumsum(values, dtype=np.int64) + column["base"]
+        decoded[column["name"]] = values
+
+    fuel = decoded["fuel"].astype(np.float64)
+    fuel[decoded["fuel"] == NO_FUEL] = np.nan
+    heading = decoded["heading"] / 10
+    heading[decoded["heading"] == NO_HEADING] = np.nan
+    return TrackColumns(
+        ids=decoded["id"],
+        times_ms=decoded["time"],
+        lat=decoded["lat"] / COORD_SCALE,
+        lng=decoded["lng"] / COORD_SCALE,
+        speed=decoded["speed"] / 10,
+        heading=heading,
+        fuel=fuel,
+    )
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _merge(a: TrackColumns, b: TrackColumns) -> TrackColumns:
+    merged = TrackColumns(*(np.concatenate([getattr(a, n), getattr(b, n)]) for n in a.__dataclass_fields__))
+    # Сортировка по времени и удаление дублей по id (повторный запуск после сбоя)
+    _, unique = np.unique(merged.ids, return_index=True)
+    order = unique[np.argsort(merged.times_ms[unique], kind="stable")]
+    return TrackColumns(*(getattr(merged, n)[order] for n in merged.__dataclass_fields__))
+
+
+class TrackArchive:
+    """Per-vehicle/per-day columnar files on local disk."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+
+    def day_path(self, vehicle_id: int, day: date) -> Path:
+        return self.root / str(vehicle_id) / f"{day.isoformat()}.ltc"
+
+    def vehicle_days(self, vehicle_id: int) -> List[date]:
+        directory = self.root / str(vehicle_id)
+        if not directory.is_dir():
+            return []
+        return sorted(date.fromisoformat(p.stem) for p in directory.glob("*.ltc"))
+
+    def vehicle_ids(self) -> List[int]:
+        if not self.root.is_dir():
+            return []
+        return sorted(int(p.name) for p in self.root.iterdir() if p.is_dir() and p.name.isdigit())
+
+    def write_day(self, vehicle_id: int, day: date, columns: TrackColumns):
+        """Write (or merge into) a day file atomically and durably."""
+        path = self.day_path(vehicle_id, day)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            columns = _merge(read_columns(path), columns)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(encode_columns(columns))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def read_range(
+        self,
+        vehicle_id: int,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        limit: int,
+    ) -> List[ArchivedPoint]:
+        """Points with start <= timestamp < end, newest first, at most limit."""
+        start, end = _as_utc(start), _as_utc(end)
+        start_ms = int(start.timestamp() * 1000) if start else None
+        end_ms = int(end.timestamp() * 1000) if end else None
+        points: List[ArchivedPoint] = []
+
+        for day in reversed(self.vehicle_days(vehicle_id)):
+            if start and day < start.date():
+                break
+            if end and day > end.date():
+                continue
+            columns = read_columns(self.day_path(vehicle_id, day))
+            lo = int(np.searchsorted(columns.times_ms, start_ms, side="left")) if start_ms is not None else 0
+            hi = int(np.searchsorted(columns.times_ms, end_ms, side="left")) if end_ms is not None else len(columns)
+            lo = max(lo, hi - (limit - len(points)))
+            points.extend(reversed(list(self._rows(columns.slice(lo, hi)))))
+            if len(points) >= limit:
+                break
+        return points
+
+    def read_window(self, vehicle_id: int, start: datetime, end: datetime) -> List[ArchivedPoint]:
+        """Points with start <= timestamp < end, oldest first. Only day files of the window are mapped."""
+        start, end = _as_utc(start), _as_utc(end)
+        start_ms, end_ms = int(start.timestamp() * 1000), int(end.timestamp() * 1000)
+        points: List[ArchivedPoint] = []
+        day = start.date()
+        while day <= (end - timedelta(microseconds=1)).date():
+            path = self.day_path(vehicle_id, day)
+            if path.exists():
+                columns = read_columns(path)
+                lo = int(np.searchsorted(columns.times_ms, start_ms, side="left"))
+                hi = int(np.searchsorted(columns.times_ms, end_ms, side="left"))
+                points.extend(self._rows(columns.slice(lo, hi)))
+            day += timedelta(days=1)
+        return points
+
+    @staticmethod
+    def _rows(columns: TrackColumns) -> Iterator[ArchivedPoint]:
+        for point_id, ts, lat, lng, speed, fuel, heading in zip(
+            columns.ids.tolist(), columns.times_ms.tolist(), columns.lat.tolist(), columns.lng.tolist(),
+            columns.speed.tolist(), columns.fuel.tolist(), columns.heading.tolist(),
+        ):
+            yield (
+                point_id,
+                datetime.fromtimestamp(ts / 1000, tz=timezone.utc),
+                lat, lng, speed,
+                None if fuel != fuel else fuel,  # NaN -> None
+                None if heading != heading else heading,
+            )
+
+    def stats(self) -> dict:
+        files = list(self.root.glob("*/*.ltc")) if self.root.is_dir() else []
+        return {
+            "root": str(self.root),
+            "files": len(files),
+            "bytes": sum(f.stat().st_size for f in files),
+        }
+
+
+def _points_to_columns(points: List[TrackingPoint]) -> TrackColumns:
+    shapes = [to_shape(p.location) for p in points]
+    return TrackColumns(
+        ids=np.array([p.id for p in points], dtype=np.int64),
+        times_ms=np.array([int(p.timestamp.timestamp() * 1000) for p in points], dtype=np.int64),
+        lat=np.array([s.y for s in shapes], dtype=np.float64),
+        lng=np.array([s.x for s in shapes], dtype=np.float64),
+        speed=np.array([p.speed or 0.0 for p in points], dtype=np.float64),
+        heading=np.array([np.nan if p.heading is None else p.heading for p in points], dtype=np.float64),
+        fuel=np.array([np.nan if p.fuel_level is None else p.fuel_level for p in points], dtype=np.float64),
+    )
+
+
+async def archive_day(db: AsyncSession, archive: TrackArchive, vehicle_id: int, day: date) -> int:
+    """Move one vehicle-day of points from the DB to the archive. Returns moved count."""
+    day_start = datetime.combine(day, dtime.min, tzinfo=timezone.utc)
+    in_day = (
+        (TrackingPoint.vehicle_id == vehicle_id)
+        & (TrackingPoint.timestamp >= day_start)
+        & (TrackingPoint.timestamp < day_start + timedelta(days=1))
+    )
+    result = await db.execute(select(TrackingPoint).where(in_day).order_by(TrackingPoint.timestamp, TrackingPoint.id))
+    points = list(result.scalars().all())
+    if not points:
+        return 0
+
+    # Сначала файл (fsync), потом удаление строк: при сбое между ними точки
+    # останутся и в БД, и в архиве - повторный запуск сольет их без дублей
+    await asyncio.to_thread(archive.write_day, vehicle_id, day, _points_to_columns(points))
+    # Тем же условием дня, а не списком id (суточный трек - десятки тысяч параметров,
+    # больше лимита PostgreSQL); точки за день старше GPS_MAX_AGE_HOURS уже не принимаются
+    await db.execute(delete(TrackingPoint).where(in_day, TrackingPoint.id <= max(p.id for p in points)))
+    await db.commit()
+    return len(points)
+
+
+def archive_cutoff_day(older_than_days: int, now: Optional[datetime] = None) -> date:
+    """First UTC day that stays in tracking_points; earlier days may be in the archive."""
+    return (now or datetime.now(timezone.utc)).date() - timedelta(days=older_than_days)
+
+
+async def archive_old_points(archive: TrackArchive, older_than_days: int, max_days: Optional[int] = None) -> int:
+    """Archive all complete UTC days older than the cutoff."""
+    cutoff = datetime.combine(archive_cutoff_day(older_than_days), dtime.min, tzinfo=timezone.utc)
+    day_column = func.date(func.timezone("UTC", TrackingPoint.timestamp))
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(TrackingPoint.vehicle_id, day_column)
+            .where(TrackingPoint.timestamp < cutoff)
+            .group_by(TrackingPoint.vehicle_id, day_column)
+            .order_by(day_column)
+            .limit(max_days)
+        )
+        vehicle_days = result.all()
+
+        moved = 0
+        for vehicle_id, day in vehicle_days:
+            moved += await archive_day(db, archive, vehicle_id, day)
+        return moved
+
+
+async def run_archiver(archive: TrackArchive, older_than_days: int, interval_seconds: float):
+    """Background task: periodically move old points to the archive."""
+    while True:
+        try:
+            moved = await archive_old_points(archive, older_than_days)
+            if moved:
+                print(f"Archived {moved} tracking points")
+        except Exception as e:
+            print(f"Error archiving tracking points: {str(e)}")
+        await asyncio.sleep(interval_seconds)
+
+
+track_archive = TrackArchive(settings.TRACK_ARCHIVE_DIR)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Move old tracking points to the columnar archive")
+    parser.add_argument("--older-than-days", type=int, default=settings.TRACK_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--max-days", type=int, default=None, help="Limit vehicle-days per run")
+    args = parser.parse_args()
+    moved = asyncio.run(archive_old_points(track_archive, args.older_than_days, args.max_days))
+    print(f"Archived {moved} tracking points to {track_archive.root}")
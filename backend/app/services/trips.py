@@ -0,0 +1,232 @@
+"""
+Пробег и поездки из потока точек трекинга.
+
+На каждую точку:
+- расстояние считается инкрементально (гаверсинус от последней принятой
+  точки). Смещения меньше TRIP_JITTER_M не учитываются, пока машина не уйдет
+  дальше - так GPS-дрожание на стоянке не накручивает пробег
+- поездка начинается с движения и заканчивается стоянкой дольше
+  TRIP_STOP_MINUTES или разрывом в данных дольше TRIP_MAX_GAP_MINUTES.
+  Короткие стоянки внутри поездки идут в idle_seconds
+
+Состояние незавершенной поездки и пробег хранятся в строке машины
+(Vehicle.trip_state, odometer_*), а не в памяти воркера: строка заблокирована
+транзакцией приема (FOR UPDATE), поэтому точки одной машины, пришедшие в разные
+воркеры, продолжают одну и ту же поездку и не учитывают участок дважды.
+Машины, переставшие присылать точки, закрывает фоновая задача run().
+"""
+import asyncio
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+
+from geoalchemy2.elements import WKTElement
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Trip, Vehicle
+from app.services.pricing import calculate_haversine_distance
+
+
+@dataclass
+class TripSummary:
+    vehicle_id: int
+    started_at: datetime
+    ended_at: datetime
+    start_lat: float
+    start_lng: float
+    end_lat: float
+    end_lng: float
+    distance_km: float
+    max_speed: float
+    idle_seconds: float
+    point_count: int
+
+    @property
+    def avg_speed(self) -> float:
+        moving_hours = ((self.ended_at - self.started_at).total_seconds() - self.idle_seconds) / 3600
+        return self.distance_km / moving_hours if moving_hours > 0 else 0.0
+
+    def to_model(self) -> Trip:
+        return Trip(
+            vehicle_id=self.vehicle_id,
+            started_at=self.started_at,
+            ended_at=self.ended_at,
+            start_location=WKTElement(f"POINT({self.start_lng} {self.start_lat})", srid=4326),
+            end_location=WKTElement(f"POINT({self.end_lng} {self.end_lat})", srid=4326),
+            distance_km=round(self.distance_km, 3),
+            max_speed=self.max_speed,
+            avg_speed=round(self.avg_speed, 1),
+            idle_seconds=self.idle_seconds,
+            point_count=self.point_count,
+        )
+
+
+@dataclass
+class VehicleTripState:
+    anchor_lat: float  # Последняя принятая (не дрожание) позиция
+    anchor_lng: float
+    last_at: datetime
+    trip: Optional[TripSummary] = None
+    stopped_since: Optional[datetime] = None
+
+    def to_json(self) -> dict:
+        data = asdict(self)
+        for holder in (data, data["trip"]):
+            for name, value in (holder or {}).items():
+                if isinstance(value, datetime):
+                    holder[name] = value.isoformat()
+        return data
+
+    @classmethod
+    def from_json(cls, data: dict) -> "VehicleTripState":
+        def parse(value):
+            return datetime.fromisoformat(value) if value is not None else None
+
+        trip = data.get("trip")
+        if trip is not None:
+            trip = TripSummary(**{**trip, "started_at": parse(trip["started_at"]), "ended_at": parse(trip["ended_at"])})
+        return cls(
+            data["anchor_lat"], data["anchor_lng"], parse(data["last_at"]), trip, parse(data.get("stopped_since"))
+        )
+
+
+class TripEngine:
+    """Per-vehicle odometer accumulation and trip segmentation."""
+
+    def __init__(self, jitter_m: float, moving_speed_kmh: float, stop_minutes: float, max_gap_minutes: float):
+        self.jitter_km = jitter_m / 1000
+        self.moving_speed_kmh = moving_speed_kmh
+        self.stop_after = timedelta(minutes=stop_minutes)
+        self.max_gap = timedelta(minutes=max_gap_minutes)
+        self.trips_closed = 0
+
+    def process(self, vehicle: Vehicle, lat: float, lng: float, speed: Optional[float], at: datetime) -> Optional[TripSummary]:
+        """Feed a position of a locked vehicle row; returns closed trip or None."""
+        if vehicle.trip_state is None:
+            vehicle.trip_state = VehicleTripState(lat, lng, at).to_json()
+            return None
+        state = VehicleTripState.from_json(vehicle.trip_state)
+        if at <= state.last_at:
+            return None
+        closed = self._advance(state, vehicle.id, lat, lng, speed, at)
+        # Новый объект, а не правка на месте: так SQLAlchemy видит изменение JSONB
+        vehicle.trip_state = state.to_json()
+        return closed
+
+    def _advance(
+        self, state: VehicleTripState, vehicle_id: int, lat: float, lng: float, speed: Optional[float], at: datetime
+    ) -> Optional[TripSummary]:
+        closed = None
+        gap = at - state.last_at > self.max_gap
+        if gap and state.trip is not None:
+            closed = self._close(state, state.stopped_since or state.last_at)
+
+        step_km = calculate_haversine_distance(state.anchor_lat, state.anchor_lng, lat, lng)
+        moved = step_km >= self.jitter_km
+        moving = moved or (speed or 0.0) >= self.moving_speed_kmh
+        distance_km = step_km if moved else 0.0
+
+        trip = state.trip
+        if moving:
+            if trip is None:
+                # После разрыва в данных начало поездки неизвестно - начинаем с этой точки
+                started_at, start_lat, start_lng = (at, lat, lng) if gap else (state.last_at, state.anchor_lat, state.anchor_lng)
+                trip = state.trip = TripSummary(
+                    vehicle_id, started_at, at, start_lat, start_lng,
+                    lat, lng, 0.0, 0.0, 0.0, 0
+                )
+            if state.stopped_since is not None:
+                trip.idle_seconds += (at - state.stopped_since).total_seconds()
+                state.stopped_since = None
+            if not gap:
+                trip.distance_km += distance_km
+            trip.max_speed = max(trip.max_speed, speed or 0.0)
+            trip.point_count += 1
+            trip.ended_at = at
+            trip.end_lat, trip.end_lng = lat, lng
+        elif trip is not None:
+            trip.point_count += 1
+            if state.stopped_since is None:
+                state.stopped_since = trip.ended_at
+            if at - state.stopped_since >= self.stop_after:
+                closed = self._close(state, state.stopped_since)
+
+        if moved:
+            state.anchor_lat, state.anchor_lng = lat, lng
+        state.last_at = at
+        return closed
+
+    def advance_odometer(self, vehicle: Vehicle, lat: float, lng: float, at: datetime) -> float:
+        """Add distance from the persisted odometer position to vehicle.mileage; returns km added."""
+        if vehicle.odometer_at is not None and at <= vehicle.odometer_at:
+            return 0.0
+        distance_km = 0.0
+        if vehicle.odometer_lat is not None and vehicle.odometer_lng is not None:
+            distance_km = calculate_haversine_distance(vehicle.odometer_lat, vehicle.odometer_lng, lat, lng)
+            if distance_km < self.jitter_km:
+                vehicle.odometer_at = at
+                return 0.0
+            vehicle.mileage = (vehicle.mileage or 0.0) + distance_km
+        vehicle.odometer_lat, vehicle.odometer_lng, vehicle.odometer_at = lat, lng, at
+        return distance_km
+
+    def _close(self, state: VehicleTripState, ended_at: datetime) -> Optional[TripSummary]:
+        trip = state.trip
+        state.trip = None
+        state.stopped_since = None
+        if trip is None or trip.distance_km <= 0:
+            return None
+        trip.ended_at = ended_at
+        self.trips_closed += 1
+        return trip
+
+    async def close_stale(self, db: AsyncSession, now: datetime) -> List[TripSummary]:
+        """Close trips of vehicles that stopped reporting (e.g. ignition off). Caller commits."""
+        result = await db.execute(
+            select(Vehicle)
+            .where(
+                Vehicle.trip_state["trip"].astext.is_not(None),
+                Vehicle.odometer_at < now - self.stop_after,
+            )
+            .order_by(Vehicle.id)
+            # Машину, которая сейчас принимает точки, пропускаем до следующего прохода
+            .with_for_update(skip_locked=True)
+        )
+        closed = []
+        for vehicle in result.scalars().all():
+            state = VehicleTripState.from_json(vehicle.trip_state)
+            if state.trip is None or now - state.last_at < self.stop_after:
+                continue
+            trip = self._close(state, state.stopped_since or state.last_at)
+            vehicle.trip_state = state.to_json()
+            if trip is not None:
+                closed.append(trip)
+        return closed
+
+    async def run(self, interval_seconds: float):
+        """Periodically persist trips of silent vehicles."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                async with AsyncSessionLocal() as db:
+                    closed = await self.close_stale(db, datetime.now(timezone.utc))
+                    db.add_all([trip.to_model() for trip in closed])
+                    await db.commit()
+            except Exception as e:
+                print(f"Error closing stale trips: {str(e)}")
+
+    def stats(self) -> dict:
+        return {
+            "trips_closed": self.trips_closed,
+        }
+
+
+trip_engine = TripEngine(
+    settings.TRIP_JITTER_M,
+    settings.TRIP_MOVING_SPEED_KMH,
+    settings.TRIP_STOP_MINUTES,
+    settings.TRIP_MAX_GAP_MINUTES,
+)
@@ -0,0 +1,6 @@
+"""
+Бенчмарки API: наполнение базы, сценарии нагрузки и отчеты.
+
+Запускается из backend/ против docker-compose PostGIS (порт 5433) или любой
+базы из DATABASE_URL; внешние сервисы не нужны. Подробности - python -m bench -h.
+"""
@@ -0,0 +1,140 @@
+"""
+python -m bench seed --vehicles 200 --orders 20000 --points 1000000
+python -m bench run ingest lists --duration 30 --concurrency 16
+python -m bench run all --spawn            # поднять uvicorn на время прогона
+python -m bench compare bench/results/a.json bench/results/b.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+from pathlib import Path
+
+from bench.report import build_report, compare_reports, print_report, save_report
+from bench.scenarios import SCENARIOS, RunOptions, load_context
+from bench.seed import SeedConfig, seed
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+@contextmanager
+def spawn_server(workers: int, timeout: float = 60.0):
+    """uvicorn main:app on a free port for the duration of the run; yields its base URL."""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    url = f"http://127.0.0.1:{port}"
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=BACKEND_DIR,
+    )
+    try:
+        started = time.perf_counter()
+        while True:
+            if process.poll() is not None:
+                raise SystemExit(f"uvicorn exited with {process.returncode}")
+            try:
+                with urllib.request.urlopen(f"{url}/health", timeout=1) as response:
+                    if response.status == 200:
+                        break
+            except (urllib.error.URLError, OSError):
+                pass
+            if time.perf_counter() - started > timeout:
+                raise SystemExit(f"/health did not respond within {timeout}s")
+            time.sleep(0.1)
+        print(f"Spawned uvicorn ({workers} worker(s)) at {url}")
+        yield url
+    finally:
+        process.terminate()
+        process.wait(timeout=15)
+
+
+async def run_scenarios(names, options: RunOptions, save: bool):
+    ctx = await load_context(options)
+    print(f"Dataset: {ctx.dataset}, bench vehicles: {len(ctx.vehicles)}")
+    for name in names:
+        recorder = await SCENARIOS[name](ctx)
+        report = build_report(name, recorder, params=vars(options) | {"url": None}, dataset=ctx.dataset)
+        print_report(report)
+        if save:
+            print(f"   saved {save_report(report)}")
+
+
+def cmd_seed(args):
+    cfg = SeedConfig(
+        vehicles=args.vehicles, orders=args.orders, points=args.points,
+        days=args.days, fuel_logs_per_vehicle=args.fuel_logs, seed=args.seed,
+    )
+    print(f"Seeding {cfg}")
+    started = time.perf_counter()
+    counts = asyncio.run(seed(cfg, reset=not args.keep))
+    print(f"Done in {time.perf_counter() - started:.1f}s: {counts}")
+
+
+def cmd_run(args):
+    names = list(SCENARIOS) if "all" in args.scenarios else args.scenarios
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}. Available: {', '.join(SCENARIOS)}, all")
+
+    def options(url: str) -> RunOptions:
+        return RunOptions(
+            url=url, duration=args.duration, warmup=args.warmup, concurrency=args.concurrency, seed=args.seed,
+            batch_size=args.batch_size, subscribers=args.subscribers, rate=args.rate,
+        )
+
+    if args.spawn:
+        with spawn_server(args.workers) as url:
+            asyncio.run(run_scenarios(names, options(url), not args.no_save))
+    else:
+        asyncio.run(run_scenarios(names, options(args.url), not args.no_save))
+
+
+def cmd_compare(args):
+    compare_reports(json.loads(Path(args.old).read_text()), json.loads(Path(args.new).read_text()))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(prog="python -m bench", description="LogiTrack API benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("seed", help="Generate the benchmark dataset (BENCH-* rows)")
+    p.add_argument("--vehicles", type=int, default=200)
+    p.add_argument("--orders", type=int, default=20_000)
+    p.add_argument("--points", type=int, default=1_000_000, help="Tracking points in total")
+    p.add_argument("--days", type=int, default=7, help="History length for tracks and orders")
+    p.add_argument("--fuel-logs", type=int, default=10, help="Fuel logs per vehicle")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--keep", action="store_true", help="Do not delete the previous BENCH dataset")
+    p.set_defaults(handler=cmd_seed)
+
+    p = commands.add_parser("run", help="Run scenarios and write reports to bench/results")
+    p.add_argument("scenarios", nargs="+", help=f"{', '.join(SCENARIOS)} or all")
+    p.add_argument("--url", default=os.environ.get("BENCH_URL", "http://127.0.0.1:8000"))
+    p.add_argument("--spawn", action="store_true", help="Start uvicorn main:app for the run instead of using --url")
+    p.add_argument("--workers", type=int, default=1, help="uvicorn workers with --spawn")
+    p.add_argument("--duration", type=float, default=30.0, help="Measured seconds per scenario")
+    p.add_argument("--warmup", type=float, default=5.0, help="Unmeasured seconds before each closed-loop scenario")
+    p.add_argument("--concurrency", type=int, default=16, help="Virtual users (publishers for ws_fanout)")
+    p.add_argument("--seed", type=int, default=42)
+    p.add_argument("--batch-size", type=int, default=100, help="ingest: points per request (1 = single endpoint)")
+    p.add_argument("--subscribers", type=int, default=200, help="ws_fanout: WebSocket subscribers")
+    p.add_argument("--rate", type=float, default=50.0, help="ws_fanout: points per second")
+    p.add_argument("--no-save", action="store_true", help="Do not write JSON reports")
+    p.set_defaults(handler=cmd_run)
+
+    p = commands.add_parser("compare", help="Compare two JSON reports of the same scenario")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.set_defaults(handler=cmd_compare)
+
+    args = parser.parse_args()
+    args.handler(args)
@@ -0,0 +1,155 @@
+"""
+Клиент нагрузки: HTTP/1.1 keep-alive поверх asyncio и замер задержек.
+
+Свой минимальный клиент вместо внешней библиотеки: одно постоянное соединение
+на виртуального пользователя, без пулов и middleware - накладные расходы
+клиента почти не попадают в замер. Поддерживаются ответы с Content-Length и
+chunked (этого достаточно для uvicorn). WebSocket - библиотека websockets,
+она уже стоит вместе с uvicorn[standard].
+"""
+import asyncio
+import json
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode, urlsplit
+
+from app.core.config import settings
+
+
+class HTTPError(Exception):
+    pass
+
+
+class HTTPConnection:
+    """One keep-alive connection; reconnects when the server closes it."""
+
+    def __init__(self, base_url: str, token: Optional[str] = None, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self.token = token
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def request(self, method: str, path: str, params: Optional[dict] = None, body=None) -> Tuple[int, bytes]:
+        target = self.prefix + path + (f"?{urlencode(params)}" if params else "")
+        payload = json.dumps(body).encode() if body is not None else b""
+        headers = [f"{method} {target} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(payload)}"]
+        if body is not None:
+            headers.append("Content-Type: application/json")
+        if self.token:
+            headers.append(f"Authorization: Bearer {self.token}")
+        data = ("\r\n".join(headers) + "\r\n\r\n").encode() + payload
+
+        for attempt in range(2):
+            if self._writer is None:
+                await self._connect()
+            try:
+                self._writer.write(data)
+                await self._writer.drain()
+                return await asyncio.wait_for(self._read_response(), self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                # Сервер закрыл простаивающее соединение - повторяем один раз
+                await self.close()
+                if attempt:
+                    raise
+        raise HTTPError("unreachable")
+
+    async def _read_response(self) -> Tuple[int, bytes]:
+        head = await self._reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        status = int(lines[0].split(" ", 2)[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(chunk[:-2])
+            content = b"".join(chunks)
+        else:
+            content = await self._reader.readexactly(int(headers.get("content-length", 0)))
+
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, content
+
+
+async def login(base_url: str, email: str, password: str) -> str:
+    conn = HTTPConnection(base_url)
+    try:
+        status, content = await conn.request("POST", "/auth/login", body={"email": email, "password": password})
+    finally:
+        await conn.close()
+    if status != 200:
+        raise HTTPError(f"login as {email} failed: {status} {content[:200]!r}")
+    return json.loads(content)["access_token"]
+
+
+def api_url(server_url: str) -> str:
+    return server_url.rstrip("/") + settings.API_V1_STR
+
+
+def ws_url(server_url: str, path: str) -> str:
+    return api_url(server_url).replace("http://", "ws://", 1).replace("https://", "wss://", 1) + path
+
+
+class Recorder:
+    """Latency samples and errors per operation name."""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.error_samples: Dict[str, str] = {}
+        self.counters: Dict[str, float] = defaultdict(float)
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+
+    def add(self, name: str, seconds: float):
+        self.latencies[name].append(seconds)
+
+    def error(self, name: str, detail: str):
+        self.errors[name] += 1
+        self.error_samples.setdefault(name, detail[:300])
+
+    def count(self, name: str, value: float = 1):
+        self.counters[name] += value
+
+    def stop(self):
+        self.finished = time.perf_counter()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    async def call(self, conn: HTTPConnection, name: str, method: str, path: str,
+                   params: Optional[dict] = None, body=None, ok=(200, 201)) -> Optional[bytes]:
+        started = time.perf_counter()
+        try:
+            status, content = await conn.request(method, path, params=params, body=body)
+        except Exception as e:
+            self.error(name, f"{type(e).__name__}: {e}")
+            return None
+        self.add(name, time.perf_counter() - started)
+        if status not in ok:
+            self.error(name, f"HTTP {status}: {content[:200]!r}")
+            return None
+        return content
@@ -0,0 +1,102 @@
+"""
+Отчеты бенчмарков: таблица в консоль и JSON в bench/results.
+
+JSON содержит параметры запуска (сценарий, seed, конкурентность, длительность),
+ревизию git и объем данных, поэтому прогоны можно сравнивать между собой:
+python -m bench compare old.json new.json.
+"""
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bench.client import Recorder
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def summarize(recorder: Recorder) -> Dict[str, dict]:
+    """Per operation: count, errors, throughput and latency percentiles (ms)."""
+    elapsed = recorder.elapsed
+    operations = {}
+    for name in sorted(set(recorder.latencies) | set(recorder.errors)):
+        values = sorted(recorder.latencies.get(name, []))
+        operations[name] = {
+            "count": len(values),
+            "errors": recorder.errors.get(name, 0),
+            "rps": round(len(values) / elapsed, 1) if elapsed else 0.0,
+            "p50_ms": round(percentile(values, 0.50) * 1000, 2),
+            "p90_ms": round(percentile(values, 0.90) * 1000, 2),
+            "p99_ms": round(percentile(values, 0.99) * 1000, 2),
+            "max_ms": round(values[-1] * 1000, 2) if values else 0.0,
+        }
+    return operations
+
+
+def _git_revision() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def build_report(scenario: str, recorder: Recorder, params: dict, dataset: Optional[dict] = None) -> dict:
+    return {
+        "scenario": scenario,
+        "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "params": params,
+        "dataset": dataset or {},
+        "elapsed_s": round(recorder.elapsed, 2),
+        "counters": {name: round(value, 2) for name, value in sorted(recorder.counters.items())},
+        "operations": summarize(recorder),
+        "error_samples": dict(recorder.error_samples),
+    }
+
+
+def print_report(report: dict):
+    print(f"\n== {report['scenario']} ({report['elapsed_s']}s, rev {report['revision']})")
+    for name, value in report["counters"].items():
+        print(f"   {name}: {value}")
+    print(f"   {'operation':<32} {'count':>8} {'err':>6} {'rps':>9} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for name, op in report["operations"].items():
+        print(
+            f"   {name:<32} {op['count']:>8} {op['errors']:>6} {op['rps']:>9.1f} "
+            f"{op['p50_ms']:>9.1f} {op['p90_ms']:>9.1f} {op['p99_ms']:>9.1f} {op['max_ms']:>9.1f}"
+        )
+    for name, sample in report["error_samples"].items():
+        print(f"   ! {name}: {sample}")
+
+
+def save_report(report: dict, directory: Path = RESULTS_DIR) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp = report["at"].replace(":", "").replace("-", "").replace("+0000", "Z")
+    path = directory / f"{stamp}-{report['scenario']}.json"
+    path.write_text(json.dumps(report, ensure_ascii=False, indent=2))
+    return path
+
+
+def compare_reports(old: dict, new: dict):
+    """Print throughput and p99 changes per operation between two reports of the same scenario."""
+    print(f"{old['scenario']}: {old['revision']} ({old['at']}) -> {new['revision']} ({new['at']})")
+    if old["params"] != new["params"]:
+        print(f"  params differ: {old['params']} vs {new['params']}")
+    print(f"  {'operation':<32} {'rps':>19} {'p99 ms':>21}")
+    for name in sorted(set(old["operations"]) | set(new["operations"])):
+        a, b = old["operations"].get(name), new["operations"].get(name)
+        if a is None or b is None:
+            print(f"  {name:<32} {'only in ' + ('new' if a is None else 'old'):>19}")
+            continue
+        rps_change = (b["rps"] - a["rps"]) / a["rps"] * 100 if a["rps"] else 0.0
+        p99_change = (b["p99_ms"] - a["p99_ms"]) / a["p99_ms"] * 100 if a["p99_ms"] else 0.0
+        print(
+            f"  {name:<32} {a['rps']:>7.1f} -> {b['rps']:>7.1f} {rps_change:+5.0f}% "
+            f"{a['p99_ms']:>7.1f} -> {b['p99_ms']:>7.1f} {p99_change:+5.0f}%"
+        )
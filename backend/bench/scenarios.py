@@ -0,0 +1,420 @@
+"""
+Сценарии нагрузки. Каждый работает с API по HTTP/WebSocket, как настоящий
+клиент, и пишет задержки в Recorder (операция = метод + шаблон пути).
+
+- ingest    - телеметрия пачками через POST /tracking/points/batch
+              (--batch-size 1 - по одной точке, POST /tracking/points)
+- ws_fanout - --subscribers подписчиков /tracking/ws, точки с темпом --rate;
+              задержка - от отправки точки до получения кадра подписчиком
+- lists     - списки: транспорт, заказы, водители, топливо, ТО, карточка заказа
+- pricing   - калькулятор POST /orders/calculate, половина маршрутов повторяется
+- analytics - дашборд, перерасход топлива, тепловая карта, история и поездки,
+              поиск, заказы в радиусе, векторные тайлы
+
+Все сценарии, кроме ws_fanout, - замкнутый цикл: --concurrency виртуальных
+пользователей, у каждого свое соединение, запрос за запросом без пауз.
+Случайные параметры запросов - из random.Random(seed, номер пользователя).
+"""
+import asyncio
+import json
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import websockets
+from sqlalchemy import text
+
+from app.core.database import engine
+from app.services.tiles import tile_for
+from bench.client import HTTPConnection, Recorder, api_url, login, ws_url
+from bench.seed import BENCH_ADMIN_EMAIL, BENCH_PASSWORD, CENTER, PLATE_PREFIX, SPREAD_DEG, STREETS, TRACK_END_OFFSET_HOURS
+from gateway_loadgen import DeviceSimulator
+
+# Сценарии с телеметрией шлют точки "из прошлого": запас, чтобы часы симулятора не ушли в будущее
+CLOCK_BACKLOG_SECONDS = 12 * 3600
+PRICING_ROUTE_POOL = 200
+
+
+@dataclass
+class RunOptions:
+    url: str
+    duration: float = 30.0
+    warmup: float = 5.0
+    concurrency: int = 16
+    seed: int = 42
+    batch_size: int = 100
+    subscribers: int = 200
+    rate: float = 50.0
+
+
+@dataclass
+class BenchVehicle:
+    id: int
+    lat: float
+    lng: float
+    last_fix: Optional[datetime]
+
+
+@dataclass
+class Context:
+    options: RunOptions
+    token: str
+    vehicles: List[BenchVehicle]
+    order_ids: Tuple[int, int]
+    dataset: Dict[str, int]
+
+    def connection(self, authorized: bool = True) -> HTTPConnection:
+        return HTTPConnection(api_url(self.options.url), self.token if authorized else None)
+
+
+@dataclass
+class VirtualUser:
+    index: int
+    conn: HTTPConnection
+    rnd: random.Random
+    state: dict = field(default_factory=dict)
+
+
+Step = Callable[[VirtualUser, Recorder], Awaitable[None]]
+
+
+async def load_context(options: RunOptions) -> Context:
+    """Bench vehicles (position, last fix), order id range and table sizes from the seeded database."""
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text("""
+            SELECT v.id, ST_Y(v.current_location), ST_X(v.current_location),
+                   (SELECT max(t.timestamp) FROM tracking_points t WHERE t.vehicle_id = v.id)
+            FROM vehicles v
+            WHERE v.plate_number LIKE :prefix AND v.current_location IS NOT NULL
+            ORDER BY v.id
+        """), {"prefix": f"{PLATE_PREFIX}%"})).all()
+        order_range = (await conn.execute(text("SELECT coalesce(min(id), 0), coalesce(max(id), 0) FROM orders"))).one()
+        # Оценка по статистике планировщика - count(*) по миллионам точек занял бы секунды
+        sizes = (await conn.execute(text("""
+            SELECT relname, reltuples::bigint FROM pg_class
+            WHERE relname IN ('users', 'vehicles', 'orders', 'fuel_logs', 'tracking_points', 'trips') AND relkind = 'r'
+        """))).all()
+    await engine.dispose()
+
+    if not rows:
+        raise SystemExit("No benchmark vehicles found - run `python -m bench seed` first")
+    token = await login(api_url(options.url), BENCH_ADMIN_EMAIL, BENCH_PASSWORD)
+    return Context(
+        options=options,
+        token=token,
+        vehicles=[BenchVehicle(*row) for row in rows],
+        order_ids=tuple(order_range),
+        dataset={name: max(count, 0) for name, count in sizes},
+    )
+
+
+async def closed_loop(ctx: Context, recorder: Recorder, duration: float, step: Step,
+                      users: List[VirtualUser]):
+    deadline = time.perf_counter() + duration
+
+    async def run(user: VirtualUser):
+        while time.perf_counter() < deadline:
+            await step(user, recorder)
+
+    await asyncio.gather(*(run(user) for user in users))
+
+
+async def run_closed_loop(ctx: Context, step: Step, authorized: bool = True,
+                          setup: Optional[Callable[[VirtualUser], None]] = None) -> Recorder:
+    users = []
+    for index in range(ctx.options.concurrency):
+        user = VirtualUser(index, ctx.connection(authorized), random.Random(f"{ctx.options.seed}:{index}"))
+        if setup is not None:
+            setup(user)
+        users.append(user)
+    try:
+        if ctx.options.warmup > 0:
+            await closed_loop(ctx, Recorder(), ctx.options.warmup, step, users)
+        recorder = Recorder()
+        await closed_loop(ctx, recorder, ctx.options.duration, step, users)
+        recorder.stop()
+        return recorder
+    finally:
+        for user in users:
+            await user.conn.close()
+
+
+# ---------- телеметрия ----------
+
+def simulators(vehicles: List[BenchVehicle]) -> List[DeviceSimulator]:
+    """One simulator per vehicle, continuing from its current position and last fix."""
+    floor = int(time.time()) - CLOCK_BACKLOG_SECONDS
+    devices = []
+    for vehicle in vehicles:
+        device = DeviceSimulator(vehicle.id, f"BENCH{vehicle.id:06d}", vehicle.lat, vehicle.lng)
+        last = int(vehicle.last_fix.timestamp()) + 1 if vehicle.last_fix else 0
+        device.clock = max(floor, last)
+        # seq растет вместе с часами - повторный прогон не упирается в (device_id, seq)
+        device.seq = device.clock
+        devices.append(device)
+    return devices
+
+
+def point_body(device: DeviceSimulator, fix) -> dict:
+    seq, clock, lat, lng, speed, heading, fuel = fix
+    return {
+        "vehicle_id": device.vehicle_id,
+        "location": {"lat": lat, "lng": lng},
+        "speed": round(speed, 1),
+        "heading": round(heading, 1),
+        "fuel_level": fuel,
+        "timestamp": datetime.fromtimestamp(clock, timezone.utc).isoformat(),
+        "device_id": device.device_id,
+        "seq": seq,
+    }
+
+
+async def scenario_ingest(ctx: Context) -> Recorder:
+    options = ctx.options
+    devices = simulators(ctx.vehicles)
+    if options.concurrency > len(devices):
+        options.concurrency = len(devices)
+
+    def setup(user: VirtualUser):
+        # Машина закреплена за одним пользователем: точки одной машины уходят по порядку
+        user.state["devices"] = devices[user.index::options.concurrency]
+        user.state["cursor"] = 0
+
+    def next_device(user: VirtualUser) -> DeviceSimulator:
+        group = user.state["devices"]
+        user.state["cursor"] += 1
+        return group[user.state["cursor"] % len(group)]
+
+    async def step(user: VirtualUser, recorder: Recorder):
+        if options.batch_size <= 1:
+            device = next_device(user)
+            body = point_body(device, device.next_fixes(1)[0])
+            if await recorder.call(user.conn, "POST /tracking/points", "POST", "/tracking/points", body=body) is not None:
+                recorder.count("points_accepted")
+            return
+
+        per_device = max(1, options.batch_size // len(user.state["devices"]))
+        points = []
+        while len(points) < options.batch_size:
+            device = next_device(user)
+            points.extend(point_body(device, fix) for fix in device.next_fixes(min(per_device, options.batch_size - len(points))))
+        content = await recorder.call(
+            user.conn, "POST /tracking/points/batch", "POST", "/tracking/points/batch", body={"points": points}
+        )
+        if content is not None:
+            result = json.loads(content)
+            recorder.count("points_accepted", result["accepted"])
+            recorder.count("points_late", result["late"])
+            recorder.count("points_duplicate", result["duplicates"])
+            recorder.count("points_rejected", len(result["rejected"]))
+
+    recorder = await run_closed_loop(ctx, step, setup=setup)
+    recorder.count("points_per_s", recorder.counters["points_accepted"] / recorder.elapsed)
+    return recorder
+
+
+async def scenario_ws_fanout(ctx: Context) -> Recorder:
+    """Open-loop: points at a fixed rate, every subscriber should receive every update."""
+    options = ctx.options
+    devices = simulators(ctx.vehicles[:max(1, min(len(ctx.vehicles), options.concurrency * 4))])
+    sent: Dict[Tuple[int, float, float], float] = {}
+    recorder = Recorder()
+    stop = asyncio.Event()
+    url = ws_url(options.url, "/tracking/ws") + f"?token={ctx.token}"
+
+    async def subscriber(ready: asyncio.Event, connected: List[int]):
+        try:
+            async with websockets.connect(url, max_queue=None, open_timeout=30) as ws:
+                connected.append(1)
+                if len(connected) == options.subscribers:
+                    ready.set()
+                while not stop.is_set():
+                    try:
+                        raw = await asyncio.wait_for(ws.recv(), timeout=0.5)
+                    except asyncio.TimeoutError:
+                        continue
+                    received = time.perf_counter()
+                    message = json.loads(raw)
+                    if message.get("type") != "vehicle_update":
+                        continue
+                    location = message["data"]["current_location"]
+                    sent_at = sent.get((message["vehicle_id"], location["lat"], location["lng"]))
+                    if sent_at is not None:
+                        recorder.add("WS vehicle_update delivery", received - sent_at)
+                        recorder.count("frames_delivered")
+        except Exception as e:
+            recorder.error("WS connect", f"{type(e).__name__}: {e}")
+            connected.append(0)
+            if len(connected) == options.subscribers:
+                ready.set()
+
+    async def publisher(index: int, group: List[DeviceSimulator], deadline: float):
+        conn = ctx.connection()
+        interval = options.concurrency / options.rate
+        next_at = time.perf_counter()
+        cursor = 0
+        try:
+            while time.perf_counter() < deadline:
+                device = group[cursor % len(group)]
+                cursor += 1
+                body = point_body(device, device.next_fixes(1)[0])
+                sent[(device.vehicle_id, body["location"]["lat"], body["location"]["lng"])] = time.perf_counter()
+                if await recorder.call(conn, "POST /tracking/points", "POST", "/tracking/points", body=body) is not None:
+                    recorder.count("points_posted")
+                next_at += interval
+                await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+        finally:
+            await conn.close()
+
+    ready, connected = asyncio.Event(), []
+    subscribers = [asyncio.create_task(subscriber(ready, connected)) for _ in range(options.subscribers)]
+    await ready.wait()
+    recorder.count("subscribers", sum(connected))
+
+    recorder.started = time.perf_counter()
+    deadline = recorder.started + options.duration
+    groups = [devices[i::options.concurrency] for i in range(options.concurrency) if devices[i::options.concurrency]]
+    await asyncio.gather(*(publisher(i, group, deadline) for i, group in enumerate(groups)))
+    recorder.stop()
+    # Даем дойти кадрам, отправленным в последние миллисекунды
+    await asyncio.sleep(2.0)
+    stop.set()
+    await asyncio.gather(*subscribers)
+
+    expected = recorder.counters["points_posted"] * recorder.counters["subscribers"]
+    recorder.count("frames_expected", expected)
+    recorder.count("delivery_ratio", recorder.counters["frames_delivered"] / expected if expected else 0.0)
+    recorder.count("frames_per_s", recorder.counters["frames_delivered"] / recorder.elapsed)
+    return recorder
+
+
+# ---------- чтение ----------
+
+def _random_order_id(ctx: Context, rnd: random.Random) -> int:
+    first, last = ctx.order_ids
+    return rnd.randint(first, last) if last else 1
+
+
+def _weighted_step(operations: List[Tuple[float, Step]]) -> Step:
+    steps = [s for _, s in operations]
+    weights = [w for w, _ in operations]
+
+    async def step(user: VirtualUser, recorder: Recorder):
+        await user.rnd.choices(steps, weights=weights)[0](user, recorder)
+
+    return step
+
+
+async def scenario_lists(ctx: Context) -> Recorder:
+    vehicle_count = len(ctx.vehicles)
+    order_count = max(ctx.order_ids[1] - ctx.order_ids[0], 1)
+
+    async def vehicles(user, recorder):
+        params = {"skip": user.rnd.randrange(0, max(vehicle_count - 100, 1)), "limit": 100}
+        if user.rnd.random() < 0.3:
+            params["status"] = user.rnd.choice(["ACTIVE", "IN_PROGRESS", "IDLE"])
+        await recorder.call(user.conn, "GET /vehicles", "GET", "/vehicles", params=params)
+
+    async def orders(user, recorder):
+        params = {"skip": user.rnd.randrange(0, max(order_count - 50, 1)), "limit": 50}
+        if user.rnd.random() < 0.5:
+            params["status"] = user.rnd.choice(["NEW", "IN_PROGRESS", "COMPLETED"])
+        await recorder.call(user.conn, "GET /orders", "GET", "/orders", params=params)
+
+    async def order(user, recorder):
+        await recorder.call(user.conn, "GET /orders/{id}", "GET", f"/orders/{_random_order_id(ctx, user.rnd)}", ok=(200, 404))
+
+    async def drivers(user, recorder):
+        await recorder.call(user.conn, "GET /drivers", "GET", "/drivers", params={"limit": 100})
+
+    async def fuel(user, recorder):
+        await recorder.call(user.conn, "GET /fuel", "GET", "/fuel",
+                            params={"vehicle_id": user.rnd.choice(ctx.vehicles).id, "limit": 100})
+
+    async def maintenance(user, recorder):
+        await recorder.call(user.conn, "GET /maintenance", "GET", "/maintenance", params={"limit": 100})
+
+    return await run_closed_loop(ctx, _weighted_step([
+        (3, vehicles), (4, orders), (2, order), (1, drivers), (1, fuel), (1, maintenance),
+    ]))
+
+
+def _random_point(rnd: random.Random) -> Dict[str, float]:
+    return {
+        "lat": round(CENTER[0] + rnd.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+        "lng": round(CENTER[1] + rnd.uniform(-SPREAD_DEG, SPREAD_DEG), 6),
+    }
+
+
+async def scenario_pricing(ctx: Context) -> Recorder:
+    pool_rnd = random.Random(ctx.options.seed)
+    pool = [(_random_point(pool_rnd), _random_point(pool_rnd)) for _ in range(PRICING_ROUTE_POOL)]
+
+    async def step(user: VirtualUser, recorder: Recorder):
+        # Половина запросов - популярные маршруты (кэш котировок), половина - новые
+        pickup, delivery = user.rnd.choice(pool) if user.rnd.random() < 0.5 else (_random_point(user.rnd), _random_point(user.rnd))
+        body = {
+            "pickup_location": pickup,
+            "delivery_location": delivery,
+            "weight": round(user.rnd.uniform(1, 1500), 1),
+            "length": 120, "width": 80, "height": round(user.rnd.uniform(20, 180)),
+        }
+        await recorder.call(user.conn, "POST /orders/calculate", "POST", "/orders/calculate", body=body)
+
+    return await run_closed_loop(ctx, step)
+
+
+async def scenario_analytics(ctx: Context) -> Recorder:
+    # Дни сида заканчиваются за TRACK_END_OFFSET_HOURS до запуска - тепловая карта по ним
+    last_day = (datetime.now(timezone.utc) - timedelta(hours=TRACK_END_OFFSET_HOURS)).date()
+    first_day: date = last_day - timedelta(days=6)
+
+    async def dashboard(user, recorder):
+        await recorder.call(user.conn, "GET /dashboard/stats", "GET", "/dashboard/stats")
+
+    async def overconsumption(user, recorder):
+        await recorder.call(user.conn, "GET /fuel/analytics/overconsumption", "GET", "/fuel/analytics/overconsumption")
+
+    async def heatmap(user, recorder):
+        day = first_day + timedelta(days=user.rnd.randrange(7))
+        params = {"date_from": day.isoformat(), "date_to": last_day.isoformat(), "zoom": user.rnd.choice([10, 12, 14])}
+        await recorder.call(user.conn, "GET /heatmap", "GET", "/heatmap", params=params)
+
+    async def history(user, recorder):
+        vehicle = user.rnd.choice(ctx.vehicles)
+        await recorder.call(user.conn, "GET /tracking/vehicles/{id}/history", "GET",
+                            f"/tracking/vehicles/{vehicle.id}/history", params={"limit": 500})
+
+    async def trips(user, recorder):
+        vehicle = user.rnd.choice(ctx.vehicles)
+        await recorder.call(user.conn, "GET /tracking/vehicles/{id}/trips", "GET", f"/tracking/vehicles/{vehicle.id}/trips")
+
+    async def search(user, recorder):
+        q = user.rnd.choice([user.rnd.choice(STREETS)[:5], f"{PLATE_PREFIX}{user.rnd.randrange(len(ctx.vehicles)):06d}"[:9]])
+        await recorder.call(user.conn, "GET /search", "GET", "/search", params={"q": q})
+
+    async def nearby(user, recorder):
+        point = _random_point(user.rnd)
+        await recorder.call(user.conn, "GET /spatial/orders/nearby", "GET", "/spatial/orders/nearby",
+                            params={**point, "radius_m": 2000})
+
+    async def tile(user, recorder):
+        point = _random_point(user.rnd)
+        z = user.rnd.choice([12, 14, 16])
+        x, y = tile_for(point["lat"], point["lng"], z)
+        await recorder.call(user.conn, "GET /tiles/{z}/{x}/{y}.mvt", "GET", f"/tiles/{z}/{x}/{y}.mvt", ok=(200, 204))
+
+    return await run_closed_loop(ctx, _weighted_step([
+        (3, dashboard), (1, overconsumption), (1, heatmap), (2, history), (1, trips), (2, search), (2, nearby), (2, tile),
+    ]))
+
+
+SCENARIOS: Dict[str, Callable[[Context], Awaitable[Recorder]]] = {
+    "ingest": scenario_ingest,
+    "ws_fanout": scenario_ws_fanout,
+    "lists": scenario_lists,
+    "pricing": scenario_pricing,
+    "analytics": scenario_analytics,
+}
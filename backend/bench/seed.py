@@ -0,0 +1,347 @@
+"""
+Наполнение базы для бенчмарков: N машин, M заказов, K точек трекинга.
+
+Все сущности помечены: номера и VIN с префиксом BENCH, пользователи
+@bench.logitrack.com. --reset удаляет только их, остальные данные не трогаются.
+
+Генерация детерминирована (--seed): трек каждой машины - случайное блуждание
+из своего numpy-генератора, заказы и справочники - из random.Random(seed).
+Время задается относительно запуска: треки заканчиваются за
+TRACK_END_OFFSET_HOURS до него (старше окна приема GPS, свежие точки
+сценария ingest всегда новее), заказы разложены по тем же дням.
+
+Вставка пачками: INSERT ... SELECT FROM unnest(массивы) - один запрос на
+CHUNK_ROWS строк, геометрия собирается на сервере (ST_MakePoint).
+"""
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Tuple
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.database import engine
+from app.core.security import get_password_hash
+from app.services.pricing import calculate_haversine_distance
+
+BENCH_EMAIL_DOMAIN = "bench.logitrack.com"
+BENCH_ADMIN_EMAIL = f"admin@{BENCH_EMAIL_DOMAIN}"
+BENCH_PASSWORD = "bench-password"
+PLATE_PREFIX = "BENCH-"
+
+CENTER = (55.75, 37.62)
+SPREAD_DEG = 0.25
+CHUNK_ROWS = 50_000
+TRACK_END_OFFSET_HOURS = 25
+
+MAKES = [("GAZ", "Gazelle Next"), ("Ford", "Transit"), ("Mercedes", "Sprinter"), ("Isuzu", "NQR"), ("Hyundai", "Porter")]
+STREETS = ["Тверская", "Арбат", "Ленинский проспект", "Профсоюзная", "Садовая-Кудринская", "Мясницкая", "Варшавское шоссе", "Кутузовский проспект"]
+NAMES = ["Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев", "Соколов", "Михайлов", "Новиков"]
+ORDER_STATUSES = [("NEW", 0.2), ("IN_PROGRESS", 0.2), ("COMPLETED", 0.55), ("CANCELLED", 0.05)]
+VEHICLE_STATUSES = [("ACTIVE", 0.5), ("IN_PROGRESS", 0.3), ("IDLE", 0.15), ("MAINTENANCE", 0.05)]
+
+
+@dataclass
+class SeedConfig:
+    vehicles: int = 200
+    orders: int = 20_000
+    points: int = 1_000_000
+    days: int = 7
+    fuel_logs_per_vehicle: int = 10
+    seed: int = 42
+
+    @property
+    def customers(self) -> int:
+        return max(10, self.orders // 50)
+
+    @property
+    def drivers(self) -> int:
+        return self.vehicles // 2
+
+
+def _chunks(total: int, size: int = CHUNK_ROWS):
+    for start in range(0, total, size):
+        yield start, min(start + size, total)
+
+
+def _weighted(rnd: random.Random, choices: List[Tuple[str, float]]) -> str:
+    return rnd.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+
+def _random_point(rnd: random.Random) -> Tuple[float, float]:
+    return CENTER[0] + rnd.uniform(-SPREAD_DEG, SPREAD_DEG), CENTER[1] + rnd.uniform(-SPREAD_DEG, SPREAD_DEG)
+
+
+def _fold(values: np.ndarray, center: float) -> np.ndarray:
+    """Reflect a walk off the area edges (center +- SPREAD_DEG) instead of sticking to them."""
+    low, width = center - SPREAD_DEG, 2 * SPREAD_DEG
+    offset = (values - low) % (2 * width)
+    return low + np.where(offset > width, 2 * width - offset, offset)
+
+
+def vehicle_track(seed: int, vehicle_index: int, count: int, start: float, end: float) -> Dict[str, np.ndarray]:
+    """Random-walk track of one vehicle: count fixes evenly spread over [start, end] (epoch seconds)."""
+    rng = np.random.default_rng([seed, vehicle_index])
+    ts = np.linspace(start, end, count)
+    # Шаг не больше минуты езды: при редких точках машина не "прыгает" по городу
+    dt = min((end - start) / max(count - 1, 1), 60.0)
+    speed = np.where(rng.random(count) < 0.7, rng.uniform(15, 80, count), 0.0)
+    heading = (rng.uniform(0, 360) + np.cumsum(rng.normal(0, 20, count))) % 360
+    step_km = speed * dt / 3600
+    lat0 = CENTER[0] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+    lng0 = CENTER[1] + rng.uniform(-SPREAD_DEG, SPREAD_DEG)
+    lat = _fold(lat0 + np.cumsum(step_km / 111.0 * np.cos(np.radians(heading))), CENTER[0])
+    lng = _fold(lng0 + np.cumsum(step_km / (111.0 * math.cos(math.radians(lat0))) * np.sin(np.radians(heading))), CENTER[1])
+    fuel = 100.0 - (np.cumsum(step_km) * 0.3) % 80.0
+    return {"ts": ts, "lat": lat, "lng": lng, "speed": speed, "heading": heading, "fuel": fuel}
+
+
+async def reset_bench_data(conn: AsyncConnection):
+    """Delete everything created by a previous seed (BENCH vehicles, @bench users and their rows)."""
+    vehicles = f"SELECT id FROM vehicles WHERE plate_number LIKE '{PLATE_PREFIX}%'"
+    users = f"SELECT id FROM users WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}'"
+    orders = f"SELECT id FROM orders WHERE customer_id IN ({users}) OR vehicle_id IN ({vehicles})"
+    for statement in [
+        f"DELETE FROM tracking_points WHERE vehicle_id IN ({vehicles})",
+        f"DELETE FROM trips WHERE vehicle_id IN ({vehicles})",
+        f"DELETE FROM geofence_events WHERE vehicle_id IN ({vehicles})",
+        f"DELETE FROM fuel_logs WHERE vehicle_id IN ({vehicles})",
+        f"DELETE FROM maintenance_records WHERE vehicle_id IN ({vehicles})",
+        f"DELETE FROM route_points WHERE order_id IN ({orders})",
+        f"DELETE FROM orders WHERE id IN ({orders})",
+        f"DELETE FROM vehicles WHERE plate_number LIKE '{PLATE_PREFIX}%'",
+        f"DELETE FROM drivers WHERE user_id IN ({users})",
+        f"DELETE FROM tariffs WHERE customer_id IN ({users})",
+        f"DELETE FROM users WHERE email LIKE '%@{BENCH_EMAIL_DOMAIN}'",
+    ]:
+        await conn.execute(text(statement))
+
+
+async def _seed_users(conn: AsyncConnection, cfg: SeedConfig, rnd: random.Random) -> Dict[str, List[int]]:
+    # bcrypt медленный - один хэш на всех пользователей бенчмарка
+    password_hash = get_password_hash(BENCH_PASSWORD)
+    emails, names, roles = [BENCH_ADMIN_EMAIL], ["Bench Admin"], ["ADMIN"]
+    for i in range(cfg.customers):
+        emails.append(f"client{i:05d}@{BENCH_EMAIL_DOMAIN}")
+        names.append(f"{rnd.choice(NAMES)} {i}")
+        roles.append("CLIENT")
+    for i in range(cfg.drivers):
+        emails.append(f"driver{i:05d}@{BENCH_EMAIL_DOMAIN}")
+        names.append(f"{rnd.choice(NAMES)} (водитель {i})")
+        roles.append("DRIVER")
+    await conn.execute(text("""
+        INSERT INTO users (email, hashed_password, full_name, role, is_active)
+        SELECT email, :password_hash, full_name, role::userrole, true
+        FROM unnest(CAST(:emails AS text[]), CAST(:names AS text[]), CAST(:roles AS text[])) AS t(email, full_name, role)
+    """), {"password_hash": password_hash, "emails": emails, "names": names, "roles": roles})
+
+    rows = (await conn.execute(
+        text("SELECT id, role::text FROM users WHERE email LIKE :pattern ORDER BY email"),
+        {"pattern": f"%@{BENCH_EMAIL_DOMAIN}"},
+    )).all()
+    by_role: Dict[str, List[int]] = {}
+    for user_id, role in rows:
+        by_role.setdefault(role, []).append(user_id)
+
+    await conn.execute(text("""
+        INSERT INTO drivers (user_id, license_number, rating)
+        SELECT user_id, 'BENCH-LIC-' || user_id, rating
+        FROM unnest(CAST(:user_ids AS int[]), CAST(:ratings AS float8[])) AS t(user_id, rating)
+    """), {
+        "user_ids": by_role.get("DRIVER", []),
+        "ratings": [round(rnd.uniform(3.5, 5.0), 1) for _ in by_role.get("DRIVER", [])],
+    })
+    return by_role
+
+
+async def _seed_vehicles(conn: AsyncConnection, cfg: SeedConfig, rnd: random.Random) -> List[int]:
+    driver_ids = (await conn.execute(text(
+        "SELECT d.id FROM drivers d JOIN users u ON u.id = d.user_id WHERE u.email LIKE :pattern ORDER BY d.id"
+    ), {"pattern": f"%@{BENCH_EMAIL_DOMAIN}"})).scalars().all()
+
+    columns: Dict[str, list] = {k: [] for k in ("vins", "plates", "makes", "models", "statuses", "drivers", "norms", "lats", "lngs", "mileages")}
+    for i in range(cfg.vehicles):
+        make, model = rnd.choice(MAKES)
+        lat, lng = _random_point(rnd)
+        columns["vins"].append(f"BENCHVIN{i:09d}")
+        columns["plates"].append(f"{PLATE_PREFIX}{i:06d}")
+        columns["makes"].append(make)
+        columns["models"].append(model)
+        columns["statuses"].append(_weighted(rnd, VEHICLE_STATUSES))
+        columns["drivers"].append(driver_ids[i] if i < len(driver_ids) else None)
+        columns["norms"].append(round(rnd.uniform(9.0, 16.0), 1))
+        columns["lats"].append(lat)
+        columns["lngs"].append(lng)
+        columns["mileages"].append(round(rnd.uniform(10_000, 300_000), 1))
+    await conn.execute(text("""
+        INSERT INTO vehicles (vin, plate_number, make, model, status, driver_id, current_location,
+                              fuel_level, norm_consumption, current_speed, mileage)
+        SELECT vin, plate, make, model, status::vehiclestatus, driver_id, ST_SetSRID(ST_MakePoint(lng, lat), 4326),
+               100.0, norm, 0.0, mileage
+        FROM unnest(
+            CAST(:vins AS text[]), CAST(:plates AS text[]), CAST(:makes AS text[]), CAST(:models AS text[]),
+            CAST(:statuses AS text[]), CAST(:drivers AS int[]), CAST(:norms AS float8[]),
+            CAST(:lats AS float8[]), CAST(:lngs AS float8[]), CAST(:mileages AS float8[])
+        ) AS t(vin, plate, make, model, status, driver_id, norm, lat, lng, mileage)
+    """), columns)
+    return (await conn.execute(text(
+        "SELECT id FROM vehicles WHERE plate_number LIKE :prefix ORDER BY plate_number"
+    ), {"prefix": f"{PLATE_PREFIX}%"})).scalars().all()
+
+
+async def _seed_points(conn: AsyncConnection, cfg: SeedConfig, vehicle_ids: List[int], end: datetime) -> int:
+    if not vehicle_ids or cfg.points <= 0:
+        return 0
+    end_ts = end.timestamp()
+    start_ts = end_ts - cfg.days * 86400
+    per_vehicle = max(cfg.points // len(vehicle_ids), 2)
+
+    inserted = 0
+    batch: Dict[str, list] = {}
+
+    async def flush():
+        nonlocal inserted, batch
+        if not batch:
+            return
+        await conn.execute(text("""
+            INSERT INTO tracking_points (vehicle_id, location, speed, fuel_level, heading, timestamp, received_at)
+            SELECT vehicle_id, ST_SetSRID(ST_MakePoint(lng, lat), 4326), speed, fuel, heading, to_timestamp(ts), to_timestamp(ts)
+            FROM unnest(
+                CAST(:vehicle_id AS int[]), CAST(:lat AS float8[]), CAST(:lng AS float8[]), CAST(:speed AS float8[]),
+                CAST(:fuel AS float8[]), CAST(:heading AS float8[]), CAST(:ts AS float8[])
+            ) AS t(vehicle_id, lat, lng, speed, fuel, heading, ts)
+        """), batch)
+        inserted += len(batch["ts"])
+        batch = {}
+
+    for index, vehicle_id in enumerate(vehicle_ids):
+        track = vehicle_track(cfg.seed, index, per_vehicle, start_ts, end_ts)
+        for start, stop in _chunks(per_vehicle):
+            batch.setdefault("vehicle_id", []).extend([vehicle_id] * (stop - start))
+            for key in ("lat", "lng", "speed", "fuel", "heading", "ts"):
+                values = track[key][start:stop]
+                batch.setdefault(key, []).extend(np.round(values, 6 if key in ("lat", "lng", "ts") else 2).tolist())
+            if len(batch["ts"]) >= CHUNK_ROWS:
+                await flush()
+    await flush()
+
+    # Текущая позиция машины - последняя точка ее трека
+    await conn.execute(text("""
+        UPDATE vehicles v
+        SET current_location = last.location, current_speed = last.speed, fuel_level = last.fuel_level
+        FROM (
+            SELECT DISTINCT ON (vehicle_id) vehicle_id, location, speed, fuel_level
+            FROM tracking_points
+            WHERE vehicle_id = ANY(CAST(:vehicle_ids AS int[]))
+            ORDER BY vehicle_id, timestamp DESC
+        ) AS last
+        WHERE v.id = last.vehicle_id
+    """), {"vehicle_ids": list(vehicle_ids)})
+    return inserted
+
+
+async def _seed_orders(conn: AsyncConnection, cfg: SeedConfig, rnd: random.Random, customer_ids: List[int],
+                       vehicle_ids: List[int], end: datetime) -> int:
+    for start, stop in _chunks(cfg.orders):
+        columns: Dict[str, list] = {k: [] for k in (
+            "customer_ids", "vehicle_ids", "names", "pickups", "deliveries", "plat", "plng", "dlat", "dlng",
+            "weights", "volumes", "distances", "statuses", "prices", "created", "completed",
+        )}
+        for _ in range(start, stop):
+            (plat, plng), (dlat, dlng) = _random_point(rnd), _random_point(rnd)
+            status = _weighted(rnd, ORDER_STATUSES)
+            distance = calculate_haversine_distance(plat, plng, dlat, dlng)
+            weight = round(rnd.uniform(5, 1500), 1)
+            created = end - timedelta(seconds=rnd.uniform(0, cfg.days * 86400))
+            columns["customer_ids"].append(rnd.choice(customer_ids))
+            columns["vehicle_ids"].append(rnd.choice(vehicle_ids) if status in ("IN_PROGRESS", "COMPLETED") and vehicle_ids else None)
+            columns["names"].append(f"{rnd.choice(NAMES)} {rnd.randint(1, 999)}")
+            columns["pickups"].append(f"Москва, {rnd.choice(STREETS)}, д. {rnd.randint(1, 150)}")
+            columns["deliveries"].append(f"Москва, {rnd.choice(STREETS)}, д. {rnd.randint(1, 150)}")
+            columns["plat"].append(plat)
+            columns["plng"].append(plng)
+            columns["dlat"].append(dlat)
+            columns["dlng"].append(dlng)
+            columns["weights"].append(weight)
+            columns["volumes"].append(round(rnd.uniform(0.01, 12.0), 2))
+            columns["distances"].append(round(distance, 2))
+            columns["statuses"].append(status)
+            columns["prices"].append(round(500 + distance * 25 + weight * 2, 2))
+            columns["created"].append(created.timestamp())
+            columns["completed"].append(
+                (created + timedelta(hours=rnd.uniform(1, 8))).timestamp() if status == "COMPLETED" else None
+            )
+        await conn.execute(text("""
+            INSERT INTO orders (customer_id, vehicle_id, customer_name, pickup_address, delivery_address,
+                                pickup_location, delivery_location, weight, volume, distance_km, status, price,
+                                created_at, updated_at, completed_at)
+            SELECT customer_id, vehicle_id, name, pickup, delivery,
+                   ST_SetSRID(ST_MakePoint(plng, plat), 4326), ST_SetSRID(ST_MakePoint(dlng, dlat), 4326),
+                   weight, volume, distance, status::orderstatus, price,
+                   to_timestamp(created), to_timestamp(coalesce(completed, created)), to_timestamp(completed)
+            FROM unnest(
+                CAST(:customer_ids AS int[]), CAST(:vehicle_ids AS int[]), CAST(:names AS text[]),
+                CAST(:pickups AS text[]), CAST(:deliveries AS text[]),
+                CAST(:plat AS float8[]), CAST(:plng AS float8[]), CAST(:dlat AS float8[]), CAST(:dlng AS float8[]),
+                CAST(:weights AS float8[]), CAST(:volumes AS float8[]), CAST(:distances AS float8[]),
+                CAST(:statuses AS text[]), CAST(:prices AS float8[]), CAST(:created AS float8[]), CAST(:completed AS float8[])
+            ) AS t(customer_id, vehicle_id, name, pickup, delivery, plat, plng, dlat, dlng,
+                   weight, volume, distance, status, price, created, completed)
+        """), columns)
+    return cfg.orders
+
+
+async def _seed_fuel_logs(conn: AsyncConnection, cfg: SeedConfig, rnd: random.Random, vehicle_ids: List[int], end: datetime) -> int:
+    columns: Dict[str, list] = {"vehicle_ids": [], "liters": [], "costs": [], "mileages": [], "created": []}
+    for vehicle_id in vehicle_ids:
+        mileage = rnd.uniform(10_000, 300_000)
+        for i in range(cfg.fuel_logs_per_vehicle):
+            mileage += rnd.uniform(200, 600)
+            liters = round(rnd.uniform(40, 90), 1)
+            columns["vehicle_ids"].append(vehicle_id)
+            columns["liters"].append(liters)
+            columns["costs"].append(round(liters * rnd.uniform(55, 65), 2))
+            columns["mileages"].append(round(mileage, 1))
+            columns["created"].append((end - timedelta(days=cfg.days) + timedelta(days=cfg.days * i / max(cfg.fuel_logs_per_vehicle, 1))).timestamp())
+    await conn.execute(text("""
+        INSERT INTO fuel_logs (vehicle_id, liters, cost, mileage, location, created_at)
+        SELECT vehicle_id, liters, cost, mileage, 'BENCH', to_timestamp(created)
+        FROM unnest(CAST(:vehicle_ids AS int[]), CAST(:liters AS float8[]), CAST(:costs AS float8[]),
+                    CAST(:mileages AS float8[]), CAST(:created AS float8[])) AS t(vehicle_id, liters, cost, mileage, created)
+    """), columns)
+    return len(columns["vehicle_ids"])
+
+
+async def seed(cfg: SeedConfig, reset: bool = True) -> Dict[str, int]:
+    """Create the benchmark dataset; returns row counts per table."""
+    rnd = random.Random(cfg.seed)
+    end = datetime.now(timezone.utc) - timedelta(hours=TRACK_END_OFFSET_HOURS)
+    counts: Dict[str, int] = {}
+
+    async def phase(name: str, coro):
+        started = time.perf_counter()
+        result = await coro
+        print(f"  {name}: {time.perf_counter() - started:.1f}s")
+        return result
+
+    async with engine.begin() as conn:
+        if reset:
+            await phase("reset", reset_bench_data(conn))
+        users = await phase("users", _seed_users(conn, cfg, rnd))
+        vehicle_ids = await phase("vehicles", _seed_vehicles(conn, cfg, rnd))
+        counts["users"] = sum(len(ids) for ids in users.values())
+        counts["vehicles"] = len(vehicle_ids)
+        counts["orders"] = await phase("orders", _seed_orders(conn, cfg, rnd, users.get("CLIENT", []), vehicle_ids, end))
+        counts["fuel_logs"] = await phase("fuel logs", _seed_fuel_logs(conn, cfg, rnd, vehicle_ids, end))
+        counts["tracking_points"] = await phase("tracking points", _seed_points(conn, cfg, vehicle_ids, end))
+
+    # Статистика планировщика под новый объем (вне транзакции)
+    async with engine.connect() as conn:
+        await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in ("users", "drivers", "vehicles", "orders", "fuel_logs", "tracking_points"):
+            await conn.execute(text(f"ANALYZE {table}"))
+    return counts
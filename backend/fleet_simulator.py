@@ -0,0 +1,515 @@
+"""
+Синтетический парк: тысячи виртуальных машин возят заказы и шлют телеметрию
+через настоящий путь приема.
+
+    python fleet_simulator.py --vehicles 2000 --rate 0.2 --duration 600
+    python fleet_simulator.py --vehicles 5000 --transport gateway --rate 1
+    python fleet_simulator.py --vehicles 1000 --dead-zones 20 --jitter 0.3 --save
+
+Машины берутся из базы (текущая позиция, --plate-prefix для набора из
+python -m bench seed), маршруты - точки забора и доставки заказов. Машина
+едет к точке забора, стоит там (погрузка), везет к точке доставки, стоит и
+берет следующий заказ. Путь между точками - "по кварталам": через угол
+(lat одной точки, lng другой), скорость своя на каждом участке.
+
+Телеметрия:
+- --rate точек в секунду на машину, --jitter - разброс интервала (доля),
+  --gps-noise-m - шум координат;
+- мертвые зоны (--dead-zones, --dead-zone-radius-m): внутри машина копит
+  точки и отправляет буфер при выезде, как настоящий трекер - сервер
+  получает поздние точки;
+- время точек - настоящее (UTC), поэтому их видят WebSocket-подписчики,
+  геозоны, поездки и аналитика.
+
+Транспорт:
+- http (по умолчанию) - POST /tracking/points/batch, точки всех машин
+  собираются в пачки до --batch-size или раз в --flush-interval, отправка
+  в --connections соединений;
+- gateway - бинарный протокол LTP, одно TCP-соединение на машину (как у
+  трекеров). Время в протоколе в секундах, поэтому --rate не больше 1.
+
+Раз в --report-every секунд печатается сводка: сгенерировано/принято точек,
+отставание генератора от расписания (если растет - сервер не успевает),
+задержки отправки. --save пишет итоговый JSON-отчет в bench/results.
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import math
+import random
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.pricing import calculate_haversine_distance
+from app.services.telematics import encode_fixes, encode_login
+from bench.client import HTTPConnection, Recorder, api_url
+from bench.report import build_report, print_report, save_report
+from gateway_loadgen import read_ack
+
+# (seq, unix time, lat, lng, speed km/h, heading, fuel %) - как в gateway_loadgen / LTP
+Fix = Tuple[int, float, float, float, float, float, float]
+LatLng = Tuple[float, float]
+
+METERS_PER_DEG = 111_320.0
+
+
+def _bearing(a: LatLng, b: LatLng) -> float:
+    d_lng = math.radians(b[1] - a[1])
+    lat1, lat2 = math.radians(a[0]), math.radians(b[0])
+    x = math.sin(d_lng) * math.cos(lat2)
+    y = math.cos(lat1) * math.sin(lat2) - math.sin(lat1) * math.cos(lat2) * math.cos(d_lng)
+    return math.degrees(math.atan2(x, y)) % 360
+
+
+def _interpolate(a: LatLng, b: LatLng, fraction: float) -> LatLng:
+    return a[0] + (b[0] - a[0]) * fraction, a[1] + (b[1] - a[1]) * fraction
+
+
+class DeadZones:
+    """Circles without coverage; checked with an equirectangular approximation."""
+
+    def __init__(self, centers: List[LatLng], radius_m: float):
+        self.centers = centers
+        self.radius_m = radius_m
+
+    def contains(self, lat: float, lng: float) -> bool:
+        for c_lat, c_lng in self.centers:
+            dy = (lat - c_lat) * METERS_PER_DEG
+            dx = (lng - c_lng) * METERS_PER_DEG * math.cos(math.radians(c_lat))
+            if dx * dx + dy * dy <= self.radius_m * self.radius_m:
+                return True
+        return False
+
+
+@dataclass
+class SimConfig:
+    rate: float = 0.2
+    jitter: float = 0.2
+    gps_noise_m: float = 5.0
+    speed_kmh: Tuple[float, float] = (25.0, 60.0)
+    dwell_seconds: Tuple[float, float] = (60.0, 300.0)
+
+
+class VirtualVehicle:
+    """Drives pickup -> delivery for orders from the pool, dwelling at each stop."""
+
+    def __init__(self, vehicle_id: int, position: LatLng, orders: List[Tuple[LatLng, LatLng]],
+                 cfg: SimConfig, rnd: random.Random, now: float):
+        self.vehicle_id = vehicle_id
+        self.device_id = f"FLEET{vehicle_id:06d}"
+        self.position = position
+        self.orders = orders
+        self.cfg = cfg
+        self.rnd = rnd
+        self.updated_at = now
+        # seq от часов: повторный запуск не упирается в ключ (device_id, seq)
+        self.seq = int(now)
+        self.fuel = rnd.uniform(40, 100)
+        self.heading = rnd.uniform(0, 360)
+        self.speed = 0.0
+        self.path: List[LatLng] = []
+        self.stops: List[LatLng] = []
+        self.dwell_until = 0.0
+        self.buffer: List[Fix] = []
+        self.trips_done = 0
+
+    def _next_order(self):
+        pickup, delivery = self.rnd.choice(self.orders)
+        self.stops = [pickup, delivery]
+        self._route_to(self.stops[0])
+
+    def _route_to(self, target: LatLng):
+        # "По кварталам": сначала по одной оси, потом по другой
+        corner = (target[0], self.position[1]) if self.rnd.random() < 0.5 else (self.position[0], target[1])
+        self.path = [corner, target]
+        self.speed = self.rnd.uniform(*self.cfg.speed_kmh)
+
+    def advance(self, now: float):
+        """Move along the route up to wall time now."""
+        t, self.updated_at = self.updated_at, now
+        while t < now:
+            if self.dwell_until > t:
+                t = min(now, self.dwell_until)
+                continue
+            if not self.path:
+                # Доехали до остановки и отстояли: следующая точка заказа или новый заказ
+                if self.stops:
+                    self.stops.pop(0)
+                if self.stops:
+                    self._route_to(self.stops[0])
+                else:
+                    self.trips_done += 1
+                    self._next_order()
+                continue
+
+            target = self.path[0]
+            remaining_km = calculate_haversine_distance(self.position[0], self.position[1], target[0], target[1])
+            available_km = self.speed * (now - t) / 3600
+            if remaining_km > 0:
+                self.heading = _bearing(self.position, target)
+            if available_km < remaining_km:
+                self.position = _interpolate(self.position, target, available_km / remaining_km)
+                self.fuel -= available_km * 0.05
+                t = now
+            else:
+                self.position = target
+                self.fuel -= remaining_km * 0.05
+                t += remaining_km / self.speed * 3600
+                self.path.pop(0)
+                if not self.path:
+                    # Остановка: погрузка или выгрузка
+                    self.dwell_until = t + self.rnd.uniform(*self.cfg.dwell_seconds)
+            if self.fuel < 15:
+                self.fuel = 100.0
+
+    def fix(self, now: float) -> Fix:
+        noise = self.cfg.gps_noise_m / METERS_PER_DEG
+        lat = self.position[0] + self.rnd.gauss(0, noise)
+        lng = self.position[1] + self.rnd.gauss(0, noise) / math.cos(math.radians(self.position[0]))
+        speed = 0.0 if self.dwell_until > now else self.speed * self.rnd.uniform(0.9, 1.1)
+        self.seq += 1
+        return self.seq, now, lat, lng, speed, self.heading, max(0.0, self.fuel)
+
+    def next_interval(self) -> float:
+        interval = 1.0 / self.cfg.rate
+        return interval * (1 + self.rnd.uniform(-self.cfg.jitter, self.cfg.jitter))
+
+
+# ---------- транспорт ----------
+
+def _point_body(vehicle: VirtualVehicle, fix: Fix) -> dict:
+    seq, at, lat, lng, speed, heading, fuel = fix
+    return {
+        "vehicle_id": vehicle.vehicle_id,
+        "location": {"lat": round(lat, 7), "lng": round(lng, 7)},
+        "speed": round(speed, 1),
+        "heading": round(heading, 1),
+        "fuel_level": round(fuel, 1),
+        "timestamp": datetime.fromtimestamp(at, timezone.utc).isoformat(),
+        "device_id": vehicle.device_id,
+        "seq": seq,
+    }
+
+
+class HttpBatchTransport:
+    """Aggregates fixes of all vehicles into POST /tracking/points/batch requests."""
+
+    def __init__(self, url: str, connections: int, batch_size: int, flush_interval: float, recorder: Recorder):
+        self.url = url
+        self.connections = connections
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recorder = recorder
+        self.pending: List[dict] = []
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=connections * 4)
+        self.queued_points = 0
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        self.tasks = [asyncio.create_task(self._sender()) for _ in range(self.connections)]
+        self.tasks.append(asyncio.create_task(self._flusher()))
+
+    async def submit(self, vehicle: VirtualVehicle, fixes: List[Fix]):
+        self.pending.extend(_point_body(vehicle, fix) for fix in fixes)
+        while len(self.pending) >= self.batch_size:
+            batch, self.pending = self.pending[:self.batch_size], self.pending[self.batch_size:]
+            # Очередь ограничена: если сервер не успевает, генератор ждет и копит отставание
+            await self._put(batch)
+
+    async def _put(self, batch: List[dict]):
+        self.queued_points += len(batch)
+        await self.queue.put(batch)
+
+    async def _flusher(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            if self.pending:
+                batch, self.pending = self.pending, []
+                await self._put(batch)
+
+    async def _sender(self):
+        conn = HTTPConnection(api_url(self.url))
+        try:
+            while True:
+                batch = await self.queue.get()
+                content = await self.recorder.call(
+                    conn, "POST /tracking/points/batch", "POST", "/tracking/points/batch", body={"points": batch}
+                )
+                self.recorder.count("points_sent", len(batch))
+                if content is not None:
+                    result = json.loads(content)
+                    self.recorder.count("points_accepted", result["accepted"])
+                    self.recorder.count("points_late", result["late"])
+                    self.recorder.count("points_duplicate", result["duplicates"])
+                    self.recorder.count("points_rejected", len(result["rejected"]))
+                self.queued_points -= len(batch)
+                self.queue.task_done()
+        finally:
+            await conn.close()
+
+    async def drain(self):
+        if self.pending:
+            batch, self.pending = self.pending, []
+            await self._put(batch)
+        await self.queue.join()
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def backlog(self) -> int:
+        return len(self.pending) + self.queued_points
+
+
+class GatewayTransport:
+    """One LTP TCP connection per vehicle; each frame waits for its ACK."""
+
+    def __init__(self, host: str, port: int, recorder: Recorder):
+        self.host = host
+        self.port = port
+        self.recorder = recorder
+        self.queues: Dict[int, asyncio.Queue] = {}
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self):
+        pass
+
+    async def submit(self, vehicle: VirtualVehicle, fixes: List[Fix]):
+        queue = self.queues.get(vehicle.vehicle_id)
+        if queue is None:
+            queue = self.queues[vehicle.vehicle_id] = asyncio.Queue()
+            self.tasks.append(asyncio.create_task(self._device(vehicle, queue)))
+        for fix in fixes:
+            queue.put_nowait(fix)
+
+    async def _device(self, vehicle: VirtualVehicle, queue: asyncio.Queue):
+        backoff = 1.0
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError as e:
+                self.recorder.error("LTP connect", f"{type(e).__name__}: {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            backoff = 1.0
+            last_second = 0
+            self.recorder.count("gateway_connections")
+            fixes: List[Fix] = []
+            try:
+                writer.write(encode_login(vehicle.vehicle_id, vehicle.device_id))
+                await writer.drain()
+                await read_ack(reader)
+                while True:
+                    fixes = [await queue.get()]
+                    while not queue.empty():
+                        fixes.append(queue.get_nowait())
+                    # Время в LTP - целые секунды: два фикса в одной секунде сервер счел бы дублем
+                    records = []
+                    for seq, at, lat, lng, speed, heading, fuel in fixes:
+                        last_second = max(int(at), last_second + 1)
+                        records.append((seq, last_second, lat, lng, speed, heading, fuel))
+                    started = time.perf_counter()
+                    writer.write(encode_fixes(records))
+                    await writer.drain()
+                    await read_ack(reader)
+                    self.recorder.add("LTP FIXES ack", time.perf_counter() - started)
+                    self.recorder.count("points_sent", len(fixes))
+                    self.recorder.count("points_acked", len(fixes))
+                    for _ in fixes:
+                        queue.task_done()
+                    fixes = []
+            except (OSError, asyncio.IncompleteReadError, RuntimeError) as e:
+                # Точки кадра без ACK теряются, как у трекера без буфера на диске
+                self.recorder.error("LTP FIXES ack", f"{type(e).__name__}: {e}")
+                self.recorder.count("points_lost", len(fixes))
+                for _ in fixes:
+                    queue.task_done()
+            finally:
+                writer.close()
+
+    async def drain(self):
+        await asyncio.wait_for(asyncio.gather(*(q.join() for q in self.queues.values())), timeout=30)
+
+    async def stop(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def backlog(self) -> int:
+        return sum(q.qsize() for q in self.queues.values())
+
+
+# ---------- запуск ----------
+
+async def load_fleet(vehicle_count: int, plate_prefix: Optional[str], orders_limit: int):
+    """Vehicles with a current position and (pickup, delivery) pairs of recent orders."""
+    async with engine.connect() as conn:
+        query = """
+            SELECT id, ST_Y(current_location), ST_X(current_location) FROM vehicles
+            WHERE current_location IS NOT NULL {prefix} ORDER BY id LIMIT :limit
+        """.format(prefix="AND plate_number LIKE :prefix" if plate_prefix else "")
+        vehicles = (await conn.execute(text(query), {"limit": vehicle_count, "prefix": f"{plate_prefix}%"})).all()
+        orders = (await conn.execute(text("""
+            SELECT ST_Y(pickup_location), ST_X(pickup_location), ST_Y(delivery_location), ST_X(delivery_location)
+            FROM orders
+            WHERE pickup_location IS NOT NULL AND delivery_location IS NOT NULL
+            ORDER BY id DESC LIMIT :limit
+        """), {"limit": orders_limit})).all()
+    await engine.dispose()
+    return [(vid, (lat, lng)) for vid, lat, lng in vehicles], [((a, b), (c, d)) for a, b, c, d in orders]
+
+
+def _random_orders(vehicles: List[Tuple[int, LatLng]], count: int, rnd: random.Random) -> List[Tuple[LatLng, LatLng]]:
+    """Without orders in the database: random pairs inside the fleet bounding box."""
+    lats = [p[0] for _, p in vehicles]
+    lngs = [p[1] for _, p in vehicles]
+
+    def point() -> LatLng:
+        return rnd.uniform(min(lats), max(lats)), rnd.uniform(min(lngs), max(lngs))
+
+    return [(point(), point()) for _ in range(count)]
+
+
+def _print_progress(recorder: Recorder, stats: dict, transport, window_start: int):
+    latencies = sorted(recorder.latencies.get(stats["operation"], [])[window_start:])
+    p50 = latencies[len(latencies) // 2] * 1000 if latencies else 0.0
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000 if latencies else 0.0
+    counters = recorder.counters
+    print(
+        f"[{recorder.elapsed:6.0f}s] generated {stats['generated']:.0f} "
+        f"sent {counters['points_sent']:.0f} accepted {counters.get('points_accepted', counters.get('points_acked', 0)):.0f} "
+        f"late {counters.get('points_late', 0):.0f} rejected {counters.get('points_rejected', 0):.0f} | "
+        f"in dead zones {stats['in_dead_zone']} buffered {stats['buffered']} backlog {transport.backlog()} | "
+        f"lag {stats['lag']:.2f}s | send p50 {p50:.0f} ms p99 {p99:.0f} ms | errors {sum(recorder.errors.values())}"
+    )
+
+
+async def main(args):
+    rnd = random.Random(args.seed)
+    vehicles, orders = await load_fleet(args.vehicles, args.plate_prefix, args.orders_limit)
+    if not vehicles:
+        raise SystemExit("No vehicles with a position - run `python -m bench seed --vehicles N` first")
+    if len(vehicles) < args.vehicles:
+        print(f"Only {len(vehicles)} vehicles with a position found, simulating those")
+    if not orders:
+        orders = _random_orders(vehicles, 1000, rnd)
+        print("No orders with coordinates, using random routes")
+
+    lats = [p[0] for _, p in vehicles] + [p[0] for pair in orders for p in pair]
+    lngs = [p[1] for _, p in vehicles] + [p[1] for pair in orders for p in pair]
+    dead_zones = DeadZones(
+        [(rnd.uniform(min(lats), max(lats)), rnd.uniform(min(lngs), max(lngs))) for _ in range(args.dead_zones)],
+        args.dead_zone_radius_m,
+    )
+
+    cfg = SimConfig(rate=args.rate, jitter=args.jitter, gps_noise_m=args.gps_noise_m)
+    now = time.time()
+    fleet = [
+        VirtualVehicle(vid, position, orders, cfg, random.Random(f"{args.seed}:{vid}"), now)
+        for vid, position in vehicles
+    ]
+    for vehicle in fleet:
+        vehicle._next_order()
+
+    recorder = Recorder()
+    if args.transport == "gateway":
+        transport = GatewayTransport(args.gateway_host, args.gateway_port, recorder)
+        operation = "LTP FIXES ack"
+    else:
+        transport = HttpBatchTransport(args.url, args.connections, args.batch_size, args.flush_interval, recorder)
+        operation = "POST /tracking/points/batch"
+    await transport.start()
+    print(f"Simulating {len(fleet)} vehicles, {len(orders)} routes, {args.rate} fix/s each "
+          f"(~{len(fleet) * args.rate:.0f} points/s) via {args.transport}, {args.dead_zones} dead zone(s)")
+
+    # Расписание отчетов: куча (время, индекс машины), старт размазан по первому интервалу
+    schedule = [(now + rnd.uniform(0, 1.0 / args.rate), i) for i in range(len(fleet))]
+    heapq.heapify(schedule)
+    deadline = now + args.duration
+    stats = {"generated": 0, "buffered": 0, "in_dead_zone": 0, "lag": 0.0, "operation": operation}
+    next_report, window_start = now + args.report_every, 0
+    inside = set()
+
+    while time.time() < deadline:
+        current = time.time()
+        lag = 0.0
+        while schedule and schedule[0][0] <= current:
+            at, index = heapq.heappop(schedule)
+            lag = max(lag, current - at)
+            vehicle = fleet[index]
+            vehicle.advance(current)
+            fix = vehicle.fix(current)
+            stats["generated"] += 1
+            if dead_zones.contains(fix[2], fix[3]):
+                # Нет связи: трекер копит точки и отправит их при выезде из зоны
+                vehicle.buffer.append(fix)
+                stats["buffered"] += 1
+                inside.add(vehicle.vehicle_id)
+            else:
+                fixes = vehicle.buffer + [fix]
+                stats["buffered"] -= len(vehicle.buffer)
+                vehicle.buffer = []
+                inside.discard(vehicle.vehicle_id)
+                await transport.submit(vehicle, fixes)
+            heapq.heappush(schedule, (at + vehicle.next_interval(), index))
+        stats["lag"] = lag
+        stats["in_dead_zone"] = len(inside)
+
+        if current >= next_report:
+            _print_progress(recorder, stats, transport, window_start)
+            window_start = len(recorder.latencies.get(operation, []))
+            next_report += args.report_every
+        await asyncio.sleep(max(0.0, min(schedule[0][0] if schedule else current + 0.1, deadline) - time.time()))
+
+    try:
+        await transport.drain()
+    except asyncio.TimeoutError:
+        print("Transport did not drain within 30s")
+    recorder.stop()
+    await transport.stop()
+
+    recorder.count("vehicles", len(fleet))
+    recorder.count("points_generated", stats["generated"])
+    recorder.count("trips_done", sum(v.trips_done for v in fleet))
+    recorder.count("points_per_s", recorder.counters["points_sent"] / recorder.elapsed)
+    params = {k: v for k, v in vars(args).items() if k not in ("url",)}
+    report = build_report("fleet_simulator", recorder, params=params)
+    print_report(report)
+    if args.save:
+        print(f"   saved {save_report(report)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Synthetic fleet: virtual vehicles deliver orders and post telemetry")
+    parser.add_argument("--vehicles", type=int, default=1000)
+    parser.add_argument("--plate-prefix", default=None, help="Only vehicles whose plate starts with this (e.g. BENCH-)")
+    parser.add_argument("--orders-limit", type=int, default=5000, help="Recent orders used as routes")
+    parser.add_argument("--duration", type=float, default=300.0, help="Seconds")
+    parser.add_argument("--rate", type=float, default=0.2, help="Fixes per second per vehicle")
+    parser.add_argument("--jitter", type=float, default=0.2, help="Reporting interval spread, fraction of the interval")
+    parser.add_argument("--gps-noise-m", type=float, default=5.0, help="Position noise, metres (sigma)")
+    parser.add_argument("--dead-zones", type=int, default=0, help="Number of no-coverage circles")
+    parser.add_argument("--dead-zone-radius-m", type=float, default=1000.0)
+    parser.add_argument("--transport", choices=["http", "gateway"], default="http")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="API base URL (http transport)")
+    parser.add_argument("--batch-size", type=int, default=200, help="Points per request (http transport)")
+    parser.add_argument("--flush-interval", type=float, default=1.0, help="Max seconds a point waits for a batch")
+    parser.add_argument("--connections", type=int, default=8, help="Parallel HTTP connections")
+    parser.add_argument("--gateway-host", default="127.0.0.1")
+    parser.add_argument("--gateway-port", type=int, default=settings.GATEWAY_TCP_PORT)
+    parser.add_argument("--report-every", type=float, default=10.0, help="Progress line interval, seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--save", action="store_true", help="Write the final JSON report to bench/results")
+    args = parser.parse_args()
+    if args.transport == "gateway" and args.rate > 1:
+        parser.error("LTP timestamps have 1 s resolution: --rate must be <= 1 with --transport gateway")
+    asyncio.run(main(args))
@@ -0,0 +1,66 @@
+"""
+Точка входа телематического шлюза (бинарный протокол LTP по TCP/UDP).
+
+    python gateway.py --tcp-port 5027 --udp-port 5028
+
+Точки идут в тот же конвейер приема, что и POST /api/v1/tracking/points.
+"""
+import argparse
+import asyncio
+import signal
+
+from app.core.config import settings
+from app.core.database import engine
+from app.services.gateway import IngestBatcher, TelematicsGateway
+from app.services.geofencing import geofence_monitor
+from app.services.trips import trip_engine
+
+
+def create_gateway(on_batch=None) -> TelematicsGateway:
+    batcher = IngestBatcher(
+        batch_size=settings.GATEWAY_BATCH_SIZE,
+        flush_interval=settings.GATEWAY_FLUSH_MS / 1000,
+        max_pending=settings.GATEWAY_MAX_PENDING,
+        on_batch=on_batch,
+    )
+    return TelematicsGateway(batcher)
+
+
+async def main(host: str, tcp_port: int, udp_port: int, stats_interval: float):
+    await geofence_monitor.reload()
+    background_tasks = []
+    if settings.GEOFENCE_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(geofence_monitor.watch(settings.GEOFENCE_REFRESH_SECONDS)))
+    if settings.TRIP_SWEEP_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(trip_engine.run(settings.TRIP_SWEEP_SECONDS)))
+
+    gateway = create_gateway()
+    await gateway.start(host, tcp_port, udp_port or None)
+    print(f"Gateway listening on {host}: tcp {gateway.tcp_port}, udp {gateway.udp_port}")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=stats_interval)
+            except asyncio.TimeoutError:
+                print(f"Gateway stats: {gateway.stats()}")
+    finally:
+        await gateway.stop()
+        for task in background_tasks:
+            task.cancel()
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="LogiTrack telematics gateway")
+    parser.add_argument("--host", default=settings.GATEWAY_HOST)
+    parser.add_argument("--tcp-port", type=int, default=settings.GATEWAY_TCP_PORT)
+    parser.add_argument("--udp-port", type=int, default=settings.GATEWAY_UDP_PORT, help="0 disables UDP")
+    parser.add_argument("--stats-interval", type=float, default=30.0)
+    args = parser.parse_args()
+    asyncio.run(main(args.host, args.tcp_port, args.udp_port, args.stats_interval))
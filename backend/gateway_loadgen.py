@@ -0,0 +1,161 @@
+"""
+Генератор нагрузки для телематического шлюза.
+
+Открывает N постоянных TCP-соединений (или шлет UDP), каждое устройство
+двигается случайным блужданием и отправляет кадры FIXES, дожидаясь ACK.
+В конце печатает пропускную способность и задержку ACK.
+
+    python gateway_loadgen.py --devices 500 --duration 30 --fixes-per-frame 10
+    python gateway_loadgen.py --devices 500 --udp
+
+vehicle_id устройств: --vehicle-id-start .. +devices-1 (транспорт должен существовать).
+"""
+import argparse
+import asyncio
+import math
+import random
+import statistics
+import time
+from typing import List
+
+from app.services.telematics import (
+    ACK, FRAME_ACK, HEADER, decode_header, encode_fixes, encode_login, encode_udp_fixes,
+)
+
+
+class DeviceSimulator:
+    def __init__(self, vehicle_id: int, device_id: str, lat: float, lng: float):
+        self.vehicle_id = vehicle_id
+        self.device_id = device_id
+        self.lat, self.lng = lat, lng
+        self.heading = random.uniform(0, 360)
+        self.seq = 0
+        self.clock = int(time.time())
+
+    def next_fixes(self, count: int, interval: int = 1):
+        fixes = []
+        for _ in range(count):
+            self.heading = (self.heading + random.uniform(-15, 15)) % 360
+            speed = random.uniform(20, 70)
+            step_km = speed * interval / 3600
+            self.lat += step_km / 111.0 * math.cos(math.radians(self.heading))
+            self.lng += step_km / (111.0 * math.cos(math.radians(self.lat))) * math.sin(math.radians(self.heading))
+            self.seq += 1
+            self.clock += interval
+            fixes.append((self.seq, self.clock, self.lat, self.lng, speed, self.heading, 80.0))
+        return fixes
+
+
+class Stats:
+    def __init__(self):
+        self.fixes = 0
+        self.frames = 0
+        self.errors = 0
+        self.latencies: List[float] = []
+
+
+async def read_ack(reader: asyncio.StreamReader) -> int:
+    frame_type, length = decode_header(await reader.readexactly(HEADER.size))
+    payload = await reader.readexactly(length)
+    if frame_type != FRAME_ACK:
+        raise RuntimeError(f"gateway error frame {frame_type}: {payload.hex()}")
+    return ACK.unpack(payload)[0]
+
+
+async def run_tcp_device(device: DeviceSimulator, host: str, port: int, args, stats: Stats, deadline: float):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        writer.write(encode_login(device.vehicle_id, device.device_id))
+        await writer.drain()
+        await read_ack(reader)
+        while time.perf_counter() < deadline:
+            fixes = device.next_fixes(args.fixes_per_frame)
+            started = time.perf_counter()
+            writer.write(encode_fixes(fixes))
+            await writer.drain()
+            acked = await read_ack(reader)
+            stats.latencies.append(time.perf_counter() - started)
+            if acked != fixes[-1][0]:
+                stats.errors += 1
+            stats.fixes += len(fixes)
+            stats.frames += 1
+            if args.interval > 0:
+                await asyncio.sleep(args.interval)
+    except Exception as e:
+        stats.errors += 1
+        print(f"Device {device.device_id}: {e}")
+    finally:
+        writer.close()
+
+
+class _UDPClient(asyncio.DatagramProtocol):
+    def __init__(self):
+        self.acks: asyncio.Queue = asyncio.Queue()
+
+    def datagram_received(self, data, addr):
+        self.acks.put_nowait(data)
+
+
+async def run_udp_device(device: DeviceSimulator, host: str, port: int, args, stats: Stats, deadline: float):
+    loop = asyncio.get_running_loop()
+    transport, protocol = await loop.create_datagram_endpoint(_UDPClient, remote_addr=(host, port))
+    try:
+        while time.perf_counter() < deadline:
+            fixes = device.next_fixes(args.fixes_per_frame)
+            started = time.perf_counter()
+            transport.sendto(encode_udp_fixes(device.vehicle_id, device.device_id, fixes))
+            try:
+                await asyncio.wait_for(protocol.acks.get(), timeout=5)
+                stats.latencies.append(time.perf_counter() - started)
+            except asyncio.TimeoutError:
+                stats.errors += 1
+            stats.fixes += len(fixes)
+            stats.frames += 1
+            if args.interval > 0:
+                await asyncio.sleep(args.interval)
+    finally:
+        transport.close()
+
+
+async def main(args):
+    devices = [
+        DeviceSimulator(
+            args.vehicle_id_start + i,
+            f"{args.device_prefix}{i:06d}",
+            args.lat + random.uniform(-0.2, 0.2),
+            args.lng + random.uniform(-0.2, 0.2),
+        )
+        for i in range(args.devices)
+    ]
+    stats = Stats()
+    started = time.perf_counter()
+    deadline = started + args.duration
+    runner = run_udp_device if args.udp else run_tcp_device
+    port = args.udp_port if args.udp else args.tcp_port
+    await asyncio.gather(*(runner(d, args.host, port, args, stats, deadline) for d in devices))
+    elapsed = time.perf_counter() - started
+
+    print(f"Devices: {args.devices} ({'udp' if args.udp else 'tcp'}), elapsed {elapsed:.1f}s")
+    print(f"Frames: {stats.frames}, fixes: {stats.fixes}, errors: {stats.errors}")
+    print(f"Throughput: {stats.fixes / elapsed:.0f} fixes/s")
+    if stats.latencies:
+        latencies = sorted(stats.latencies)
+        p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+        print(f"ACK latency: median {statistics.median(latencies) * 1000:.1f} ms, p99 {p99 * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for the telematics gateway")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--tcp-port", type=int, default=5027)
+    parser.add_argument("--udp-port", type=int, default=5028)
+    parser.add_argument("--udp", action="store_true", help="Send UDP datagrams instead of TCP")
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds")
+    parser.add_argument("--fixes-per-frame", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=1.0, help="Pause between frames per device, seconds")
+    parser.add_argument("--vehicle-id-start", type=int, default=1)
+    parser.add_argument("--device-prefix", default="SIM")
+    parser.add_argument("--lat", type=float, default=55.75)
+    parser.add_argument("--lng", type=float, default=37.62)
+    asyncio.run(main(parser.parse_args()))
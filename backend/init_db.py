@@ -4,7 +4,7 @@ Run this to create tables and optionally seed initial data.
 """
 import asyncio
 from sqlalchemy import text
-from app.core.database import engine, AsyncSessionLocal, Base
+from app.core.database import engine, AsyncSessionLocal, Base, create_extensions
 from app.core.config import settings
 from app.models import User, UserRole
 from app.core.security import get_password_hash
@@ -14,6 +14,7 @@ async def init_db():
     """Initialize database - create tables."""
     print("Creating database tables...")
     async with engine.begin() as conn:
+        await create_extensions(conn)
         await conn.run_sync(Base.metadata.create_all)
     print("✓ Tables created successfully!")
 
@@ -1,22 +1,93 @@
+import asyncio
+import time
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+from sqlalchemy import func, select
 
 from app.core.config import settings
-from app.core.database import engine, Base
-from app.api import auth, vehicles, orders, fuel, maintenance, dashboard, tracking, drivers
+from app.core.database import engine, Base, create_extensions
+from app.api import auth, vehicles, orders, fuel, maintenance, dashboard, tracking, drivers, tariffs, geocoding, search, changes, geofences, heatmap, tiles, spatial
+from app.core.email import email_outbox_worker
+from app.services.tariffs import tariff_registry
+from app.services.geofencing import geofence_monitor
+from app.services.trips import trip_engine
+from app.services.track_archive import run_archiver, track_archive
+from app.services.heatmap import run_rollup
+from app.services.changes import run_pruner, run_sequencer
+
+SCHEMA_LOCK_KEY = 74_201_001  # pg_advisory_xact_lock key for startup create_all
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Lifespan context manager for startup/shutdown events."""
-    # Startup: Create tables
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    started = time.perf_counter()
+    # Startup: Create tables (dev). В продакшене схему ведет alembic upgrade head
+    if settings.DB_CREATE_ALL_ON_STARTUP:
+        async with engine.begin() as conn:
+            # Воркеры uvicorn стартуют одновременно - DDL по очереди
+            await conn.execute(select(func.pg_advisory_xact_lock(SCHEMA_LOCK_KEY)))
+            await create_extensions(conn)
+            await conn.run_sync(Base.metadata.create_all)
+    
+    # Load pricing tariffs into memory
+    await tariff_registry.reload()
+    background_tasks = []
+    if settings.TARIFF_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(tariff_registry.watch(settings.TARIFF_REFRESH_SECONDS)))
+    
+    # Geofence index for enter/exit detection on tracking ingest
+    await geofence_monitor.reload()
+    if settings.GEOFENCE_REFRESH_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(geofence_monitor.watch(settings.GEOFENCE_REFRESH_SECONDS)))
+    
+    # Close trips of vehicles that stopped reporting
+    if settings.TRIP_SWEEP_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(trip_engine.run(settings.TRIP_SWEEP_SECONDS)))
+    
+    # Revisions for changes committed outside this process (gateway) or left by failed publishes
+    if settings.CHANGE_FEED_SEQUENCE_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_sequencer(
+            settings.CHANGE_FEED_SEQUENCE_SECONDS, tracking.broadcast_change_entries
+        )))
+    
+    # Delete old change log entries
+    if settings.CHANGE_LOG_PRUNE_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_pruner(
+            settings.CHANGE_LOG_PRUNE_SECONDS, settings.CHANGE_LOG_RETENTION_DAYS
+        )))
+    
+    # Daily heatmap cells for closed days
+    if settings.HEATMAP_ROLLUP_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_rollup(settings.HEATMAP_ROLLUP_SECONDS)))
+    
+    # Move old tracking points to the columnar archive
+    if settings.TRACK_ARCHIVE_INTERVAL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(run_archiver(
+            track_archive, settings.TRACK_ARCHIVE_AFTER_DAYS, settings.TRACK_ARCHIVE_INTERVAL_SECONDS
+        )))
+    
+    # Binary telematics gateway in the API process (points reach WebSocket subscribers)
+    gateway = None
+    if settings.GATEWAY_EMBEDDED:
+        from gateway import create_gateway
+        gateway = create_gateway(on_batch=tracking.publish_batch_result)
+        await gateway.start(settings.GATEWAY_HOST, settings.GATEWAY_TCP_PORT, settings.GATEWAY_UDP_PORT or None)
+    
+    # Email outbox sender
+    if settings.EMAIL_WORKER_ENABLED:
+        background_tasks.append(asyncio.create_task(email_outbox_worker.run(settings.EMAIL_POLL_SECONDS)))
     
+    # Время импортов смотрит startup_profile.py imports, здесь - только lifespan
+    print(f"Startup complete in {time.perf_counter() - started:.3f}s")
     yield
     
-    # Shutdown: Close connections
+    # Shutdown: Stop background tasks and close connections
+    if gateway is not None:
+        await gateway.stop()
+    for task in background_tasks:
+        task.cancel()
     await engine.dispose()
 
 
@@ -46,6 +117,14 @@ app.include_router(maintenance.router, prefix=settings.API_V1_STR)
 app.include_router(dashboard.router, prefix=settings.API_V1_STR)
 app.include_router(tracking.router, prefix=settings.API_V1_STR)
 app.include_router(drivers.router, prefix=settings.API_V1_STR)
+app.include_router(tariffs.router, prefix=settings.API_V1_STR)
+app.include_router(geocoding.router, prefix=settings.API_V1_STR)
+app.include_router(search.router, prefix=settings.API_V1_STR)
+app.include_router(changes.router, prefix=settings.API_V1_STR)
+app.include_router(geofences.router, prefix=settings.API_V1_STR)
+app.include_router(heatmap.router, prefix=settings.API_V1_STR)
+app.include_router(tiles.router, prefix=settings.API_V1_STR)
+app.include_router(spatial.router, prefix=settings.API_V1_STR)
 
 
 @app.get("/")
@@ -0,0 +1,65 @@
+"""
+Окружение Alembic.
+
+- URL БД - settings.DATABASE_URL (asyncpg), как у приложения
+- target_metadata - app.models, для alembic revision --autogenerate
+- GeoAlchemy2 alembic_helpers: служебные таблицы PostGIS не попадают в
+  autogenerate, колонки Geometry рендерятся корректно
+"""
+import asyncio
+from logging.config import fileConfig
+
+from alembic import context
+from geoalchemy2 import alembic_helpers
+from sqlalchemy import pool
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.database import Base
+import app.models  # noqa: F401 - регистрирует модели в Base.metadata
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+CONFIGURE_OPTS = dict(
+    target_metadata=target_metadata,
+    include_object=alembic_helpers.include_object,
+    process_revision_directives=alembic_helpers.writer,
+    render_item=alembic_helpers.render_item,
+    compare_type=True,
+)
+
+
+def run_migrations_offline() -> None:
+    """Print SQL instead of executing it: alembic upgrade head --sql."""
+    context.configure(
+        url=settings.DATABASE_URL,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        **CONFIGURE_OPTS,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def do_run_migrations(connection: Connection) -> None:
+    context.configure(connection=connection, **CONFIGURE_OPTS)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+async def run_async_migrations() -> None:
+    connectable = create_async_engine(settings.DATABASE_URL, poolclass=pool.NullPool)
+    async with connectable.connect() as connection:
+        await connection.run_sync(do_run_migrations)
+    await connectable.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    asyncio.run(run_async_migrations())
@@ -0,0 +1,163 @@
+"""initial schema
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-19
+
+Исходная схема - таблицы в том виде, в каком их создавал create_all до
+появления миграций. Базу, созданную тогда, помечают этой ревизией
+(alembic stamp 0001), все последующие изменения - в 0002 и дальше.
+GiST-индексы колонок Geometry (idx_<table>_<column>) GeoAlchemy2 создает
+вместе с таблицей.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # До Alembic схему создавал create_all по образу postgis/postgis - нужен только PostGIS
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('hashed_password', sa.String(), nullable=False),
+    sa.Column('full_name', sa.String(), nullable=True),
+    sa.Column('phone', sa.String(), nullable=True),
+    sa.Column('role', sa.Enum('ADMIN', 'DISPATCHER', 'DRIVER', 'CLIENT', name='userrole'), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_table('drivers',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('license_number', sa.String(), nullable=True),
+    sa.Column('rating', sa.Float(), nullable=True),
+    sa.Column('avatar_url', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('license_number'),
+    sa.UniqueConstraint('user_id')
+    )
+    op.create_index(op.f('ix_drivers_id'), 'drivers', ['id'], unique=False)
+    op.create_table('vehicles',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vin', sa.String(), nullable=False),
+    sa.Column('plate_number', sa.String(), nullable=False),
+    sa.Column('make', sa.String(), nullable=False),
+    sa.Column('model', sa.String(), nullable=False),
+    sa.Column('status', sa.Enum('ACTIVE', 'MAINTENANCE', 'IDLE', 'SOS', 'IN_PROGRESS', name='vehiclestatus'), nullable=False),
+    sa.Column('driver_id', sa.Integer(), nullable=True),
+    sa.Column('current_location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('fuel_level', sa.Float(), nullable=True),
+    sa.Column('norm_consumption', sa.Float(), nullable=False),
+    sa.Column('current_speed', sa.Float(), nullable=True),
+    sa.Column('mileage', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['driver_id'], ['drivers.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_vehicles_id'), 'vehicles', ['id'], unique=False)
+    op.create_index(op.f('ix_vehicles_plate_number'), 'vehicles', ['plate_number'], unique=True)
+    op.create_index(op.f('ix_vehicles_vin'), 'vehicles', ['vin'], unique=True)
+    op.create_table('fuel_logs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('liters', sa.Float(), nullable=False),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.Column('mileage', sa.Float(), nullable=False),
+    sa.Column('location', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_fuel_logs_id'), 'fuel_logs', ['id'], unique=False)
+    op.create_table('maintenance_records',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('description', sa.Text(), nullable=True),
+    sa.Column('cost', sa.Float(), nullable=False),
+    sa.Column('status', sa.Enum('SCHEDULED', 'COMPLETED', name='maintenancestatus'), nullable=False),
+    sa.Column('scheduled_date', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('completed_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_maintenance_records_id'), 'maintenance_records', ['id'], unique=False)
+    op.create_table('orders',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('customer_id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=True),
+    sa.Column('customer_name', sa.String(), nullable=False),
+    sa.Column('pickup_address', sa.String(), nullable=False),
+    sa.Column('delivery_address', sa.String(), nullable=False),
+    sa.Column('pickup_location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('delivery_location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.Column('volume', sa.Float(), nullable=False),
+    sa.Column('dimensions', sa.String(), nullable=True),
+    sa.Column('distance_km', sa.Float(), nullable=False),
+    sa.Column('status', sa.Enum('NEW', 'IN_PROGRESS', 'COMPLETED', 'CANCELLED', name='orderstatus'), nullable=False),
+    sa.Column('price', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('delivery_date', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_orders_id'), 'orders', ['id'], unique=False)
+    op.create_table('tracking_points',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry', nullable=False), nullable=False),
+    sa.Column('speed', sa.Float(), nullable=True),
+    sa.Column('fuel_level', sa.Float(), nullable=True),
+    sa.Column('heading', sa.Float(), nullable=True),
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_tracking_points_id'), 'tracking_points', ['id'], unique=False)
+    op.create_table('route_points',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('order_id', sa.Integer(), nullable=False),
+    sa.Column('sequence', sa.Integer(), nullable=False),
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_route_points_id'), 'route_points', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('route_points')
+    op.drop_table('tracking_points')
+    op.drop_table('orders')
+    op.drop_table('maintenance_records')
+    op.drop_table('fuel_logs')
+    op.drop_table('vehicles')
+    op.drop_table('drivers')
+    op.drop_table('users')
+    sa.Enum(name='maintenancestatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='orderstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='userrole').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='vehiclestatus').drop(op.get_bind(), checkfirst=True)
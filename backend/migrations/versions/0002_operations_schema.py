@@ -0,0 +1,174 @@
+"""operations schema
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19
+
+Таблицы и колонки, добавленные после исходной схемы: тарифы, геокодер,
+outbox писем, лента изменений, геозоны, поездки, тепловая карта; у заказов -
+updated_at и search_vector, у точек трекинга - device_id/seq/received_at.
+
+Весь DDL с IF NOT EXISTS: ревизия проходит и на базе из 0001 (stamp старой
+базы), и на базе, где эти объекты уже создал create_all. Уникальный ключ
+(device_id, seq) строится в 0003 без блокировки записи.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from geoalchemy2 import Geometry
+from sqlalchemy.dialects import postgresql
+
+from app.core.migrations import add_column_if_not_exists, create_enum_if_not_exists, create_table_if_not_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    create_enum_if_not_exists('emailstatus', ['PENDING', 'SENT', 'FAILED'])
+    create_enum_if_not_exists('geofencekind', ['DEPOT', 'CUSTOMER_SITE', 'OTHER'])
+    create_enum_if_not_exists('geofenceeventtype', ['ENTER', 'EXIT'])
+
+    # Генерируемая колонка перезаписывает таблицу orders - выполнять в окно обслуживания
+    add_column_if_not_exists('orders', sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True))
+    add_column_if_not_exists('orders', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed("to_tsvector('simple', coalesce(customer_name, '') || ' ' || coalesce(pickup_address, '') || ' ' || coalesce(delivery_address, ''))", persisted=True), nullable=True))
+    add_column_if_not_exists('tracking_points', sa.Column('device_id', sa.String(), nullable=True))
+    add_column_if_not_exists('tracking_points', sa.Column('seq', sa.BigInteger(), nullable=True))
+    add_column_if_not_exists('tracking_points', sa.Column('received_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+
+    create_table_if_not_exists('change_log',
+    sa.Column('revision', sa.BigInteger(), autoincrement=True, nullable=False),
+    sa.Column('entity_type', sa.String(), nullable=False),
+    sa.Column('entity_id', sa.Integer(), nullable=False),
+    sa.Column('action', sa.String(), nullable=False),
+    sa.Column('data', postgresql.JSONB(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('revision')
+    )
+    create_table_if_not_exists('email_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('to_email', sa.String(), nullable=False),
+    sa.Column('subject', sa.String(), nullable=False),
+    sa.Column('text_body', sa.Text(), nullable=False),
+    sa.Column('html_body', sa.Text(), nullable=True),
+    sa.Column('status', postgresql.ENUM('PENDING', 'SENT', 'FAILED', name='emailstatus', create_type=False), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_email_outbox_id', 'email_outbox', ['id'], unique=False, if_not_exists=True)
+    create_table_if_not_exists('geocode_cache',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('address_key', sa.String(), nullable=False),
+    sa.Column('address', sa.String(), nullable=False),
+    sa.Column('location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('provider', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_geocode_cache_address_key', 'geocode_cache', ['address_key'], unique=True, if_not_exists=True)
+    op.create_index('ix_geocode_cache_id', 'geocode_cache', ['id'], unique=False, if_not_exists=True)
+    create_table_if_not_exists('geofences',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('kind', postgresql.ENUM('DEPOT', 'CUSTOMER_SITE', 'OTHER', name='geofencekind', create_type=False), nullable=False),
+    sa.Column('area', Geometry(geometry_type='POLYGON', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('center', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('radius_m', sa.Float(), nullable=True),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_geofences_id', 'geofences', ['id'], unique=False, if_not_exists=True)
+    create_table_if_not_exists('heatmap_cells',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('cell_x', sa.Integer(), nullable=False),
+    sa.Column('cell_y', sa.Integer(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('speed_sum', sa.Float(), nullable=False),
+    sa.Column('dwell_seconds', sa.Float(), nullable=False),
+    sa.Column('idle_seconds', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('day', 'cell_x', 'cell_y')
+    )
+    create_table_if_not_exists('heatmap_days',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('day')
+    )
+    create_table_if_not_exists('tariffs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('zone', Geometry(geometry_type='POLYGON', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('customer_id', sa.Integer(), nullable=True),
+    sa.Column('priority', sa.Integer(), nullable=False),
+    sa.Column('base_price', sa.Float(), nullable=False),
+    sa.Column('rate_per_km', sa.Float(), nullable=False),
+    sa.Column('rate_per_kg', sa.Float(), nullable=False),
+    sa.Column('volumetric_divisor', sa.Integer(), nullable=False),
+    sa.Column('is_active', sa.Boolean(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['customer_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tariffs_customer_id', 'tariffs', ['customer_id'], unique=False, if_not_exists=True)
+    op.create_index('ix_tariffs_id', 'tariffs', ['id'], unique=False, if_not_exists=True)
+    create_table_if_not_exists('geofence_events',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('geofence_id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('event_type', postgresql.ENUM('ENTER', 'EXIT', name='geofenceeventtype', create_type=False), nullable=False),
+    sa.Column('location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('timestamp', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['geofence_id'], ['geofences.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_geofence_events_id', 'geofence_events', ['id'], unique=False, if_not_exists=True)
+    create_table_if_not_exists('trips',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('vehicle_id', sa.Integer(), nullable=False),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('ended_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('start_location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('end_location', Geometry(geometry_type='POINT', srid=4326, from_text='ST_GeomFromEWKT', name='geometry'), nullable=True),
+    sa.Column('distance_km', sa.Float(), nullable=False),
+    sa.Column('max_speed', sa.Float(), nullable=False),
+    sa.Column('avg_speed', sa.Float(), nullable=False),
+    sa.Column('idle_seconds', sa.Float(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.ForeignKeyConstraint(['vehicle_id'], ['vehicles.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_trips_id', 'trips', ['id'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    op.drop_table('trips')
+    op.drop_table('geofence_events')
+    op.drop_table('tariffs')
+    op.drop_table('heatmap_days')
+    op.drop_table('heatmap_cells')
+    op.drop_table('geofences')
+    op.drop_table('geocode_cache')
+    op.drop_table('email_outbox')
+    op.drop_table('change_log')
+    op.drop_column('tracking_points', 'received_at')
+    op.drop_column('tracking_points', 'seq')
+    op.drop_column('tracking_points', 'device_id')
+    op.drop_column('orders', 'search_vector')
+    op.drop_column('orders', 'updated_at')
+    sa.Enum(name='emailstatus').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='geofencekind').drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name='geofenceeventtype').drop(op.get_bind(), checkfirst=True)
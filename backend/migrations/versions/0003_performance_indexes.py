@@ -0,0 +1,73 @@
+"""performance indexes
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+Индексы под поиск, ленты изменений, трекинг и пространственные запросы.
+Строятся CREATE INDEX CONCURRENTLY IF NOT EXISTS - без блокировки записи
+на рабочей базе и без ошибки, если индекс уже создал create_all.
+Уникальный ключ точек трекинга (device_id, seq) - так же, индексом, который
+затем становится ограничением (ON CONFLICT в ingest ссылается на него по имени).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.migrations import add_unique_constraint_using_index, create_index_concurrently, drop_index_concurrently
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    create_index_concurrently('ix_email_outbox_status_next_attempt', 'email_outbox', ['status', 'next_attempt_at'])
+    create_index_concurrently('ix_vehicles_current_location_geog', 'vehicles', [sa.text('geography(current_location)')], postgresql_using='gist')
+    create_index_concurrently('ix_vehicles_make_trgm', 'vehicles', ['make'], postgresql_using='gin', postgresql_ops={'make': 'gin_trgm_ops'})
+    create_index_concurrently('ix_vehicles_model_trgm', 'vehicles', ['model'], postgresql_using='gin', postgresql_ops={'model': 'gin_trgm_ops'})
+    create_index_concurrently('ix_vehicles_plate_number_trgm', 'vehicles', ['plate_number'], postgresql_using='gin', postgresql_ops={'plate_number': 'gin_trgm_ops'})
+    create_index_concurrently('ix_vehicles_updated_at', 'vehicles', ['updated_at'])
+    create_index_concurrently('ix_vehicles_vin_trgm', 'vehicles', ['vin'], postgresql_using='gin', postgresql_ops={'vin': 'gin_trgm_ops'})
+    create_index_concurrently('ix_geofence_events_geofence_timestamp', 'geofence_events', ['geofence_id', 'timestamp'])
+    create_index_concurrently('ix_geofence_events_vehicle_timestamp', 'geofence_events', ['vehicle_id', 'timestamp'])
+    create_index_concurrently('ix_orders_customer_id', 'orders', ['customer_id'])
+    create_index_concurrently('ix_orders_customer_name_trgm', 'orders', ['customer_name'], postgresql_using='gin', postgresql_ops={'customer_name': 'gin_trgm_ops'})
+    create_index_concurrently('ix_orders_delivery_address_trgm', 'orders', ['delivery_address'], postgresql_using='gin', postgresql_ops={'delivery_address': 'gin_trgm_ops'})
+    create_index_concurrently('ix_orders_delivery_location_geog', 'orders', [sa.text('geography(delivery_location)')], postgresql_using='gist')
+    create_index_concurrently('ix_orders_pickup_address_trgm', 'orders', ['pickup_address'], postgresql_using='gin', postgresql_ops={'pickup_address': 'gin_trgm_ops'})
+    create_index_concurrently('ix_orders_pickup_location_geog', 'orders', [sa.text('geography(pickup_location)')], postgresql_using='gist')
+    create_index_concurrently('ix_orders_search_vector', 'orders', ['search_vector'], postgresql_using='gin')
+    create_index_concurrently('ix_orders_updated_at', 'orders', ['updated_at'])
+    create_index_concurrently('ix_orders_vehicle_id', 'orders', ['vehicle_id'])
+    create_index_concurrently('ix_tracking_points_vehicle_timestamp', 'tracking_points', ['vehicle_id', 'timestamp'])
+    create_index_concurrently('ix_trips_vehicle_started_at', 'trips', ['vehicle_id', 'started_at'])
+    create_index_concurrently('uq_tracking_points_device_seq', 'tracking_points', ['device_id', 'seq'], unique=True)
+    add_unique_constraint_using_index('uq_tracking_points_device_seq', 'tracking_points')
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_tracking_points_device_seq', 'tracking_points', type_='unique')
+    drop_index_concurrently('ix_trips_vehicle_started_at', 'trips')
+    drop_index_concurrently('ix_tracking_points_vehicle_timestamp', 'tracking_points')
+    drop_index_concurrently('ix_orders_vehicle_id', 'orders')
+    drop_index_concurrently('ix_orders_updated_at', 'orders')
+    drop_index_concurrently('ix_orders_search_vector', 'orders')
+    drop_index_concurrently('ix_orders_pickup_location_geog', 'orders')
+    drop_index_concurrently('ix_orders_pickup_address_trgm', 'orders')
+    drop_index_concurrently('ix_orders_delivery_location_geog', 'orders')
+    drop_index_concurrently('ix_orders_delivery_address_trgm', 'orders')
+    drop_index_concurrently('ix_orders_customer_name_trgm', 'orders')
+    drop_index_concurrently('ix_orders_customer_id', 'orders')
+    drop_index_concurrently('ix_geofence_events_vehicle_timestamp', 'geofence_events')
+    drop_index_concurrently('ix_geofence_events_geofence_timestamp', 'geofence_events')
+    drop_index_concurrently('ix_vehicles_vin_trgm', 'vehicles')
+    drop_index_concurrently('ix_vehicles_updated_at', 'vehicles')
+    drop_index_concurrently('ix_vehicles_plate_number_trgm', 'vehicles')
+    drop_index_concurrently('ix_vehicles_model_trgm', 'vehicles')
+    drop_index_concurrently('ix_vehicles_make_trgm', 'vehicles')
+    drop_index_concurrently('ix_vehicles_current_location_geog', 'vehicles')
+    drop_index_concurrently('ix_email_outbox_status_next_attempt', 'email_outbox')
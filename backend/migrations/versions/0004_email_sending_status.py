@@ -0,0 +1,29 @@
+"""email sending status
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+Статус SENDING для писем outbox: воркер помечает пачку короткой транзакцией
+и отправляет ее уже без открытой транзакции. ALTER TYPE ... ADD VALUE
+выполняется вне транзакции (новое значение нельзя использовать в той же).
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("ALTER TYPE emailstatus ADD VALUE IF NOT EXISTS 'SENDING' AFTER 'PENDING'")
+
+
+def downgrade() -> None:
+    # Значение из enum в PostgreSQL не удаляется - возвращаем письма в очередь
+    op.execute("UPDATE email_outbox SET status = 'PENDING' WHERE status = 'SENDING'")
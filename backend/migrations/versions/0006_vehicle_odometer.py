@@ -0,0 +1,33 @@
+"""vehicle odometer position
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-19
+
+Позиция, от которой считается пробег, хранится в строке машины (а не в памяти
+воркера): пачки точек одной машины из разных воркеров не удваивают пробег.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.core.migrations import add_column_if_not_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_column_if_not_exists('vehicles', sa.Column('odometer_lat', sa.Float(), nullable=True))
+    add_column_if_not_exists('vehicles', sa.Column('odometer_lng', sa.Float(), nullable=True))
+    add_column_if_not_exists('vehicles', sa.Column('odometer_at', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('vehicles', 'odometer_at')
+    op.drop_column('vehicles', 'odometer_lng')
+    op.drop_column('vehicles', 'odometer_lat')
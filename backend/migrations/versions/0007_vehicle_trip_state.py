@@ -0,0 +1,33 @@
+"""vehicle trip state
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-19
+
+Незавершенная поездка хранится в строке машины (а не в памяти воркера) и
+меняется под той же блокировкой FOR UPDATE, что и пробег: пачки одной машины
+из разных воркеров не дублируют и не дробят поездки.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.core.migrations import add_column_if_not_exists
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    add_column_if_not_exists(
+        'vehicles', sa.Column('trip_state', postgresql.JSONB(astext_type=sa.Text()), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('vehicles', 'trip_state')
@@ -0,0 +1,39 @@
+"""geofence events restrict delete
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-19
+
+Геозоны удаляются мягко (is_active), история событий не должна пропадать
+вместе со строкой геозоны: внешний ключ geofence_events.geofence_id меняется
+с ON DELETE CASCADE на RESTRICT. Ключ добавляется NOT VALID и проверяется
+отдельно - проверка не блокирует запись в geofence_events.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CONSTRAINT = "geofence_events_geofence_id_fkey"
+
+
+def _replace_foreign_key(on_delete: str) -> None:
+    op.execute(f"ALTER TABLE geofence_events DROP CONSTRAINT IF EXISTS {CONSTRAINT}")
+    op.execute(
+        f"ALTER TABLE geofence_events ADD CONSTRAINT {CONSTRAINT} "
+        f"FOREIGN KEY (geofence_id) REFERENCES geofences (id) ON DELETE {on_delete} NOT VALID"
+    )
+    op.execute(f"ALTER TABLE geofence_events VALIDATE CONSTRAINT {CONSTRAINT}")
+
+
+def upgrade() -> None:
+    _replace_foreign_key("RESTRICT")
+
+
+def downgrade() -> None:
+    _replace_foreign_key("CASCADE")
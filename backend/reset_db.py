@@ -1,8 +1,8 @@
 import asyncio
-from app.core.database import engine
+from app.core.database import engine, create_extensions
 from app.models import Base
 # Импортируем все модели, чтобы SQLAlchemy их видела
-from app.models import User, Vehicle, Order, FuelLog, MaintenanceRecord, Driver, RoutePoint, TrackingPoint
+from app.models import User, Vehicle, Order, FuelLog, MaintenanceRecord, Driver, RoutePoint, TrackingPoint, Tariff, GeocodeCacheEntry, EmailOutbox, ChangeLogEntry, Geofence, GeofenceEvent, Trip, HeatmapCell, HeatmapDay
 from app.core.security import get_password_hash
 from app.models import UserRole
 from app.core.database import AsyncSessionLocal
@@ -15,6 +15,7 @@ async def reset_database():
         print("✅ Таблицы удалены.")
         
         print("🏗️  Создание новых таблиц...")
+        await create_extensions(conn)
         await conn.run_sync(Base.metadata.create_all)
         print("✅ Новые таблицы созданы.")
 
@@ -0,0 +1,83 @@
+"""
+Проверка, что пространственные запросы (app.services.spatial) используют GiST-индексы.
+
+Для каждого запроса выполняется EXPLAIN с enable_seqscan = off: на маленькой
+базе планировщик и так выбрал бы seq scan, а здесь проверяется именно то, что
+индекс подходит к выражению запроса (geography(col) должен совпасть с индексом).
+Нужна база со схемой из app.models (индексы geography_index).
+
+    python spatial_explain.py
+    python spatial_explain.py --verbose   # печатать планы
+
+Код выхода 1, если хотя бы один запрос не использует ожидаемый индекс.
+Те же CHECKS проверяет tests/test_spatial_indexes.py (при TEST_DATABASE_URL).
+"""
+import argparse
+import asyncio
+import sys
+
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from app.core.database import engine
+from app.services.spatial import (
+    ACTIVE_ORDER_STATUSES, orders_along_corridor_query, orders_within_radius_query, vehicles_within_polygon_query,
+)
+
+
+class Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, statement):
+        self.statement = statement
+
+
+@compiles(Explain, "postgresql")
+def _compile_explain(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.statement, **kw)
+
+
+MOSCOW = (55.7558, 37.6173)
+CHECKS = [
+    (
+        "orders within radius (delivery)",
+        orders_within_radius_query(*MOSCOW, 2000, point="delivery", statuses=ACTIVE_ORDER_STATUSES),
+        "ix_orders_delivery_location_geog",
+    ),
+    (
+        "orders within radius (pickup)",
+        orders_within_radius_query(*MOSCOW, 2000, point="pickup"),
+        "ix_orders_pickup_location_geog",
+    ),
+    (
+        "vehicles within polygon",
+        vehicles_within_polygon_query([(55.70, 37.55), (55.80, 37.55), (55.80, 37.70), (55.70, 37.70)]),
+        "idx_vehicles_current_location",
+    ),
+    (
+        "orders along corridor",
+        orders_along_corridor_query([(55.70, 37.50), (55.75, 37.62), (55.85, 37.70)], 500),
+        "ix_orders_delivery_location_geog",
+    ),
+]
+
+
+async def main(verbose: bool) -> int:
+    failed = 0
+    async with engine.connect() as conn:
+        await conn.exec_driver_sql("SET enable_seqscan = off")
+        for name, query, index in CHECKS:
+            plan = "\n".join(row[0] for row in (await conn.execute(Explain(query))).all())
+            ok = index in plan
+            failed += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name}: {index}")
+            if verbose or not ok:
+                print(plan + "\n")
+    await engine.dispose()
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="EXPLAIN spatial queries and check GiST index usage")
+    parser.add_argument("--verbose", action="store_true")
+    sys.exit(asyncio.run(main(parser.parse_args().verbose)))
@@ -0,0 +1,184 @@
+"""
+Профиль старта API: время импортов и холодный старт до первого /health.
+
+    python startup_profile.py imports              # разбивка времени импорта main
+    python startup_profile.py imports --top 40
+    python startup_profile.py coldstart --runs 5   # uvicorn до первого 200 на /health
+
+imports - свежий процесс `python -X importtime -c "import main"`: топ модулей
+по суммарному времени, сумма собственного времени по пакетам и проверка, что
+LAZY_MODULES (загружаются при первом использовании) не попали в импорт.
+
+coldstart - запускает uvicorn runs раз, меряет время от запуска процесса до
+первого успешного /health (импорты + lifespan), пишет строку в --history
+(JSONL, по умолчанию data/startup_history.jsonl) и сравнивает медиану с
+--target. Lifespan ходит в базу - нужна запущенная PostgreSQL (docker-compose).
+
+Код выхода 1 - ленивый модуль загружен при импорте или медиана выше цели.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Модули, которые не должны грузиться при старте воркера (см. app.core.security, app.core.email).
+# shapely/numpy сюда не входят: geoalchemy2 0.14 импортирует их сам, если shapely установлен.
+LAZY_MODULES = ["jose", "passlib", "smtplib", "email.mime"]
+
+COLD_START_TARGET_SECONDS = 3.0
+
+
+def import_times(module: str):
+    """[(module, self_us, cumulative_us, depth)] in import order, from -X importtime."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def cmd_imports(args) -> int:
+    rows = import_times(args.module)
+    total = next((cum for name, _, cum, _ in rows if name == args.module), sum(r[1] for r in rows))
+    print(f"import {args.module}: {total / 1000:.1f} ms, {len(rows)} modules\n")
+
+    print(f"Top {args.top} by cumulative time:")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:8.1f} ms  self {self_us / 1000:7.1f} ms  {name}")
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split(".")[0]] += self_us
+    print(f"\nTop {args.top} packages by self time:")
+    for package, self_us in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {package}")
+
+    loaded = {name for name, _, _, _ in rows}
+    eager = [m for m in LAZY_MODULES if any(name == m or name.startswith(m + ".") for name in loaded)]
+    print()
+    if eager:
+        print(f"FAIL lazy modules imported at startup: {', '.join(eager)}")
+        return 1
+    print(f"OK   lazy modules not imported: {', '.join(LAZY_MODULES)}")
+    return 0
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _health_ok(url: str) -> bool:
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status == 200
+    except (urllib.error.URLError, ConnectionError, OSError):
+        return False
+
+
+def cold_start(timeout: float) -> float:
+    """Seconds from spawning uvicorn to the first 200 from /health."""
+    port = _free_port()
+    url = f"http://127.0.0.1:{port}/health"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with {process.returncode}:\n{process.stdout.read()[-2000:]}")
+            if _health_ok(url):
+                return time.perf_counter() - started
+            time.sleep(0.02)
+        raise RuntimeError(f"/health did not respond within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _git_revision() -> str:
+    result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True)
+    return result.stdout.strip() or "unknown"
+
+
+def cmd_coldstart(args) -> int:
+    samples = []
+    for run in range(args.runs):
+        try:
+            seconds = cold_start(args.timeout)
+        except RuntimeError as e:
+            print(f"run {run + 1}: {e}")
+            return 2
+        samples.append(seconds)
+        print(f"run {run + 1}: {seconds:.3f}s")
+
+    median = statistics.median(samples)
+    print(f"\nmin {min(samples):.3f}s  median {median:.3f}s  max {max(samples):.3f}s  target {args.target:.3f}s")
+
+    if args.history:
+        history = Path(args.history)
+        history.parent.mkdir(parents=True, exist_ok=True)
+        with history.open("a") as f:
+            f.write(json.dumps({
+                "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "revision": _git_revision(),
+                "runs": len(samples),
+                "min": round(min(samples), 3),
+                "median": round(median, 3),
+                "max": round(max(samples), 3),
+                "create_all": os.environ.get("DB_CREATE_ALL_ON_STARTUP", "default"),
+            }) + "\n")
+        print(f"Appended to {history}")
+
+    if median > args.target:
+        print(f"FAIL median cold start {median:.3f}s > target {args.target:.3f}s")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup profile: import-time breakdown and cold start to /health")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    imports = commands.add_parser("imports", help="Import-time breakdown of the app module")
+    imports.add_argument("--module", default="main")
+    imports.add_argument("--top", type=int, default=25)
+    imports.set_defaults(handler=cmd_imports)
+
+    coldstart = commands.add_parser("coldstart", help="Time from process start to the first 200 on /health")
+    coldstart.add_argument("--runs", type=int, default=5)
+    coldstart.add_argument("--target", type=float, default=COLD_START_TARGET_SECONDS, help="Max median, seconds")
+    coldstart.add_argument("--timeout", type=float, default=60.0)
+    coldstart.add_argument("--history", default=str(BACKEND_DIR / "data" / "startup_history.jsonl"),
+                           help="JSONL file to append results to ('' to skip)")
+    coldstart.set_defaults(handler=cmd_coldstart)
+
+    args = parser.parse_args()
+    sys.exit(args.handler(args))
@@ -0,0 +1,10 @@
+"""
+Тесты запускаются из backend/ или из корня репозитория: python -m pytest -q.
+
+Тестам, которым нужна PostgreSQL/PostGIS, нужен TEST_DATABASE_URL (asyncpg);
+без него они пропускаются.
+"""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
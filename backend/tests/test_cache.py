@@ -0,0 +1,64 @@
+import asyncio
+
+from app.core.cache import TieredCache
+
+
+def test_load_started_before_invalidation_is_not_cached():
+    async def scenario():
+        cache = TieredCache()
+        started, release = asyncio.Event(), asyncio.Event()
+        version = {"value": 1}
+
+        async def loader():
+            value = version["value"]
+            started.set()
+            await release.wait()
+            return value
+
+        stale = asyncio.create_task(cache.get_or_load("vehicles:list", loader, 60, ["vehicles"]))
+        await started.wait()
+        version["value"] = 2
+        await cache.invalidate_tags("vehicles")
+        fresh = asyncio.create_task(cache.get_or_load("vehicles:list", loader, 60, ["vehicles"]))
+        release.set()
+
+        assert await stale == 1
+        assert await fresh == 2
+        assert await cache.get("vehicles:list") == (True, 2)
+        assert cache.metrics["stale_loads"] == 1
+        assert cache.metrics["coalesced"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = TieredCache()
+        calls = []
+
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_load("k", loader, 60, ["t"]) for _ in range(5)))
+        assert results == ["value"] * 5
+        assert len(calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_generations_are_dropped_after_loads_finish():
+    async def scenario():
+        cache = TieredCache()
+
+        async def loader():
+            await cache.invalidate_tags("tile:20:1:1")
+            return "tile"
+
+        await cache.get_or_load("tile:20:1:1", loader, 60, ["tile:20:1:1"])
+        await cache.invalidate_tags("tile:20:1:2", "tile:20:1:3")
+        assert cache._generations == {}
+        assert cache._loading == {}
+
+    asyncio.run(scenario())
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta, timezone
+
+from app.services.changes import is_resync_required, prune_boundary
+
+CUTOFF = datetime(2026, 10, 1, tzinfo=timezone.utc)
+OLD = CUTOFF - timedelta(days=1)
+NEW = CUTOFF + timedelta(days=1)
+
+
+def test_prune_boundary_deletes_only_leading_old_entries():
+    # Ревизия 4 старше отсечки, но идет после новой 3 - не удаляется, дыр нет
+    assert prune_boundary([(1, OLD), (2, OLD), (3, NEW), (4, OLD)], CUTOFF, latest=4) == 2
+    assert prune_boundary([(5, NEW)], CUTOFF, latest=5) is None
+
+
+def test_prune_boundary_keeps_latest_revision():
+    assert prune_boundary([(1, OLD), (2, OLD)], CUTOFF, latest=2) == 1
+
+
+def test_resync_required_below_retained_revisions():
+    assert not is_resync_required(10, None)
+    assert not is_resync_required(10, 11)
+    assert is_resync_required(9, 11)
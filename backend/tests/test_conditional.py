@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from sqlalchemy.dialects import postgresql
+from starlette.requests import Request
+
+from app.core.conditional import VersionStamp, check_conditional, rows_digest_query
+from app.models import Driver
+
+MODIFIED = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def _request(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/api/v1/vehicles",
+        "query_string": b"",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+def test_undated_part_drops_last_modified():
+    row = VersionStamp(("orders", 1, MODIFIED), MODIFIED)
+    table = VersionStamp(("vehicles", 10, None, 10))
+    assert (row + table).last_modified is None
+    assert (row + row).last_modified == MODIFIED
+
+
+def test_if_modified_since_alone_does_not_match_undated_stamp():
+    not_modified, headers = check_conditional(
+        _request(if_modified_since="Thu, 01 Oct 2026 12:00:00 GMT"), VersionStamp(("vehicles", 10, None, 10))
+    )
+    assert not_modified is None
+    assert "Last-Modified" not in headers
+
+
+def test_if_none_match_returns_304():
+    stamp = VersionStamp(("vehicles", 10, None, 10))
+    _, headers = check_conditional(_request(), stamp)
+    not_modified, _ = check_conditional(_request(if_none_match=headers["ETag"]), stamp)
+    assert not_modified is not None and not_modified.status_code == 304
+
+
+def test_rows_digest_covers_every_row_version():
+    sql = str(rows_digest_query(Driver).compile(dialect=postgresql.dialect()))
+    assert "drivers.xmin" in sql
+    assert "string_agg" in sql and "ORDER BY drivers.id" in sql
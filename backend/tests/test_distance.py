@@ -0,0 +1,18 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.services.distance import CachedDistanceProvider, HaversineDistanceProvider
+
+
+def test_cached_provider_is_thread_safe():
+    provider = CachedDistanceProvider(HaversineDistanceProvider(), max_size=8)
+
+    def work(i: int) -> float:
+        return provider.distance_km(55.0 + (i % 20) / 100, 37.0, 55.5, 37.5)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(work, range(5000)))
+
+    assert len(results) == 5000
+    stats = provider.stats()
+    assert stats["hits"] + stats["misses"] == 5000
+    assert stats["size"] <= 8
@@ -0,0 +1,75 @@
+"""Outbox sender against the local SMTP stub (no database: claim/record are replaced)."""
+import asyncio
+from datetime import datetime, timezone
+
+from app.core.config import settings
+from app.core.email import EmailOutboxWorker, EmailService, SMTPTransport
+from app.core.smtp_stub import LocalSMTPStub
+from app.models import EmailOutbox, EmailStatus
+
+
+def _message(message_id: int, attempts: int = 1) -> EmailOutbox:
+    return EmailOutbox(
+        id=message_id,
+        to_email=f"client{message_id}@example.com",
+        subject=f"Order #{message_id}",
+        text_body="text",
+        html_body="<p>html</p>",
+        status=EmailStatus.SENDING,
+        attempts=attempts,
+        next_attempt_at=datetime.now(timezone.utc),
+    )
+
+
+def _worker(port: int, messages):
+    service = EmailService()
+    service.enabled = True
+    worker = EmailOutboxWorker(service, SMTPTransport("127.0.0.1", port, use_tls=False, timeout=5))
+    worker.min_interval = 0.0
+    recorded = {}
+
+    async def claim():
+        return messages
+
+    async def record(message, values):
+        recorded[message.id] = values
+
+    worker._claim = claim
+    worker._record = record
+    return worker, recorded
+
+
+def test_batch_is_sent_over_one_connection():
+    async def scenario():
+        stub = LocalSMTPStub(port=0)
+        await stub.start()
+        try:
+            worker, recorded = _worker(stub.port, [_message(1), _message(2), _message(3)])
+            assert await worker.process_batch() == 3
+            await asyncio.to_thread(worker.transport.close)
+            return stub, recorded
+        finally:
+            await stub.stop()
+
+    stub, recorded = asyncio.run(scenario())
+    assert [m.rcpt_to for m in stub.messages] == [[f"<client{i}@example.com>"] for i in (1, 2, 3)]
+    assert stub.connections == 1
+    assert {values["status"] for values in recorded.values()} == {EmailStatus.SENT}
+
+
+def test_failed_delivery_is_retried_then_failed():
+    async def scenario():
+        # Порт без сервера: каждое подключение падает
+        stub = LocalSMTPStub(port=0)
+        await stub.start()
+        port = stub.port
+        await stub.stop()
+        worker, recorded = _worker(port, [_message(1, attempts=1), _message(2, attempts=settings.EMAIL_MAX_ATTEMPTS)])
+        await worker.process_batch()
+        return recorded
+
+    recorded = asyncio.run(scenario())
+    assert recorded[1]["status"] == EmailStatus.PENDING
+    assert recorded[1]["next_attempt_at"] > datetime.now(timezone.utc)
+    assert recorded[2]["status"] == EmailStatus.FAILED
+
@@ -0,0 +1,49 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+
+from app.services.arrival import ActiveDelivery
+from app.services.distance import DistanceProvider
+from app.services.eta import EtaEngine
+
+START = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+class RecordingProvider(DistanceProvider):
+    def __init__(self):
+        self.threads = set()
+
+    def distance_km(self, lat1, lon1, lat2, lon2):
+        self.threads.add(threading.get_ident())
+        return 10.0
+
+
+def _engine(provider=None) -> EtaEngine:
+    return EtaEngine(0.2, 10.0, 40.0, 1.3, 60.0, 0.05, provider)
+
+
+def test_road_distance_is_computed_off_the_event_loop():
+    provider = RecordingProvider()
+    engine = _engine(provider)
+
+    async def scenario():
+        updates = await engine.process(1, 55.75, 37.61, 40.0, START, [ActiveDelivery(10, 55.8, 37.7)])
+        assert updates[0].remaining_km == 10.0
+        assert threading.get_ident() not in provider.threads
+
+    asyncio.run(scenario())
+
+
+def test_estimates_of_orders_that_left_the_vehicle_are_dropped():
+    engine = _engine()
+
+    async def scenario():
+        await engine.process(1, 55.75, 37.61, 40.0, START, [ActiveDelivery(10, 55.8, 37.7), ActiveDelivery(11, 55.8, 37.7)])
+        # Заказ 11 переназначен на машину 2 и уже получил оценку там
+        await engine.process(2, 55.70, 37.50, 40.0, START, [ActiveDelivery(11, 55.8, 37.7)])
+        # Заказ 10 отменен: у машины 1 больше нет активных заказов
+        await engine.process(1, 55.75, 37.62, 40.0, START + timedelta(seconds=5), [])
+        assert engine.get(10) is None
+        assert engine.get(11).vehicle_id == 2
+
+    asyncio.run(scenario())
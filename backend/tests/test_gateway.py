@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from app.services.gateway import IngestBatcher, TelematicsGateway, fixes_to_points
+from app.services.ingest import IngestBatchResult
+from app.services.telematics import ProtocolError, decode_header, decode_udp_frame, encode_udp_fixes
+
+FIX = (1, 1_790_000_000, 55.75, 37.61, 40.0, 90.0, None)
+
+
+@pytest.mark.parametrize("frame", [b"", b"LT", encode_udp_fixes(7, "dev-7", [FIX])[:8]])
+def test_short_frames_are_protocol_errors(frame):
+    with pytest.raises(ProtocolError):
+        vehicle_id, device_id, fixes = decode_udp_frame(frame)
+        list(fixes)
+
+
+def test_short_header_is_protocol_error():
+    with pytest.raises(ProtocolError):
+        decode_header(b"\x4c\x54\x01")
+
+
+def test_short_datagram_counts_as_protocol_error():
+    gateway = TelematicsGateway(IngestBatcher(100, 1.0, 1000))
+    asyncio.run(gateway.handle_datagram(b"LT\x01", ("127.0.0.1", 5000)))
+    assert gateway.protocol_errors == 1
+
+
+def test_failed_batch_is_retried_per_device():
+    async def scenario():
+        batcher = IngestBatcher(100, 1.0, 1000)
+        calls = []
+
+        async def ingest(points):
+            vehicles = {p.vehicle_id for p in points}
+            calls.append(vehicles)
+            if 2 in vehicles:
+                raise RuntimeError("bad vehicle 2")
+            return IngestBatchResult()
+
+        batcher._ingest = ingest
+        good = await batcher.submit(fixes_to_points(1, "dev-1", [FIX]))
+        bad = await batcher.submit(fixes_to_points(2, "dev-2", [FIX]))
+        await batcher.flush()
+
+        assert calls == [{1, 2}, {1}, {2}]
+        assert isinstance(good.result(), IngestBatchResult)
+        assert isinstance(bad.exception(), RuntimeError)
+        assert batcher.metrics["flush_errors"] == 1
+        assert batcher.metrics["device_flush_errors"] == 1
+
+    asyncio.run(scenario())
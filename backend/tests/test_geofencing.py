@@ -0,0 +1,19 @@
+import shapely
+
+from app.models import GeofenceKind
+from app.services.geofencing import METERS_PER_DEG_LAT, METERS_PER_DEG_LNG, FenceShape
+
+LAT = 60.0  # cos(lat) = 0.5: градус долготы вдвое короче градуса широты
+
+
+def test_polygon_exit_buffer_is_in_meters_along_longitude():
+    kind = next(iter(GeofenceKind))
+    square = shapely.box(30.0, LAT - 0.01, 30.01, LAT + 0.01)
+    fence = FenceShape(1, "square", kind, 100.0, polygon=square)
+    deg_per_m_lng = 1 / (METERS_PER_DEG_LNG * 0.5)
+
+    assert fence.contains(LAT, 30.01 + 90 * deg_per_m_lng, for_exit=True)
+    assert not fence.contains(LAT, 30.01 + 110 * deg_per_m_lng, for_exit=True)
+    assert fence.contains(LAT + 0.01 + 90 / METERS_PER_DEG_LAT, 30.005, for_exit=True)
+    assert not fence.contains(LAT + 0.01 + 110 / METERS_PER_DEG_LAT, 30.005, for_exit=True)
+    assert not fence.contains(LAT, 30.01 + 90 * deg_per_m_lng)
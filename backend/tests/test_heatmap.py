@@ -0,0 +1,40 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.core.config import settings
+from app.services.heatmap import query_heatmap, rollup_day
+from app.services.track_archive import archive_cutoff_day
+
+
+def test_archive_cutoff_day():
+    now = datetime(2026, 10, 31, 8, 0, tzinfo=timezone.utc)
+    assert archive_cutoff_day(30, now) == date(2026, 10, 1)
+
+
+def test_rollup_refuses_days_that_may_be_archived():
+    day = date.fromordinal(archive_cutoff_day(settings.TRACK_ARCHIVE_AFTER_DAYS).toordinal() - 1)
+    # До запросов к БД: сессия не нужна
+    with pytest.raises(ValueError):
+        asyncio.run(rollup_day(None, day))
+
+
+class NoRolledDaysSession:
+    """Session stub: no day of the range has an aggregate."""
+
+    async def execute(self, statement):
+        class Result:
+            def scalars(self):
+                return self
+
+            def all(self):
+                return []
+
+        return Result()
+
+
+def test_query_refuses_unrolled_days_that_may_be_archived():
+    day = date.fromordinal(archive_cutoff_day(settings.TRACK_ARCHIVE_AFTER_DAYS).toordinal() - 1)
+    with pytest.raises(ValueError):
+        asyncio.run(query_heatmap(NoRolledDaysSession(), day, day, 12))
@@ -0,0 +1,56 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+from app.models import Vehicle
+from app.services.geofencing import geofence_monitor
+from app.services.gps_validation import ACCEPTED, gps_validator
+from app.services.ingest import StageSnapshot
+from app.services.trips import VehicleTripState, trip_engine
+
+START = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+def test_restore_undoes_stage_state_of_uncommitted_batch():
+    vehicle_id = 987654
+    gps_validator.check(vehicle_id, 55.75, 37.61, START, START)
+
+    snapshot = StageSnapshot()
+    snapshot.take([vehicle_id])
+    at = START + timedelta(minutes=1)
+    gps_validator.check(vehicle_id, 55.76, 37.62, at, at)
+    geofence_monitor.process(vehicle_id, 55.76, 37.62)
+    snapshot.restore()
+
+    # Повтор той же точки после отката - не дубль, геозоны как до пачки
+    assert gps_validator.check(vehicle_id, 55.76, 37.62, at, at) == ACCEPTED
+    assert geofence_monitor.snapshot([vehicle_id]) == {vehicle_id: None}
+
+
+def test_open_trip_is_continued_from_vehicle_row():
+    vehicle = Vehicle(id=987655)
+    trip_engine.process(vehicle, 55.75, 37.61, 0.0, START)
+    trip_engine.process(vehicle, 55.76, 37.61, 40.0, START + timedelta(minutes=1))
+
+    # Другой воркер видит ту же строку после коммита - поездка продолжается, а не начинается заново
+    other_worker = Vehicle(id=vehicle.id, trip_state=json.loads(json.dumps(vehicle.trip_state)))
+    trip_engine.process(other_worker, 55.77, 37.61, 40.0, START + timedelta(minutes=2))
+    trip = VehicleTripState.from_json(other_worker.trip_state).trip
+    assert trip.started_at == START
+    assert trip.point_count == 2
+    assert 2.0 < trip.distance_km < 2.4
+
+    # Точка, уже учтенная другим воркером, не меняет поездку
+    state = other_worker.trip_state
+    assert trip_engine.process(other_worker, 55.76, 37.61, 40.0, START + timedelta(minutes=1)) is None
+    assert other_worker.trip_state is state
+
+
+def test_odometer_counts_each_segment_once():
+    vehicle = Vehicle(mileage=0.0)
+    assert trip_engine.advance_odometer(vehicle, 55.75, 37.61, START) == 0.0
+    later = START + timedelta(minutes=1)
+    step = trip_engine.advance_odometer(vehicle, 55.76, 37.61, later)
+    assert 1.0 < step < 1.2
+    # Та же точка из другого воркера (после его коммита строка уже обновлена)
+    assert trip_engine.advance_odometer(vehicle, 55.76, 37.61, later) == 0.0
+    assert vehicle.mileage == step
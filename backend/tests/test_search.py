@@ -0,0 +1,18 @@
+from sqlalchemy.dialects import postgresql
+
+from app.services.search import order_search_condition
+
+
+def _compile(text: str):
+    return order_search_condition(text).compile(dialect=postgresql.dialect())
+
+
+def test_numeric_search_matches_order_id():
+    compiled = _compile(" 42 ")
+    assert "orders.id = " in str(compiled)
+    assert 42 in compiled.params.values()
+
+
+def test_numbers_outside_int4_do_not_compare_id():
+    assert "orders.id" not in str(_compile("99999999999"))
+    assert "orders.id" not in str(_compile("²"))
@@ -0,0 +1,45 @@
+"""EXPLAIN пространственных запросов (как spatial_explain.py): нужна PostGIS в TEST_DATABASE_URL.
+
+Схема создается из app.models внутри транзакции и откатывается после проверки.
+"""
+import asyncio
+import os
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.database import Base, create_extensions
+from spatial_explain import CHECKS, Explain
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+
+pytestmark = pytest.mark.skipif(not TEST_DATABASE_URL, reason="TEST_DATABASE_URL is not set")
+
+
+async def _explain_all() -> dict:
+    engine = create_async_engine(TEST_DATABASE_URL)
+    try:
+        async with engine.connect() as conn:
+            transaction = await conn.begin()
+            await create_extensions(conn)
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(text("SET LOCAL enable_seqscan = off"))
+            plans = {
+                name: "\n".join(row[0] for row in (await conn.execute(Explain(query))).all())
+                for name, query, _ in CHECKS
+            }
+            await transaction.rollback()
+        return plans
+    finally:
+        await engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def plans() -> dict:
+    return asyncio.run(_explain_all())
+
+
+@pytest.mark.parametrize("name, index", [(name, index) for name, _, index in CHECKS])
+def test_spatial_query_uses_gist_index(plans, name, index):
+    assert index in plans[name], plans[name]
@@ -0,0 +1,26 @@
+import asyncio
+
+from app.services import tiles
+from app.services.tiles import TileInvalidator
+
+
+def test_only_crossed_tiles_are_invalidated(monkeypatch):
+    invalidated = []
+
+    async def invalidate_tags(*tags):
+        invalidated.append(set(tags))
+
+    monkeypatch.setattr(tiles.cache, "invalidate_tags", invalidate_tags)
+    invalidator = TileInvalidator()
+
+    async def scenario():
+        await invalidator.vehicle_moved(1, 55.75, 37.61)
+        invalidated.clear()
+        # Сдвиг на ~1 м - тот же тайл на всех zoom
+        await invalidator.vehicle_moved(1, 55.75, 37.61001)
+        assert invalidated == []
+        # Сдвиг на ~1 км - меняются тайлы крупных zoom
+        await invalidator.vehicle_moved(1, 55.76, 37.63)
+        assert invalidated and all(key.startswith("tile:") for key in invalidated[0])
+
+    asyncio.run(scenario())
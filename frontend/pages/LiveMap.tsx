@@ -37,7 +37,9 @@ export const LiveMap: React.FC = () => {
     // В Vite .env VITE_WS_URL=ws://localhost:8000/api/v1/tracking/ws
     const wsUrl =
       import.meta.env.VITE_WS_URL || "ws://localhost:8000/api/v1/tracking/ws";
-    const ws = new WebSocket(wsUrl);
+    // Сервер принимает соединение только с токеном
+    const token = localStorage.getItem("auth_token");
+    const ws = new WebSocket(`${wsUrl}?token=${encodeURIComponent(token || "")}`);
 
     ws.onopen = () => {
       console.log("📡 Connected to Live Tracking Stream");